@@ -0,0 +1,307 @@
+# analytics_store.py - 列指向の分析データストア（テナント・月別パーティション、NumPyで集計）
+#
+# 保存形式: <root>/tenant=<ID>/month=<YYYY-MM>/<列名>.bin （列ごとの追記専用バイナリ）
+# 文字列の列（サービス・エリア）は <root>/dictionary.json で整数コード化する。
+# 書き込みは1プロセスからの利用を前提とする。
+
+import json
+import os
+import time
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+EVENT_KINDS = ("post", "image", "reply", "campaign", "contract")
+SEASON_NAMES = ("春", "夏", "秋", "冬")
+
+# 列名 → dtype
+COLUMNS = {
+    "ts": np.int64,
+    "kind": np.uint8,
+    "service": np.int32,
+    "area": np.int32,
+    "season": np.int8,
+    "cost": np.float64,
+    "revenue": np.float64,
+}
+
+# これ以上のサイズの列ファイルはメモリマップで開く（小さいファイルは一括読み込みの方が速い）
+MEMMAP_THRESHOLD = 1 << 20
+
+# 文字列を整数コード化する列
+DICTIONARY_COLUMNS = ("service", "area")
+
+def _month_key(ts: float) -> str:
+    return datetime.fromtimestamp(ts).strftime("%Y-%m")
+
+def _to_timestamp(value) -> Optional[int]:
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        return int(value.timestamp())
+    return int(value)
+
+class AnalyticsStore:
+    """投稿・画像・返信・キャンペーン・成約イベントの列指向ストア"""
+
+    def __init__(self, root: str = "analytics"):
+        self.root = root
+        self._dictionary_path = os.path.join(root, "dictionary.json")
+        self._dictionary: Dict[str, List[str]] = {name: [] for name in DICTIONARY_COLUMNS}
+        if os.path.exists(self._dictionary_path):
+            with open(self._dictionary_path, encoding="utf-8") as f:
+                self._dictionary.update(json.load(f))
+        self._codes = {name: {v: i for i, v in enumerate(values)}
+                       for name, values in self._dictionary.items()}
+        self._dictionary_dirty = False
+        self._buffer: Dict[Tuple[str, str], Dict[str, list]] = {}
+
+    # ----- 書き込み -----
+
+    def _encode(self, column: str, value: Optional[str]) -> int:
+        if value is None:
+            return -1
+        codes = self._codes[column]
+        code = codes.get(value)
+        if code is None:
+            code = codes[value] = len(self._dictionary[column])
+            self._dictionary[column].append(value)
+            self._dictionary_dirty = True
+        return code
+
+    def append(self, tenant: str, kind: str, ts=None, service: Optional[str] = None,
+               area: Optional[str] = None, season: Optional[str] = None,
+               cost: float = 0.0, revenue: float = 0.0):
+        """イベントを1件追加（flush まではメモリ上にバッファ）"""
+        if kind not in EVENT_KINDS:
+            raise ValueError(f"不明なイベント種別: {kind}")
+        ts = _to_timestamp(ts) or int(time.time())
+        row = self._buffer.setdefault((tenant, _month_key(ts)), {name: [] for name in COLUMNS})
+        row["ts"].append(ts)
+        row["kind"].append(EVENT_KINDS.index(kind))
+        row["service"].append(self._encode("service", service))
+        row["area"].append(self._encode("area", area))
+        row["season"].append(SEASON_NAMES.index(season) if season in SEASON_NAMES else -1)
+        row["cost"].append(cost)
+        row["revenue"].append(revenue)
+
+    def flush(self):
+        """バッファを列ファイルへ追記"""
+        # 辞書を先に保存（列ファイルが未知のコードを参照しないように）
+        if self._dictionary_dirty:
+            os.makedirs(self.root, exist_ok=True)
+            tmp_path = f"{self._dictionary_path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self._dictionary, f, ensure_ascii=False)
+            os.replace(tmp_path, self._dictionary_path)
+            self._dictionary_dirty = False
+
+        for (tenant, month), rows in self._buffer.items():
+            directory = self._partition_dir(tenant, month)
+            os.makedirs(directory, exist_ok=True)
+            self._truncate_uncommitted(directory)
+            for name, dtype in COLUMNS.items():
+                with open(os.path.join(directory, f"{name}.bin"), "ab") as f:
+                    f.write(np.asarray(rows[name], dtype=dtype).tobytes())
+        self._buffer.clear()
+
+    def __enter__(self) -> "AnalyticsStore":
+        return self
+
+    def __exit__(self, *exc):
+        self.flush()
+        return False
+
+    # ----- 読み込み -----
+
+    def _partition_dir(self, tenant: str, month: str) -> str:
+        return os.path.join(self.root, f"tenant={tenant}", f"month={month}")
+
+    def tenants(self) -> List[str]:
+        """登録済みテナント一覧"""
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(name[len("tenant="):] for name in os.listdir(self.root) if name.startswith("tenant="))
+
+    def _partitions(self, tenants: Optional[Iterable[str]], start: Optional[int],
+                    end: Optional[int]) -> Iterator[Tuple[str, bool]]:
+        """対象パーティション（ディレクトリ, 期間境界をまたぐか）を列挙（月単位で枝刈り）"""
+        start_month = _month_key(start) if start is not None else None
+        end_month = _month_key(end) if end is not None else None
+        for tenant in (tenants if tenants is not None else self.tenants()):
+            tenant_dir = os.path.join(self.root, f"tenant={tenant}")
+            if not os.path.isdir(tenant_dir):
+                continue
+            for name in os.listdir(tenant_dir):
+                month = name[len("month="):]
+                if (start_month and month < start_month) or (end_month and month > end_month):
+                    continue
+                partial = month == start_month or month == end_month
+                yield os.path.join(tenant_dir, name), partial
+
+    @staticmethod
+    def _committed_rows(directory: str) -> int:
+        """確定行数（列は COLUMNS の順に追記されるため、最後の列の行数）"""
+        last = list(COLUMNS)[-1]
+        path = os.path.join(directory, f"{last}.bin")
+        if not os.path.exists(path):
+            return 0
+        return os.path.getsize(path) // np.dtype(COLUMNS[last]).itemsize
+
+    @classmethod
+    def _truncate_uncommitted(cls, directory: str):
+        """書き込み途中で終わった行を各列ファイルから切り詰める（追記で列がずれないように）"""
+        rows = cls._committed_rows(directory)
+        for name, dtype in COLUMNS.items():
+            path = os.path.join(directory, f"{name}.bin")
+            size = rows * np.dtype(dtype).itemsize
+            if os.path.exists(path) and os.path.getsize(path) > size:
+                os.truncate(path, size)
+
+    @classmethod
+    def _read_columns(cls, directory: str, columns: Sequence[str]) -> Dict[str, np.ndarray]:
+        """列ファイルを読み込む
+
+        最後の列の行数を確定行数とみなす（書き込み途中の行は除外される）。
+        大きな列ファイルはメモリマップで開く。
+        """
+        rows = cls._committed_rows(directory)
+        data = {}
+        for name in columns:
+            path = os.path.join(directory, f"{name}.bin")
+            if rows * np.dtype(COLUMNS[name]).itemsize >= MEMMAP_THRESHOLD:
+                data[name] = np.memmap(path, dtype=COLUMNS[name], mode="r", shape=(rows,))
+            else:
+                data[name] = np.fromfile(path, dtype=COLUMNS[name], count=rows)
+        return data
+
+    def scan(self, columns: Sequence[str], tenants: Optional[Iterable[str]] = None,
+             start=None, end=None) -> Iterator[Dict[str, np.ndarray]]:
+        """パーティション単位で列配列を返す（期間 [start, end) で絞り込み）"""
+        start, end = _to_timestamp(start), _to_timestamp(end)
+        needed = list(dict.fromkeys(list(columns) + (["ts"] if start or end else [])))
+        for directory, partial in self._partitions(tenants, start, end):
+            data = self._read_columns(directory, needed)
+            if partial and len(data["ts"]):
+                mask = np.ones(len(data["ts"]), dtype=bool)
+                if start is not None:
+                    mask &= data["ts"] >= start
+                if end is not None:
+                    mask &= data["ts"] < end
+                data = {name: values[mask] for name, values in data.items()}
+            yield data
+
+    # ----- 集計 -----
+
+    def kpis(self, tenants: Optional[Iterable[str]] = None, start=None, end=None) -> Dict:
+        """売上・ROI・成約数などの主要KPI（ROIは広告費の記録がなければ None）"""
+        counts = np.zeros(len(EVENT_KINDS), dtype=np.int64)
+        revenue = cost = 0.0
+        for data in self.scan(("kind", "cost", "revenue"), tenants, start, end):
+            counts += np.bincount(data["kind"], minlength=len(EVENT_KINDS))[:len(EVENT_KINDS)]
+            revenue += float(data["revenue"].sum())
+            cost += float(data["cost"].sum())
+
+        inquiries = int(counts[EVENT_KINDS.index("reply")])
+        contracts = int(counts[EVENT_KINDS.index("contract")])
+        return {
+            "total_sales": int(revenue),
+            "cost": int(cost),
+            # 広告費が未記録の間はROIを出さない（None）
+            "roi": round((revenue - cost) / cost * 100, 1) if cost else None,
+            "contracts": contracts,
+            "inquiries": inquiries,
+            "posts": int(counts[EVENT_KINDS.index("post")]),
+            "conversion_rate": round(contracts / inquiries * 100, 1) if inquiries else 0.0
+        }
+
+    def conversion_by(self, dimension: str, tenants: Optional[Iterable[str]] = None,
+                      start=None, end=None) -> Dict[str, Dict]:
+        """サービス・エリア・季節別の問い合わせ→成約率"""
+        if dimension == "season":
+            labels = list(SEASON_NAMES)
+        elif dimension in DICTIONARY_COLUMNS:
+            labels = list(self._dictionary[dimension])
+        else:
+            raise ValueError(f"集計できない項目: {dimension}")
+
+        size = len(labels) + 1  # 末尾は値なし（-1）
+        reply_kind = EVENT_KINDS.index("reply")
+        contract_kind = EVENT_KINDS.index("contract")
+        inquiries = np.zeros(size, dtype=np.int64)
+        contracts = np.zeros(size, dtype=np.int64)
+        revenue = np.zeros(size, dtype=np.float64)
+        for data in self.scan(("kind", dimension, "revenue"), tenants, start, end):
+            codes = data[dimension].astype(np.int64)
+            codes[codes < 0] = size - 1
+            is_reply = data["kind"] == reply_kind
+            is_contract = data["kind"] == contract_kind
+            inquiries += np.bincount(codes[is_reply], minlength=size)[:size]
+            contracts += np.bincount(codes[is_contract], minlength=size)[:size]
+            revenue += np.bincount(codes[is_contract], weights=data["revenue"][is_contract], minlength=size)[:size]
+
+        result = {}
+        for i, label in enumerate(labels):
+            if inquiries[i] or contracts[i]:
+                result[label] = {
+                    "inquiries": int(inquiries[i]),
+                    "contracts": int(contracts[i]),
+                    "revenue": int(revenue[i]),
+                    "rate": round(float(contracts[i] / inquiries[i]) * 100, 1) if inquiries[i] else 0.0
+                }
+        return result
+
+    def rolling(self, kind: str, start, end, window_days: int = 7, value: str = "count",
+                tenants: Optional[Iterable[str]] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """日別の件数（または売上）と移動合計を返す: (日付配列, 移動合計配列)"""
+        start, end = _to_timestamp(start), _to_timestamp(end)
+        day_start = datetime.fromtimestamp(start).replace(hour=0, minute=0, second=0).timestamp()
+        days = int(np.ceil((end - day_start) / 86400))
+        kind_code = EVENT_KINDS.index(kind)
+        daily = np.zeros(days, dtype=np.float64)
+        columns = ("ts", "kind") + (("revenue",) if value == "revenue" else ())
+        for data in self.scan(columns, tenants, start, end):
+            selected = data["kind"] == kind_code
+            offsets = ((data["ts"][selected] - day_start) // 86400).astype(np.int64)
+            weights = data["revenue"][selected] if value == "revenue" else None
+            daily += np.bincount(offsets, weights=weights, minlength=days)[:days]
+
+        cumulative = np.concatenate(([0.0], np.cumsum(daily)))
+        window = np.minimum(np.arange(1, days + 1), window_days)
+        moving = cumulative[1:] - cumulative[np.arange(1, days + 1) - window]
+        dates = np.arange(days) * 86400 + int(day_start)
+        return dates.astype("datetime64[s]"), moving
+
+def record_daily_result(store: AnalyticsStore, tenant: str, result: Dict, season: str,
+                        service: Optional[str] = None, area: Optional[str] = None, ts=None,
+                        cost: float = 0.0):
+    """run_daily_automation の結果を分析イベントとして記録（cost は1日分の広告費、投稿イベントに計上）"""
+    if not result.get("success"):
+        return
+    for kind, key in (("post", "instagram_post"), ("image", "image_path"),
+                      ("reply", "email_response"), ("campaign", "campaign")):
+        if result.get(key):
+            store.append(tenant, kind, ts, service=service, area=area, season=season,
+                         cost=cost if kind == "post" else 0.0)
+
+def record_contract(store: AnalyticsStore, tenant: str, revenue: float, service: Optional[str] = None,
+                    area: Optional[str] = None, ts=None):
+    """成約を売上付きで記録（成約は自動実行では発生しないため手動・外部連携で登録する）"""
+    store.append(tenant, "contract", ts, service=service, area=area, revenue=revenue)
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="成約の登録（売上・ROI集計用）")
+    parser.add_argument("root", help="分析データストアのディレクトリ")
+    parser.add_argument("revenue", type=float, help="成約金額（円）")
+    parser.add_argument("--tenant", default="default", help="テナントID")
+    parser.add_argument("--service", help="サービス名")
+    parser.add_argument("--area", help="エリア")
+    parser.add_argument("--date", type=datetime.fromisoformat, help="成約日（YYYY-MM-DD、省略時は現在）")
+    args = parser.parse_args()
+
+    with AnalyticsStore(args.root) as store:
+        record_contract(store, args.tenant, args.revenue, args.service, args.area, args.date)
+    print(f"💰 成約登録: {args.tenant} ¥{args.revenue:,.0f}")
@@ -0,0 +1,310 @@
+# availability.py - 現地調査の空き枠管理（施工班・エリア別の予約インデックス、SQLite永続化）
+#
+# 予約・仮押さえは SQLite に保存し、プロセス内では施工班ごとに開始時刻でソートした
+# 区間リストを持つ（同じ班の予約は重ならないので、空き判定は二分探索1回で済む）。
+# 仮押さえは書き込みトランザクション内でDB側でも重複を再確認するため、
+# 複数プロセスから同時に押さえても二重予約にならない。
+
+import bisect
+import json
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+WEEKDAY_NAMES = ('月', '火', '水', '木', '金', '土', '日')
+
+# 調査枠の開始時刻（時, 分）と長さ
+DEFAULT_SLOT_TIMES = ((9, 0), (11, 0), (13, 0), (15, 0))
+DEFAULT_SLOT_MINUTES = 120
+
+# 仮押さえの有効期間（秒）
+DEFAULT_HOLD_SECONDS = 72 * 3600
+
+@dataclass(frozen=True)
+class SurveySlot:
+    """現地調査の枠"""
+    crew_id: str
+    start: datetime
+    end: datetime
+
+    def label(self) -> str:
+        """メール本文用の表記"""
+        return (f"{self.start.strftime('%m月%d日')}（{WEEKDAY_NAMES[self.start.weekday()]}） "
+                f"{self.start.hour}:{self.start.minute:02d}-{self.end.hour}:{self.end.minute:02d}")
+
+def format_slots(slots: Sequence[SurveySlot]) -> str:
+    """候補枠を返信メールの候補日ブロックに整形"""
+    return "\n".join(f"・{slot.label()}" for slot in slots)
+
+class _CrewIndex:
+    """施工班1つ分の予約区間（開始時刻順）と日別件数"""
+
+    def __init__(self):
+        self.starts: List[int] = []
+        self.ends: List[int] = []
+        self.day_counts: Dict[date, int] = {}
+
+    def is_free(self, start: int, end: int) -> bool:
+        """[start, end) が既存の予約と重ならないか（O(log n)）"""
+        i = bisect.bisect_left(self.starts, end)
+        return i == 0 or self.ends[i - 1] <= start
+
+    def add(self, start: int, end: int):
+        i = bisect.bisect_left(self.starts, start)
+        self.starts.insert(i, start)
+        self.ends.insert(i, end)
+        day = datetime.fromtimestamp(start).date()
+        self.day_counts[day] = self.day_counts.get(day, 0) + 1
+
+    def remove(self, start: int):
+        i = bisect.bisect_left(self.starts, start)
+        if i < len(self.starts) and self.starts[i] == start:
+            del self.starts[i]
+            del self.ends[i]
+            day = datetime.fromtimestamp(start).date()
+            self.day_counts[day] -= 1
+
+class AvailabilityEngine:
+    """施工班・エリア別の現地調査空き枠エンジン"""
+
+    def __init__(self, path: str = "availability.sqlite3",
+                 slot_times: Sequence[Tuple[int, int]] = DEFAULT_SLOT_TIMES,
+                 slot_minutes: int = DEFAULT_SLOT_MINUTES,
+                 lead_days: int = 3, horizon_days: int = 21,
+                 workdays: Iterable[int] = range(5),
+                 hold_seconds: float = DEFAULT_HOLD_SECONDS):
+        self.slot_times = tuple(slot_times)
+        self.slot_length = timedelta(minutes=slot_minutes)
+        self.lead_days = lead_days
+        self.horizon_days = horizon_days
+        self.workdays = frozenset(workdays)
+        self.hold_seconds = hold_seconds
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            "CREATE TABLE IF NOT EXISTS crews "
+            "(crew_id TEXT PRIMARY KEY, areas TEXT NOT NULL, daily_capacity INTEGER NOT NULL);"
+            "CREATE TABLE IF NOT EXISTS holidays (day TEXT NOT NULL, crew_id TEXT NOT NULL DEFAULT '',"
+            " PRIMARY KEY (day, crew_id));"
+            "CREATE TABLE IF NOT EXISTS bookings "
+            "(crew_id TEXT NOT NULL, start INTEGER NOT NULL, end INTEGER NOT NULL,"
+            " inquiry_id TEXT, status TEXT NOT NULL, expires_at REAL,"
+            " PRIMARY KEY (crew_id, start));"
+            "CREATE INDEX IF NOT EXISTS bookings_inquiry ON bookings (inquiry_id);"
+            "CREATE INDEX IF NOT EXISTS bookings_expires ON bookings (expires_at);"
+        )
+        self.reload()
+
+    # ----- 読み込み -----
+
+    def reload(self):
+        """DBから施工班・休日・予約を読み込んでインデックスを再構築"""
+        with self._lock:
+            self._purge_expired()
+            self._crews: Dict[str, Tuple[frozenset, int]] = {}
+            self._area_crews: Dict[str, List[str]] = {}
+            self._any_area_crews: List[str] = []
+            for crew_id, areas, capacity in self._conn.execute(
+                    "SELECT crew_id, areas, daily_capacity FROM crews ORDER BY crew_id"):
+                self._register_crew(crew_id, json.loads(areas), capacity)
+
+            self._holidays: Dict[str, set] = {}
+            for day, crew_id in self._conn.execute("SELECT day, crew_id FROM holidays"):
+                self._holidays.setdefault(crew_id, set()).add(date.fromisoformat(day))
+
+            self._index: Dict[str, _CrewIndex] = {crew_id: _CrewIndex() for crew_id in self._crews}
+            for crew_id, start, end in self._conn.execute(
+                    "SELECT crew_id, start, end FROM bookings ORDER BY crew_id, start"):
+                self._index.setdefault(crew_id, _CrewIndex()).add(start, end)
+
+    def _register_crew(self, crew_id: str, areas: Sequence[str], capacity: int):
+        self._crews[crew_id] = (frozenset(areas), capacity)
+        if areas:
+            for area in areas:
+                self._area_crews.setdefault(area, []).append(crew_id)
+        else:
+            self._any_area_crews.append(crew_id)
+
+    def _purge_expired(self):
+        """期限切れの仮押さえを削除（削除したら True）"""
+        cursor = self._conn.execute(
+            "DELETE FROM bookings WHERE status = 'hold' AND expires_at < ?", (time.time(),))
+        # 次に期限切れになる仮押さえの時刻（それまでは検索のたびにDBを見ない）
+        next_expiry = self._conn.execute(
+            "SELECT MIN(expires_at) FROM bookings WHERE status = 'hold'").fetchone()[0]
+        self._next_expiry = next_expiry if next_expiry is not None else float("inf")
+        return cursor.rowcount > 0
+
+    def _expire_holds(self):
+        """期限切れの仮押さえがあれば削除してインデックスから外す"""
+        if time.time() >= self._next_expiry and self._purge_expired():
+            self._rebuild_index()
+
+    # ----- 登録 -----
+
+    def add_crew(self, crew_id: str, areas: Sequence[str] = (), daily_capacity: int = 3):
+        """施工班を登録（areas 省略時は全エリア対応）"""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO crews (crew_id, areas, daily_capacity) VALUES (?, ?, ?)",
+                (crew_id, json.dumps(list(areas), ensure_ascii=False), daily_capacity))
+            self.reload()
+
+    def add_holidays(self, days: Iterable[date], crew_id: str = ""):
+        """休業日を登録（crew_id 省略時は全班共通）"""
+        with self._lock:
+            rows = [(day.isoformat(), crew_id) for day in days]
+            self._conn.executemany("INSERT OR IGNORE INTO holidays (day, crew_id) VALUES (?, ?)", rows)
+            for day, _ in rows:
+                self._holidays.setdefault(crew_id, set()).add(date.fromisoformat(day))
+
+    def crews_for_area(self, area: Optional[str]) -> List[str]:
+        """エリアを担当する施工班（未指定・担当なしは全エリア対応の班、それもなければ全班）"""
+        crews = self._area_crews.get(area, []) if area else []
+        return crews + self._any_area_crews if crews or self._any_area_crews else list(self._crews)
+
+    # ----- 空き枠検索 -----
+
+    def _candidate_days(self, base: datetime) -> Iterable[date]:
+        first = base.date() + timedelta(days=self.lead_days)
+        for offset in range(self.horizon_days):
+            day = first + timedelta(days=offset)
+            if day.weekday() in self.workdays and day not in self._holidays.get("", ()):
+                yield day
+
+    def _iter_free(self, base: datetime, area: Optional[str]):
+        """空き枠を日付・時刻順に列挙（同じ日時は最初に空いている班の枠のみ）"""
+        crews = self.crews_for_area(area)
+        for day in self._candidate_days(base):
+            for hour, minute in self.slot_times:
+                start = datetime(day.year, day.month, day.day, hour, minute)
+                end = start + self.slot_length
+                start_ts, end_ts = int(start.timestamp()), int(end.timestamp())
+                for crew_id in crews:
+                    if day in self._holidays.get(crew_id, ()):
+                        continue
+                    index = self._index[crew_id]
+                    if index.day_counts.get(day, 0) >= self._crews[crew_id][1]:
+                        continue
+                    if index.is_free(start_ts, end_ts):
+                        yield SurveySlot(crew_id, start, end)
+                        break
+
+    def free_slots(self, base: Optional[datetime] = None, area: Optional[str] = None,
+                   limit: int = 5, one_per_day: bool = True) -> List[SurveySlot]:
+        """空き枠を最大 limit 件（既定は1日1枠、日付の早い順）"""
+        base = base or datetime.now()
+        slots: List[SurveySlot] = []
+        with self._lock:
+            self._expire_holds()
+            for slot in self._iter_free(base, area):
+                if one_per_day and slots and slots[-1].start.date() == slot.start.date():
+                    continue
+                slots.append(slot)
+                if len(slots) >= limit:
+                    break
+        return slots
+
+    # ----- 予約・仮押さえ -----
+
+    def _insert(self, slot: SurveySlot, inquiry_id: Optional[str], status: str,
+                expires_at: Optional[float]) -> bool:
+        """DB上でも重複がないことを確認して1枠を書き込む（トランザクション内で呼ぶ）"""
+        start_ts, end_ts = int(slot.start.timestamp()), int(slot.end.timestamp())
+        previous = self._conn.execute(
+            "SELECT end FROM bookings WHERE crew_id = ? AND start < ? ORDER BY start DESC LIMIT 1",
+            (slot.crew_id, end_ts)).fetchone()
+        if previous is not None and previous[0] > start_ts:
+            # 他プロセスが先に押さえていたので、この班のインデックスをDBから読み直す
+            self._reload_crew(slot.crew_id)
+            return False
+        self._conn.execute(
+            "INSERT INTO bookings (crew_id, start, end, inquiry_id, status, expires_at) VALUES (?, ?, ?, ?, ?, ?)",
+            (slot.crew_id, start_ts, end_ts, inquiry_id, status, expires_at))
+        self._index[slot.crew_id].add(start_ts, end_ts)
+        return True
+
+    def hold_slots(self, inquiry_id: str, base: Optional[datetime] = None, area: Optional[str] = None,
+                   count: int = 3) -> List[SurveySlot]:
+        """空き枠を count 件まで仮押さえ（1つのトランザクションで確保）
+
+        同じ問い合わせの既存の仮押さえは解放してから確保し直す。
+        """
+        base = base or datetime.now()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                if self._purge_expired():
+                    self._rebuild_index()
+                self._release(inquiry_id)
+                held: List[SurveySlot] = []
+                expires_at = time.time() + self.hold_seconds
+                for slot in self._iter_free(base, area):
+                    if held and held[-1].start.date() == slot.start.date():
+                        continue
+                    if self._insert(slot, inquiry_id, "hold", expires_at):
+                        self._next_expiry = min(self._next_expiry, expires_at)
+                        held.append(slot)
+                        if len(held) >= count:
+                            break
+                self._conn.execute("COMMIT")
+                return held
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                self._rebuild_index()
+                raise
+
+    def book(self, slot: SurveySlot, inquiry_id: Optional[str] = None) -> bool:
+        """枠を確定予約（同じ問い合わせの他の仮押さえは解放、埋まっていれば False）"""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                start_ts = int(slot.start.timestamp())
+                cursor = self._conn.execute(
+                    "DELETE FROM bookings WHERE crew_id = ? AND start = ? AND status = 'hold' AND inquiry_id IS ?",
+                    (slot.crew_id, start_ts, inquiry_id))
+                if cursor.rowcount:
+                    self._index[slot.crew_id].remove(start_ts)
+                if inquiry_id is not None:
+                    self._release(inquiry_id)
+                booked = self._insert(slot, inquiry_id, "booked", None)
+                self._conn.execute("COMMIT")
+                return booked
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                self._rebuild_index()
+                raise
+
+    def release(self, inquiry_id: str):
+        """問い合わせの仮押さえを解放"""
+        with self._lock:
+            self._release(inquiry_id)
+
+    def _release(self, inquiry_id: str):
+        rows = self._conn.execute(
+            "SELECT crew_id, start FROM bookings WHERE inquiry_id = ? AND status = 'hold'",
+            (inquiry_id,)).fetchall()
+        if rows:
+            self._conn.execute("DELETE FROM bookings WHERE inquiry_id = ? AND status = 'hold'", (inquiry_id,))
+            for crew_id, start in rows:
+                self._index[crew_id].remove(start)
+
+    def _rebuild_index(self):
+        self._index = {crew_id: _CrewIndex() for crew_id in self._crews}
+        for crew_id, start, end in self._conn.execute(
+                "SELECT crew_id, start, end FROM bookings ORDER BY crew_id, start"):
+            self._index.setdefault(crew_id, _CrewIndex()).add(start, end)
+
+    def _reload_crew(self, crew_id: str):
+        index = self._index[crew_id] = _CrewIndex()
+        for start, end in self._conn.execute(
+                "SELECT start, end FROM bookings WHERE crew_id = ? ORDER BY start", (crew_id,)):
+            index.add(start, end)
+
+    def close(self):
+        self._conn.close()
@@ -0,0 +1,101 @@
+# reel_bench.py - リール動画レンダリングのベンチマーク（フレーム/秒・ピークメモリ）
+#
+# 静的レイヤーをキャッシュする reel_renderer と、フレームごとに背景・テキストを
+# 描き直す素朴な方式のフレーム生成速度を比較し、並列エンコード全体のスループットを計測する。
+
+import argparse
+import os
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from image_renderer import ImageStyle, layout_post_text
+from reel_renderer import ReelSettings, count_frames, iter_frames, render_reels, text_offset
+
+STYLE = ImageStyle(bg_color="#90EE90", contact_email="info@exterior-example.com",
+                   contact_phone="090-1234-5678")
+
+def sample_posts(n: int):
+    """ベンチマーク用の投稿テキスト（固定シード）"""
+    import contextlib
+    import io
+
+    from main import ExteriorMarketingAI
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        return list(ExteriorMarketingAI().generate_instagram_posts(n, seed=0))
+
+def naive_frames(post_text: str, settings: ReelSettings):
+    """比較用: フレームごとに背景・フッター・表示中の全行を描き直す"""
+    import numpy as np
+    from PIL import Image, ImageDraw
+    from text_layout import FONT_SIZE, FOOTER_FONT_SIZE, get_font
+
+    font, footer_font = get_font(FONT_SIZE), get_font(FOOTER_FONT_SIZE)
+    fps = settings.fps
+    per_line = int(round(settings.line_seconds * fps))
+    layout = layout_post_text(post_text)
+    offset = text_offset(settings.size)
+    total = per_line * (len(layout) + 1) + int(round(settings.hold_seconds * fps))
+    for index in range(total):
+        visible = min(len(layout), index // per_line)
+        img = Image.new('RGB', settings.size, color=STYLE.bg_color)
+        draw = ImageDraw.Draw(img)
+        footer_y = settings.size[1] - 100
+        draw.text((50, footer_y), f"📧 {STYLE.contact_email}", fill='#666666', font=footer_font)
+        draw.text((50, footer_y + 40), f"📞 {STYLE.contact_phone}", fill='#666666', font=footer_font)
+        for y_position, line, color in layout[:visible]:
+            draw.text((50, y_position + offset), line, fill=color, font=font)
+        yield np.asarray(img)[:, :, ::-1]
+
+def measure_frames(frames) -> dict:
+    """フレーム生成のみの速度とPython側ピークメモリ"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    count = sum(1 for _ in frames)
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {"frames": count, "fps": count / elapsed, "peak_mb": peak / 1024 / 1024}
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="リール動画レンダリングのベンチマーク")
+    parser.add_argument("--clips", type=int, default=8, help="エンコードする動画本数")
+    parser.add_argument("--workers", type=int, help="エンコードプロセス数")
+    args = parser.parse_args()
+
+    settings = ReelSettings()
+    posts = sample_posts(args.clips)
+
+    # 1本目でレイヤーキャッシュを作り、残りの動画ではキャッシュを再利用する
+    cold = measure_frames(iter_frames(posts[0], STYLE, settings))
+    warm = measure_frames(frame for post in posts for frame in iter_frames(post, STYLE, settings))
+    naive = measure_frames(naive_frames(posts[0], settings))
+    print(f"🎞️ フレーム生成（キャッシュ作成時）: {cold['fps']:.0f} fps / {cold['frames']}フレーム")
+    print(f"🎞️ フレーム生成（キャッシュ利用）: {warm['fps']:.0f} fps / {warm['frames']}フレーム / "
+          f"ピーク {warm['peak_mb']:.1f}MB")
+    print(f"🎞️ フレーム生成（毎フレーム再描画）: {naive['fps']:.0f} fps / ピーク {naive['peak_mb']:.1f}MB")
+
+    with tempfile.TemporaryDirectory() as output_dir:
+        encode_settings = ReelSettings(output_dir=output_dir)
+        filenames = [f"reel_{i:03d}.mp4" for i in range(len(posts))]
+        start = time.perf_counter()
+        paths = render_reels(posts, filenames, STYLE, encode_settings, max_workers=args.workers)
+        elapsed = time.perf_counter() - start
+        total_frames = sum(count_frames(post, settings) for post in posts)
+        size_mb = sum(os.path.getsize(p) for p in paths) / 1024 / 1024
+
+    peak_rss = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+                   resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss) / 1024
+    print(f"🎬 エンコード: {len(paths)}本 / {elapsed:.2f}秒 / 約{total_frames / elapsed:.0f} fps / "
+          f"{size_mb:.1f}MB")
+    print(f"💾 ピークRSS（プロセスあたり最大）: {peak_rss:.0f}MB")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
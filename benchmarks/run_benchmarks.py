@@ -0,0 +1,372 @@
+# run_benchmarks.py - 生成処理のベンチマーク（投稿・返信・候補日・画像・日次実行）とベースライン比較
+#
+# 乱数シードと時刻を固定して各処理をバッチサイズ・テナント数ごとに計測し、
+# ベースラインJSONと比較して閾値を超える性能低下があれば終了コード1で終了する。
+# 各項目はウォームアップ後に複数回計測した中央値とばらつき（中央絶対偏差/中央値）を記録する。
+# プロセスごとの差も大きいため、ベースラインは別プロセスで複数回実行した中央値から作り、
+# 閾値は --threshold を指定しなければ、ばらつきから項目ごとに決める。
+#
+#   python benchmarks/run_benchmarks.py                    # 計測して baseline.json と比較
+#   python benchmarks/run_benchmarks.py --save-baseline    # 計測結果をベースラインとして保存
+#   python benchmarks/run_benchmarks.py --quick --only posts,replies
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+DEFAULT_BASELINE = os.path.join(REPO_ROOT, "benchmarks", "baseline.json")
+
+# 計測時の固定時刻（季節・候補日・ファイル名を毎回同じにする）
+FIXED_NOW = datetime(2026, 4, 15, 9, 0, 0)
+SEED = 20260415
+
+# 1回の計測の最短時間（短い処理は繰り返して計測誤差を抑える）
+MIN_SECONDS = 0.2
+
+# ベースライン保存時の最少計測回数・別プロセスでの実行回数
+BASELINE_REPEAT = 9
+BASELINE_RUNS = 5
+
+# ばらつきから決める閾値: max(MIN_THRESHOLD, SPREAD_FACTOR × ばらつき)
+SPREAD_FACTOR = 3.0
+MIN_THRESHOLD = 0.2
+
+# バッチサイズ・テナント数（--quick では先頭の2つだけ）
+POST_BATCHES = (100, 1000, 10000)
+REPLY_BATCHES = (100, 1000, 10000)
+DATE_BATCHES = (100, 1000)
+IMAGE_BATCHES = (1, 10, 50)
+TENANT_COUNTS = (1, 4, 16)
+
+SAMPLE_INQUIRY = {
+    "name": "田中太郎",
+    "service": "ウッドデッキ設置",
+    "content": "庭にウッドデッキを設置したいと考えています。見積もりをお願いします。"
+}
+
+def fixed_clock() -> datetime:
+    return FIXED_NOW
+
+def new_system():
+    """計測用のシステム（固定時刻）"""
+    from main import ExteriorMarketingAI
+
+    return ExteriorMarketingAI(clock=fixed_clock)
+
+def measure(func: Callable[[], int], repeat: int) -> List[float]:
+    """func（処理件数を返す）の件数/秒を repeat 回計測した値の一覧
+
+    初回は計測せずに実行し（キャッシュ・遅延importの準備）、
+    1回の計測では MIN_SECONDS 以上になるまで func を繰り返す。
+    """
+    with contextlib.redirect_stdout(io.StringIO()):
+        func()
+    rates = []
+    for _ in range(repeat):
+        random.seed(SEED)
+        count = 0
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            while True:
+                count += func()
+                elapsed = time.perf_counter() - start
+                if elapsed >= MIN_SECONDS:
+                    break
+        rates.append(count / elapsed)
+    return rates
+
+def measure_latency(func: Callable[[], object], repeat: int) -> List[float]:
+    """func を repeat 回実行した所要時間（ミリ秒）の一覧（初回はウォームアップとして除外）"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        func()
+    times = []
+    for _ in range(repeat):
+        random.seed(SEED)
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            func()
+            times.append((time.perf_counter() - start) * 1000)
+    return times
+
+# ----- 各ベンチマーク（結果名 → {"value", "unit", "higher_is_better"}） -----
+
+def bench_posts(batches, repeat) -> Dict[str, Dict]:
+    results = {}
+    ai_system = new_system()
+
+    def fill(n):
+        template = ai_system.content_templates["instagram_post"]["施工事例"][0]
+        for _ in range(n):
+            ai_system.fill_template_variables(template, "施工事例")
+        return n
+
+    def batch(n):
+        return sum(1 for _ in ai_system.generate_instagram_posts(n, seed=SEED))
+
+    for n in batches:
+        results[f"posts.fill_template_variables.n{n}"] = _rate(measure(lambda: fill(n), repeat), "posts/s")
+        results[f"posts.generate_batch.n{n}"] = _rate(measure(lambda: batch(n), repeat), "posts/s")
+    return results
+
+def bench_replies(batches, repeat) -> Dict[str, Dict]:
+    from bulk_reply import process_inquiries
+
+    results = {}
+    ai_system = new_system()
+
+    def single(n):
+        for _ in range(n):
+            ai_system.auto_email_response(SAMPLE_INQUIRY)
+        return n
+
+    def bulk(n):
+        records = ((i, dict(SAMPLE_INQUIRY, name=f"顧客{i}"), None) for i in range(n))
+        return process_inquiries(ai_system, records, io.StringIO(), seed=SEED).succeeded
+
+    for n in batches:
+        results[f"replies.auto_email_response.n{n}"] = _rate(measure(lambda: single(n), repeat), "replies/s")
+        results[f"replies.bulk.n{n}"] = _rate(measure(lambda: bulk(n), repeat), "replies/s")
+    return results
+
+def bench_dates(batches, repeat) -> Dict[str, Dict]:
+    results = {}
+    ai_system = new_system()
+
+    def dates(n):
+        for _ in range(n):
+            ai_system.generate_available_dates()
+        return n
+
+    for n in batches:
+        results[f"dates.generate_available_dates.n{n}"] = _rate(measure(lambda: dates(n), repeat), "calls/s")
+    return results
+
+def bench_images(batches, repeat) -> Dict[str, Dict]:
+    results = {}
+    ai_system = new_system()
+    with contextlib.redirect_stdout(io.StringIO()):
+        posts = list(ai_system.generate_instagram_posts(max(batches), seed=SEED))
+
+    with tempfile.TemporaryDirectory() as output_dir:
+        def single():
+            cwd = os.getcwd()
+            os.chdir(output_dir)
+            try:
+                ai_system.create_simple_image(posts[0], "daily")
+            finally:
+                os.chdir(cwd)
+            return 1
+
+        def batch(n):
+            return len(ai_system.create_simple_images(posts[:n], "bench", output_dir=output_dir, max_workers=1))
+
+        results["images.create_simple_image"] = _rate(measure(single, repeat), "images/s")
+        for n in batches:
+            results[f"images.batch.n{n}"] = _rate(measure(lambda: batch(n), repeat), "images/s")
+    return results
+
+def bench_daily(tenant_counts, repeat) -> Dict[str, Dict]:
+    from main import BusinessConfig
+    from tenant_runner import run_tenants
+
+    results = {}
+    with tempfile.TemporaryDirectory() as output_dir:
+        def single():
+            cwd = os.getcwd()
+            os.chdir(output_dir)
+            try:
+                new_system().run_daily_automation()
+            finally:
+                os.chdir(cwd)
+
+        results["daily.run_daily_automation"] = _latency(measure_latency(single, repeat))
+        for n in tenant_counts:
+            configs = {f"tenant{i:03d}": BusinessConfig(company_name=f"外構テスト{i}") for i in range(n)}
+            results[f"daily.tenants.n{n}"] = _latency(measure_latency(
+                lambda: run_tenants(configs, output_dir=output_dir, clock=fixed_clock), repeat))
+    return results
+
+def _summary(samples: List[float], digits: int, unit: str, higher_is_better: bool) -> Dict:
+    """計測値の中央値とばらつき（外れ値に強い中央絶対偏差を中央値で割った値）"""
+    median = statistics.median(samples)
+    spread = statistics.median(abs(x - median) for x in samples) / median if median else 0.0
+    return {"value": round(median, digits), "spread": round(spread, 3), "repeat": len(samples),
+            "unit": unit, "higher_is_better": higher_is_better}
+
+def _rate(samples: List[float], unit: str) -> Dict:
+    return _summary(samples, 2, unit, True)
+
+def _latency(samples: List[float]) -> Dict:
+    return _summary(samples, 3, "ms", False)
+
+BENCHMARKS = {
+    "posts": (bench_posts, POST_BATCHES),
+    "replies": (bench_replies, REPLY_BATCHES),
+    "dates": (bench_dates, DATE_BATCHES),
+    "images": (bench_images, IMAGE_BATCHES),
+    "daily": (bench_daily, TENANT_COUNTS),
+}
+
+# ----- ベースライン -----
+
+def environment() -> Dict:
+    """計測環境（ベースラインとの比較可否の目安）"""
+    return {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "system": platform.system(),
+        "cpus": os.cpu_count(),
+    }
+
+def save_baseline(results: Dict[str, Dict], path: str):
+    """計測結果をベースラインとして保存（一時ファイル経由で置き換え）"""
+    document = {
+        "generated_at": datetime.now().isoformat(timespec="seconds"),
+        "environment": environment(),
+        "results": results
+    }
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(document, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+def allowed_change(current: Dict, base: Dict, threshold: Optional[float]) -> float:
+    """許容する性能低下の割合（threshold 未指定時はベースライン・今回のばらつきの大きい方から決める）"""
+    if threshold is not None:
+        return threshold
+    spread = max(base.get("spread", 0.0), current.get("spread", 0.0))
+    return max(MIN_THRESHOLD, SPREAD_FACTOR * spread)
+
+def compare(results: Dict[str, Dict], baseline: Dict[str, Dict],
+            threshold: Optional[float] = None) -> List[str]:
+    """ベースラインより許容範囲以上遅くなった項目の一覧"""
+    regressions = []
+    for name, current in results.items():
+        base = baseline.get(name)
+        if base is None or not base["value"]:
+            continue
+        if current["higher_is_better"]:
+            change = 1 - current["value"] / base["value"]
+        else:
+            change = current["value"] / base["value"] - 1
+        allowed = allowed_change(current, base, threshold)
+        if change > allowed:
+            regressions.append(f"{name}: {base['value']} → {current['value']} {current['unit']} "
+                               f"({change:.0%} 低下 / 許容 {allowed:.0%})")
+    return regressions
+
+def run(names: List[str], quick: bool, repeat: int) -> Dict[str, Dict]:
+    results = {}
+    for name in names:
+        func, sizes = BENCHMARKS[name]
+        results.update(func(sizes[:2] if quick else sizes, repeat))
+    return results
+
+def run_isolated(names: List[str], quick: bool, repeat: int, runs: int) -> Dict[str, Dict]:
+    """別プロセスで runs 回計測し、項目ごとの中央値とばらつき（プロセス間・プロセス内の大きい方）を集計"""
+    import subprocess
+
+    samples: Dict[str, List[Dict]] = {}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for i in range(runs):
+            output = os.path.join(tmp_dir, f"run{i}.json")
+            command = [sys.executable, os.path.abspath(__file__), "--only", ",".join(names),
+                       "--repeat", str(repeat), "--runs", "1", "--output", output,
+                       "--baseline", os.path.join(tmp_dir, "none.json")]
+            if quick:
+                command.append("--quick")
+            subprocess.run(command, check=True, stdout=subprocess.DEVNULL)
+            with open(output, encoding="utf-8") as f:
+                for name, result in json.load(f)["results"].items():
+                    samples.setdefault(name, []).append(result)
+
+    results = {}
+    for name, per_run in samples.items():
+        values = [result["value"] for result in per_run]
+        if per_run[0]["higher_is_better"]:
+            summary = _rate(values, per_run[0]["unit"])
+        else:
+            summary = _latency(values)
+        summary["spread"] = max(summary["spread"], statistics.median(r["spread"] for r in per_run))
+        summary["repeat"] = sum(r["repeat"] for r in per_run)
+        summary["runs"] = len(per_run)
+        results[name] = summary
+    return results
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="生成処理のベンチマークとベースライン比較")
+    parser.add_argument("--only", help=f"実行するベンチマーク（カンマ区切り: {','.join(BENCHMARKS)}）")
+    parser.add_argument("--quick", action="store_true", help="小さいバッチサイズ・テナント数だけ計測")
+    parser.add_argument("--repeat", type=int, default=5,
+                        help=f"各項目の計測回数（--save-baseline 時は最低 {BASELINE_REPEAT} 回）")
+    parser.add_argument("--runs", type=int,
+                        help=f"別プロセスでの実行回数（既定: --save-baseline 時は {BASELINE_RUNS}、それ以外は1）")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="ベースラインJSONのパス")
+    parser.add_argument("--save-baseline", action="store_true", help="計測結果をベースラインとして保存")
+    parser.add_argument("--threshold", type=float,
+                        help="許容する性能低下の割合（未指定時は項目ごとのばらつきから決める）")
+    parser.add_argument("--output", help="計測結果JSONの出力先")
+    args = parser.parse_args(argv)
+
+    names = args.only.split(",") if args.only else list(BENCHMARKS)
+    unknown = [name for name in names if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"不明なベンチマーク: {', '.join(unknown)}")
+
+    repeat = max(args.repeat, BASELINE_REPEAT) if args.save_baseline else args.repeat
+    runs = args.runs or (BASELINE_RUNS if args.save_baseline else 1)
+    if runs > 1:
+        results = run_isolated(names, args.quick, repeat, runs)
+    else:
+        results = run(names, args.quick, repeat)
+    for name, result in results.items():
+        print(f"⏱️ {name}: {result['value']} {result['unit']}（ばらつき {result['spread']:.0%}）")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"environment": environment(), "results": results}, f, ensure_ascii=False, indent=2)
+
+    if args.save_baseline:
+        # 一部だけ計測した場合は既存のベースラインに上書きマージする
+        merged = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline, encoding="utf-8") as f:
+                merged = json.load(f)["results"]
+        merged.update(results)
+        save_baseline(merged, args.baseline)
+        print(f"💾 ベースライン保存: {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"⚠️ ベースラインがありません（--save-baseline で作成）: {args.baseline}")
+        return 0
+
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    if baseline.get("environment") != environment():
+        print(f"⚠️ ベースラインと計測環境が異なります: {baseline.get('environment')}")
+    regressions = compare(results, baseline["results"], args.threshold)
+    threshold_label = f"閾値 {args.threshold:.0%}" if args.threshold is not None else "閾値はばらつきから算出"
+    if regressions:
+        print(f"❌ 性能低下（{threshold_label}）:")
+        for line in regressions:
+            print(f"  - {line}")
+        return 1
+    print(f"✅ ベースライン比較 OK（{threshold_label}）")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
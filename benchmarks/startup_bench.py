@@ -0,0 +1,102 @@
+# startup_bench.py - 起動時間ガード（python -X importtime による計測）
+#
+# main のimportと ExteriorMarketingAI() の生成で
+#   ・重いライブラリがimportされていないこと
+#   ・標準出力への出力（I/O）がないこと
+#   ・import時間が予算内であること
+# を確認し、違反があれば終了コード1で終了する。
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 起動パスでimportしてはいけないライブラリ（トップレベルパッケージ名）
+HEAVY_MODULES = (
+    "PIL", "numpy", "pandas", "matplotlib", "seaborn", "cv2", "moviepy",
+    "selenium", "google", "bs4", "requests", "urllib3", "youtube_dl", "sqlite3"
+)
+
+SNIPPET = """
+import contextlib, io, json, time
+buf = io.StringIO()
+with contextlib.redirect_stdout(buf):
+    t0 = time.perf_counter()
+    import main
+    t1 = time.perf_counter()
+    main.ExteriorMarketingAI()
+    t2 = time.perf_counter()
+print(json.dumps({"import_ms": (t1 - t0) * 1000, "construct_ms": (t2 - t1) * 1000,
+                  "stdout": buf.getvalue()}))
+"""
+
+def parse_importtime(stderr: str) -> List[Tuple[int, int, str, int]]:
+    """importtime出力を (self_us, cumulative_us, モジュール名, ネスト深さ) のリストに変換"""
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, raw_name = line[len("import time:"):].split("|")
+        depth = (len(raw_name) - len(raw_name.lstrip(" ")) - 1) // 2
+        entries.append((int(self_us), int(cumulative_us), raw_name.strip(), depth))
+    return entries
+
+def modules_after_startup(entries: List[Tuple[int, int, str, int]]) -> List[Tuple[int, int, str, int]]:
+    """インタプリタ起動・計測スニペット分を除いた、main以降にimportされたモジュール"""
+    main_index = next(i for i, entry in enumerate(entries) if entry[2] == "main" and entry[3] == 0)
+    start = main_index
+    while start > 0 and entries[start - 1][3] > 0:
+        start -= 1
+    return entries[start:]
+
+def run_once() -> Dict:
+    """1回分の計測"""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", SNIPPET],
+        cwd=REPO_ROOT, capture_output=True, text=True, check=True
+    )
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+    entries = modules_after_startup(parse_importtime(proc.stderr))
+    result["modules"] = [name for _, _, name, _ in entries]
+    result["import_us"] = sum(self_us for self_us, _, _, _ in entries)
+    return result
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="起動時間ガード")
+    parser.add_argument("--runs", type=int, default=5, help="計測回数（中央値で判定）")
+    parser.add_argument("--max-import-ms", type=float, default=60.0, help="import時間の上限(ms)")
+    args = parser.parse_args()
+
+    results = [run_once() for _ in range(args.runs)]
+    import_ms = statistics.median(r["import_us"] for r in results) / 1000
+    construct_ms = statistics.median(r["construct_ms"] for r in results)
+    modules = results[-1]["modules"]
+
+    heavy = sorted({m.split(".")[0] for m in modules if m.split(".")[0] in HEAVY_MODULES})
+    printed = results[-1]["stdout"]
+
+    print(f"⏱️ import時間(中央値): {import_ms:.1f}ms / 上限 {args.max_import_ms:.1f}ms")
+    print(f"⏱️ 初期化時間(中央値): {construct_ms:.3f}ms")
+    print(f"📦 importモジュール数: {len(modules)}")
+
+    errors = []
+    if heavy:
+        errors.append(f"重いライブラリがimportされています: {', '.join(heavy)}")
+    if printed:
+        errors.append(f"import・初期化時に標準出力へ出力しています: {printed[:80]!r}")
+    if import_ms > args.max_import_ms:
+        errors.append(f"import時間が上限を超えています: {import_ms:.1f}ms")
+
+    for error in errors:
+        print(f"❌ {error}")
+    if not errors:
+        print("✅ 起動時間ガード OK")
+    return 1 if errors else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,172 @@
+# bulk_reply.py - 問い合わせ一括自動返信（JSONL/CSV ストリーミング処理）
+
+import csv
+import json
+import random
+import sys
+import uuid
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from typing import Dict, IO, Iterator, Optional, Tuple
+
+# 入力1件分: (行番号, 問い合わせデータ, 読み込みエラー)
+InquiryRecord = Tuple[int, Optional[Dict], Optional[Exception]]
+
+@dataclass
+class BulkReplyStats:
+    """一括返信の処理結果集計"""
+    total: int = 0
+    succeeded: int = 0
+    failed: int = 0
+    errors: Dict[str, int] = field(default_factory=dict)
+
+    def add_error(self, error: Exception):
+        self.failed += 1
+        name = type(error).__name__
+        self.errors[name] = self.errors.get(name, 0) + 1
+
+class DailyReplyBlocks:
+    """候補日ブロックと署名を日付単位でキャッシュ"""
+
+    def __init__(self, ai_system):
+        self.ai_system = ai_system
+        self.company_signature = ai_system.get_company_signature()
+        self._day: Optional[date] = None
+        self._available_dates = ""
+
+    def available_dates(self, now: datetime) -> str:
+        """日付が変わったときだけ候補日を再計算"""
+        if now.date() != self._day:
+            self._day = now.date()
+            self._available_dates = self.ai_system.generate_available_dates(now)
+        return self._available_dates
+
+def hold_id(inquiry: Dict) -> str:
+    """仮押さえのキー（問い合わせの id、なければ新規のUUID）
+
+    同じキーで仮押さえすると前回の枠が解放されるため、行番号など
+    実行ごとに重複しうる値は使わない。
+    """
+    return str(inquiry.get('id') or uuid.uuid4().hex)
+
+def hold_available_dates(ai_system, inquiry: Dict, now: datetime) -> Tuple[str, str, list]:
+    """空き枠を問い合わせごとに仮押さえし、候補日ブロック・仮押さえキー・押さえた枠を返す"""
+    from availability import format_slots
+    from main import NO_AVAILABLE_DATES
+
+    key = hold_id(inquiry)
+    slots = ai_system.availability.hold_slots(key, now, inquiry.get('area'))
+    held = [{"crew": slot.crew_id, "start": slot.start.isoformat(), "end": slot.end.isoformat()}
+            for slot in slots]
+    return (format_slots(slots) if slots else NO_AVAILABLE_DATES), key, held
+
+def detect_format(path: str) -> str:
+    """拡張子から入力形式を判定"""
+    return "csv" if path.lower().endswith(".csv") else "jsonl"
+
+def iter_jsonl(stream: IO[str]) -> Iterator[InquiryRecord]:
+    """JSONLを1行ずつ読み込む（空行はスキップ）"""
+    for line_no, line in enumerate(stream, 1):
+        if not line.strip():
+            continue
+        try:
+            yield line_no, json.loads(line), None
+        except json.JSONDecodeError as e:
+            yield line_no, None, e
+
+def iter_csv(stream: IO[str]) -> Iterator[InquiryRecord]:
+    """CSVを1行ずつ読み込む（1行目はヘッダー）"""
+    reader = csv.DictReader(stream)
+    while True:
+        # 1行ずつ読み進め、壊れた行はエラーとして記録して次の行へ進む
+        # （DictReader.line_num は成功時しか更新されないので内部の reader の行番号を使う）
+        line_num = reader.reader.line_num
+        try:
+            row = next(reader)
+        except StopIteration:
+            return
+        except csv.Error as e:
+            if reader.reader.line_num == line_num:
+                # 読み進められない場合は無限ループを避けて終了
+                yield line_num, None, e
+                return
+            yield reader.reader.line_num, None, e
+            continue
+        yield reader.line_num, row, None
+
+def iter_inquiries(stream: IO[str], fmt: str = "jsonl") -> Iterator[InquiryRecord]:
+    """入力形式に応じた問い合わせイテレータ"""
+    if fmt == "csv":
+        return iter_csv(stream)
+    if fmt == "jsonl":
+        return iter_jsonl(stream)
+    raise ValueError(f"未対応の入力形式: {fmt}")
+
+def process_inquiries(ai_system, records: Iterator[InquiryRecord], out: IO[str],
+                      seed: Optional[int] = None) -> BulkReplyStats:
+    """問い合わせを逐次処理し、返信をJSONLで書き出す（メモリ使用量は一定）"""
+    blocks = DailyReplyBlocks(ai_system)
+    rng = random.Random(seed)
+    stats = BulkReplyStats()
+
+    for line_no, inquiry, error in records:
+        stats.total += 1
+        result = {"line": line_no}
+        try:
+            if error is not None:
+                raise error
+            if not isinstance(inquiry, dict):
+                raise TypeError(f"問い合わせデータは辞書である必要があります: {type(inquiry).__name__}")
+            # 空き枠エンジン有効時は実際に空いている枠を1件ずつ仮押さえ、なければ日単位の共通ブロック
+            if ai_system.availability is not None:
+                available_dates, result["hold_id"], result["held_slots"] = hold_available_dates(
+                    ai_system, inquiry, ai_system.clock())
+            else:
+                available_dates = blocks.available_dates(ai_system.clock())
+            reply = ai_system.render_inquiry_reply(
+                inquiry,
+                available_dates=available_dates,
+                company_signature=blocks.company_signature,
+                rng=rng
+            )
+            result.update(ok=True, name=inquiry.get('name'), reply=reply)
+            stats.succeeded += 1
+        except Exception as e:
+            # 1件の失敗で全体を止めず、レコード単位でエラーを記録
+            result.update(ok=False, error_type=type(e).__name__, error=str(e))
+            stats.add_error(e)
+        out.write(json.dumps(result, ensure_ascii=False) + "\n")
+
+    return stats
+
+def run_bulk_reply(ai_system, input_path: str = "-", output_path: str = "-",
+                   fmt: Optional[str] = None, seed: Optional[int] = None) -> BulkReplyStats:
+    """ファイル（または標準入出力）間で一括返信を実行"""
+    fmt = fmt or detect_format(input_path)
+    source = sys.stdin if input_path == "-" else open(input_path, encoding="utf-8", newline="")
+    sink = sys.stdout if output_path == "-" else open(output_path, "w", encoding="utf-8")
+    try:
+        return process_inquiries(ai_system, iter_inquiries(source, fmt), sink, seed=seed)
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if sink is not sys.stdout:
+            sink.close()
+
+if __name__ == "__main__":
+    import argparse
+    from main import ExteriorMarketingAI
+
+    parser = argparse.ArgumentParser(description="問い合わせ一括自動返信")
+    parser.add_argument("input", nargs="?", default="-", help="入力ファイル（JSONL/CSV、- で標準入力）")
+    parser.add_argument("-o", "--output", default="-", help="出力JSONLファイル（- で標準出力）")
+    parser.add_argument("--format", choices=["jsonl", "csv"], help="入力形式（省略時は拡張子で判定）")
+    parser.add_argument("--seed", type=int, help="乱数シード")
+    parser.add_argument("--availability-db", help="現地調査の予約DB（指定時は空き枠を問い合わせごとに仮押さえ）")
+    args = parser.parse_args()
+
+    ai_system = ExteriorMarketingAI()
+    if args.availability_db:
+        ai_system.enable_availability(args.availability_db)
+    stats = run_bulk_reply(ai_system, args.input, args.output, args.format, args.seed)
+    print(f"✉️ 一括返信完了: {stats.succeeded}/{stats.total}件 (エラー {stats.failed}件)", file=sys.stderr)
@@ -0,0 +1,217 @@
+# content_history.py - 投稿重複防止（公開済みコンテンツ指紋の履歴と未使用組み合わせ抽出）
+
+import hashlib
+import json
+import os
+import random
+import time
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+# 抽出候補: (テンプレート番号, 組み合わせインデックス, 指紋)
+Combination = Tuple[int, int, str]
+
+def fingerprint(plan, index: int) -> str:
+    """テンプレート原文とランダム変数の値タプルから指紋を作成（8バイト）
+
+    季節・トレンドハッシュタグなどの固定値は含めないので、トレンド反映や季節の切り替えで
+    履歴がリセットされることはない。
+    """
+    payload = "\x1f".join((plan.key, *plan.values_at(index)))
+    return hashlib.blake2b(payload.encode("utf-8"), digest_size=8).hexdigest()
+
+# 追記ログがこの件数（かつ履歴件数）を超えたらスナップショットに書き直す
+COMPACT_MIN_ENTRIES = 1000
+
+class ContentHistory:
+    """公開済みコンテンツの指紋履歴（保持期間を過ぎたものは自動削除）
+
+    保存は新しい指紋を追記ログ（<path>.log）に足すだけで、ログが大きくなったときだけ
+    スナップショット（<path>）に書き直す。1件ごとに保存しても履歴全体は書き直さない。
+    """
+
+    def __init__(self, path: Optional[str] = None, retention_days: float = 30,
+                 clock: Callable[[], float] = time.time):
+        self.path = path
+        self.retention = retention_days * 24 * 3600
+        self.clock = clock
+        self._entries: Dict[str, float] = {}
+        self._unsaved: Dict[str, float] = {}
+        self._journal_entries = 0
+        if path and (os.path.exists(path) or os.path.exists(self.journal_path)):
+            self.load()
+
+    @property
+    def journal_path(self) -> str:
+        return f"{self.path}.log"
+
+    def __contains__(self, fp: str) -> bool:
+        seen_at = self._entries.get(fp)
+        return seen_at is not None and self.clock() - seen_at <= self.retention
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def last_seen(self, fp: str) -> float:
+        """最終使用時刻（未使用は0）"""
+        return self._entries.get(fp, 0.0)
+
+    def add(self, fp: str):
+        """使用済みとして記録"""
+        self._entries[fp] = self._unsaved[fp] = self.clock()
+
+    def evict(self):
+        """保持期間切れの指紋を削除"""
+        cutoff = self.clock() - self.retention
+        self._entries = {fp: ts for fp, ts in self._entries.items() if ts >= cutoff}
+
+    def load(self):
+        """履歴ファイル（スナップショット＋追記ログ）読み込み"""
+        self._entries = {}
+        if os.path.exists(self.path):
+            with open(self.path, encoding="utf-8") as f:
+                self._entries = {fp: float(ts) for fp, ts in json.load(f).get("entries", {}).items()}
+        self._journal_entries = 0
+        if os.path.exists(self.journal_path):
+            with open(self.journal_path, encoding="utf-8") as f:
+                for line in f:
+                    fp, _, ts = line.rstrip("\n").partition("\t")
+                    if not ts:
+                        # 書き込み途中で終わった最終行は無視
+                        continue
+                    self._entries[fp] = max(self._entries.get(fp, 0.0), float(ts))
+                    self._journal_entries += 1
+        self._unsaved = {}
+        self.evict()
+
+    def save(self):
+        """未保存の指紋を追記ログに書き足す（ログが大きくなったらスナップショットに書き直す）"""
+        if not self.path or not self._unsaved:
+            return
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(self.journal_path, "a", encoding="utf-8") as f:
+            f.write("".join(f"{fp}\t{int(ts)}\n" for fp, ts in self._unsaved.items()))
+        self._journal_entries += len(self._unsaved)
+        self._unsaved = {}
+        if self._journal_entries > max(COMPACT_MIN_ENTRIES, len(self._entries)):
+            self.compact()
+
+    def compact(self):
+        """履歴全体をスナップショットに書き直して追記ログを空にする（一時ファイル経由で置き換え）"""
+        if not self.path:
+            return
+        self.evict()
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": 1, "entries": {fp: int(ts) for fp, ts in self._entries.items()}},
+                      f, separators=(",", ":"))
+        os.replace(tmp_path, self.path)
+        # スナップショットに全件含まれるので、ここで落ちてもログの再適用は無害
+        if os.path.exists(self.journal_path):
+            os.remove(self.journal_path)
+        self._unsaved = {}
+        self._journal_entries = 0
+
+def tenant_history(directory: str, tenant_id: str, retention_days: float = 30) -> ContentHistory:
+    """テナントごとの履歴（<directory>/<tenant_id>.json）"""
+    return ContentHistory(os.path.join(directory, f"{tenant_id}.json"), retention_days)
+
+class UniqueCombinationSampler:
+    """組み合わせ空間を一度だけ列挙し、未使用の組み合わせを非復元抽出する
+
+    投稿タイプごとに未使用の組み合わせをシャッフルした山を作り、末尾から取り出す
+    （1件あたり投稿タイプ数に比例、組み合わせ数には依存しない）。
+    全タイプの未使用分が尽きたら、全組み合わせを最終使用時刻の古い順に並べ直して一巡ずつ再利用する。
+    """
+
+    def __init__(self, type_plans: Sequence[Sequence], history: ContentHistory,
+                 rng: Optional[random.Random] = None):
+        self.type_plans = type_plans
+        self.history = history
+        self.rng = rng or random.Random()
+        self._combinations = [self._enumerate(plans) for plans in type_plans]
+        self._pools: List[List[Combination]] = []
+        self._fresh: List[bool] = []
+        for combinations in self._combinations:
+            pool = [c for c in combinations if c[2] not in history]
+            self.rng.shuffle(pool)
+            self._pools.append(pool)
+            self._fresh.append(True)
+
+    @staticmethod
+    def _enumerate(plans) -> List[Combination]:
+        return [
+            (plan_index, index, fingerprint(plan, index))
+            for plan_index, plan in enumerate(plans)
+            for index in range(plan.size)
+        ]
+
+    def _refill(self, type_index: int):
+        """全組み合わせを最終使用の古い順（pop順）で山に戻す"""
+        pool = list(self._combinations[type_index])
+        self.rng.shuffle(pool)
+        pool.sort(key=lambda c: self.history.last_seen(c[2]), reverse=True)
+        self._pools[type_index] = pool
+        self._fresh[type_index] = False
+
+    def _pick_type(self, refill: bool = True) -> Optional[int]:
+        """組み合わせが残っている投稿タイプから一様に選ぶ（全タイプ尽きたら一巡分を補充）"""
+        candidates = [i for i, pool in enumerate(self._pools) if pool]
+        if not candidates and not refill:
+            return None
+        if not candidates:
+            for type_index in range(len(self._pools)):
+                self._refill(type_index)
+            candidates = [i for i, pool in enumerate(self._pools) if pool]
+            if not candidates:
+                raise ValueError("投稿の組み合わせがありません")
+        return candidates[int(self.rng.random() * len(candidates))]
+
+    def _pop(self, refill: bool = True) -> Optional[Tuple[int, Combination]]:
+        """山から組み合わせを1件取り出す（投稿タイプ番号, 組み合わせ）、refill=False で尽きたらNone"""
+        while True:
+            type_index = self._pick_type(refill)
+            if type_index is None:
+                return None
+            combination = self._pools[type_index].pop()
+            # 他の抽出器で使用済みになったものは読み飛ばす
+            if not self._fresh[type_index] or combination[2] not in self.history:
+                return type_index, combination
+
+    def render(self, picked: Tuple[int, Combination]) -> str:
+        """取り出した組み合わせを描画"""
+        type_index, (plan_index, index, _) = picked
+        return self.type_plans[type_index][plan_index].render_index(index)
+
+    def draw(self) -> str:
+        """未使用の組み合わせを1件描画して履歴に記録"""
+        picked = self._pop()
+        self.history.add(picked[1][2])
+        return self.render(picked)
+
+    def draw_candidates(self, n: int) -> List[Tuple[int, Combination]]:
+        """未使用の組み合わせを最大n件取り出す（履歴には記録しない、accept で1件を確定）
+
+        山の補充は最初の1件でだけ行うので、候補が重複することはない。
+        """
+        picked = [self._pop()]
+        while len(picked) < n:
+            item = self._pop(refill=False)
+            if item is None:
+                break
+            picked.append(item)
+        return picked
+
+    def accept(self, chosen: Tuple[int, Combination], picked: Sequence[Tuple[int, Combination]]):
+        """候補のうち chosen を履歴に記録し、残りを山に戻す"""
+        self.history.add(chosen[1][2])
+        returned: Dict[int, List[Combination]] = {}
+        for item in reversed(picked):
+            if item is not chosen:
+                returned.setdefault(item[0], []).append(item[1])
+        for type_index, combinations in returned.items():
+            pool = self._pools[type_index]
+            pool.extend(combinations)
+            # 未使用の山は混ぜ直し、補充後の山（最終使用の古い順）は元の並びのまま戻す
+            if self._fresh[type_index]:
+                self.rng.shuffle(pool)
@@ -0,0 +1,554 @@
+# daemon.py - 常駐モード（テナント別スケジューラ・設定/テンプレートのホットリロード・問い合わせ受付HTTP）
+#
+# GitHub Actions の cron 起動（毎回ランナー作成・依存インストール・コールドスタート）の代わりに、
+# 1プロセスで ExteriorMarketingAI をテナントごとに保持したまま、
+#   ・cron形式のスケジュールでテナントごとの日次自動化を実行
+#   ・テナント設定・スケジュール・テンプレートのファイル更新を検知して再読み込み
+#   ・HTTP（POST /inquiries）で問い合わせを受け付けて即時に返信本文を返す
+# を行う。SIGTERM / SIGINT では新規受付を止め、実行中のジョブを待ってから終了する。
+#
+#   python daemon.py --tenants tenants/ --schedules schedules.json --port 8080
+
+import asyncio
+import json
+import os
+import signal
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, FrozenSet, Optional, Set, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from main import BusinessConfig, ExteriorMarketingAI
+
+# 既定スケジュール: ワークフロー（.github/workflows/ai-marketing-v53.yml）と同じcron式。
+# GitHub Actions と同じく既定ではUTCで評価する（--local-time でローカル時刻）
+DEFAULT_SCHEDULE = "0 23,3,8 * * 1-6"
+
+# HTTPリクエストの上限・読み込みタイムアウト（秒）
+MAX_HEADER_BYTES = 16 * 1024
+MAX_BODY_BYTES = 1024 * 1024
+REQUEST_TIMEOUT = 10.0
+
+_HTTP_STATUS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+                408: "Request Timeout", 413: "Payload Too Large", 500: "Internal Server Error",
+                503: "Service Unavailable"}
+
+class BadRequest(ValueError):
+    """リクエストの形式・内容の誤り（400で返す）"""
+
+class CronSchedule:
+    """cron形式（分 時 日 月 曜日）のスケジュール
+
+    各フィールドは * / 数値 / 範囲(a-b) / リスト(a,b) / 間隔(*/n, a-b/n) に対応。
+    曜日は 0=日曜（7も日曜）。日と曜日の両方を指定した場合はどちらかに一致すれば実行する。
+    """
+
+    FIELDS = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 6))
+
+    def __init__(self, expression: str):
+        parts = expression.split()
+        if len(parts) != 5:
+            raise ValueError(f"cron形式は5フィールドです: {expression}")
+        self.expression = expression
+        self.minutes, self.hours, self.days, self.months, weekdays = (
+            self._parse_field(part, low, high + (1 if i == 4 else 0))
+            for i, (part, (low, high)) in enumerate(zip(parts, self.FIELDS))
+        )
+        self.weekdays = frozenset(day % 7 for day in weekdays)
+        self._any_day = parts[2] == "*"
+        self._any_weekday = parts[4] == "*"
+
+    @staticmethod
+    def _parse_field(field: str, low: int, high: int) -> FrozenSet[int]:
+        values = set()
+        for item in field.split(","):
+            spec, _, step = item.partition("/")
+            step = int(step) if step else 1
+            if spec == "*":
+                start, end = low, high
+            elif "-" in spec:
+                start, end = (int(v) for v in spec.split("-", 1))
+            else:
+                start = int(spec)
+                end = high if step > 1 else start
+            if not low <= start <= end <= high or step < 1:
+                raise ValueError(f"cronフィールドが範囲外です: {field}")
+            values.update(range(start, end + 1, step))
+        return frozenset(values)
+
+    def _day_matches(self, day: datetime) -> bool:
+        if day.month not in self.months:
+            return False
+        dom = day.day in self.days
+        dow = (day.weekday() + 1) % 7 in self.weekdays
+        if self._any_day or self._any_weekday:
+            return dom and dow
+        return dom or dow
+
+    def next_after(self, now: datetime) -> datetime:
+        """now より後の最初の実行時刻"""
+        start = now.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        day = start.replace(hour=0, minute=0)
+        hours, minutes = sorted(self.hours), sorted(self.minutes)
+        for _ in range(366 * 5):
+            if self._day_matches(day):
+                for hour in hours:
+                    for minute in minutes:
+                        candidate = day.replace(hour=hour, minute=minute)
+                        if candidate >= start:
+                            return candidate
+            day += timedelta(days=1)
+        raise ValueError(f"実行時刻が見つかりません: {self.expression}")
+
+def _mtime(path: Optional[str]) -> Optional[Tuple]:
+    """ファイル（ディレクトリなら中の全ファイル）の更新時刻の指紋"""
+    if not path or not os.path.exists(path):
+        return None
+    if os.path.isdir(path):
+        return tuple(sorted((entry.name, entry.stat().st_mtime_ns) for entry in os.scandir(path)
+                            if entry.is_file()))
+    return (os.stat(path).st_mtime_ns,)
+
+def _load_json(path: str):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+class MarketingDaemon:
+    """常駐プロセス本体（テナントごとのシステムを保持）"""
+
+    def __init__(self, tenants_path: Optional[str] = None, schedules_path: Optional[str] = None,
+                 templates_path: Optional[str] = None, default_schedule: str = DEFAULT_SCHEDULE,
+                 host: str = "127.0.0.1", port: int = 8080, poll_seconds: float = 5.0,
+                 drain_seconds: float = 60.0, v53: bool = False,
+                 availability_db: Optional[str] = None, run_log: Optional[str] = None,
+                 history_dir: Optional[str] = None, llm: bool = False, schedule_utc: bool = True, clock: Optional[Callable[[], datetime]] = None):
+        self.tenants_path = tenants_path
+        self.schedules_path = schedules_path
+        self.templates_path = templates_path
+        self.default_schedule = CronSchedule(default_schedule)
+        self.host = host
+        self.port = port
+        self.poll_seconds = poll_seconds
+        self.drain_seconds = drain_seconds
+        self.v53 = v53
+        self.availability_db = availability_db
+        self.run_log = run_log
+        self.history_dir = history_dir
+        self.llm = llm
+        self.schedule_utc = schedule_utc
+        self.clock = clock or datetime.now
+
+        self.configs: Dict[str, BusinessConfig] = {}
+        self.schedules: Dict[str, CronSchedule] = {}
+        self.templates: Optional[Dict] = None
+        self.systems: Dict[str, ExteriorMarketingAI] = {}
+        self._engines: Dict[str, object] = {}
+        self._reply_blocks: Dict[str, object] = {}
+        self._availability = None
+        # テナントごとのLLMクライアント（設定の再読み込みでは作り直さず、終了時に閉じる）
+        self._llm_clients: Dict[str, object] = {}
+        self._mtimes: Dict[str, Optional[Tuple]] = {}
+
+        self._stopping: Optional[asyncio.Event] = None
+        self._tenant_locks: Dict[str, asyncio.Lock] = {}
+        self._schedule_tasks: Dict[str, asyncio.Task] = {}
+        self._inflight: Set[asyncio.Future] = set()
+        self._server: Optional[asyncio.AbstractServer] = None
+        # 日次自動化・問い合わせ返信（SQLite含む）は同期処理なのでイベントループを止めないようスレッドで実行
+        self._executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="daily")
+        self._reply_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="reply")
+
+    # ----- 設定の読み込み -----
+
+    def reload(self, force: bool = False) -> bool:
+        """設定・スケジュール・テンプレートのファイル更新を検知して再読み込み（変更があれば True）"""
+        changed = False
+        for name, path, loader in (("templates", self.templates_path, self._load_templates),
+                                   ("tenants", self.tenants_path, self._load_tenants),
+                                   ("schedules", self.schedules_path, self._load_schedules)):
+            mtime = _mtime(path)
+            if not force and mtime == self._mtimes.get(name):
+                continue
+            self._mtimes[name] = mtime
+            try:
+                loader()
+            except Exception as e:
+                # 読み込み失敗時は前回の設定のまま動かし続け、次にファイルが更新されたら再試行する
+                print(f"⚠️ 再読み込みエラー（{name}）: {e}")
+                continue
+            changed = True
+        return changed
+
+    def _load_templates(self):
+        self.templates = _load_json(self.templates_path) if self.templates_path else None
+        for system in self.systems.values():
+            system.set_templates(self.templates)
+        if self.templates_path:
+            print(f"📝 テンプレート読み込み: {self.templates_path}")
+
+    def _load_tenants(self):
+        from tenant_runner import load_tenant_configs
+
+        errors: Dict[str, str] = {}
+        configs = load_tenant_configs(self.tenants_path, errors=errors) if self.tenants_path else {}
+        for name, error in errors.items():
+            print(f"⚠️ テナント設定エラー（{name}）: {error}")
+        if not configs and not errors:
+            configs = {"default": BusinessConfig()}
+
+        for tenant_id in set(self.configs) - set(configs) - set(errors):
+            self._drop_tenant(tenant_id)
+        for tenant_id, config in configs.items():
+            if self.configs.get(tenant_id) != config:
+                self._add_tenant(tenant_id, config)
+        print(f"🏢 テナント数: {len(self.systems)}")
+
+    def _load_schedules(self):
+        raw = _load_json(self.schedules_path) if self.schedules_path else {}
+        self.schedules = {tenant_id: CronSchedule(expression) for tenant_id, expression in raw.items()}
+        self._restart_schedules()
+
+    def _add_tenant(self, tenant_id: str, config: BusinessConfig):
+        """テナントのシステムを作成（設定変更時は作り直し、トレンド・投稿履歴は引き継ぐ）"""
+        previous = self.systems.get(tenant_id)
+        history = previous.history if previous is not None else None
+        if history is None and self.history_dir:
+            from content_history import tenant_history
+            history = tenant_history(self.history_dir, tenant_id)
+        system = ExteriorMarketingAI(config=config, clock=self.clock, history=history)
+        if self.llm:
+            self._llm_clients[tenant_id] = system.enable_llm(client=self._llm_clients.get(tenant_id))
+        if previous is not None:
+            system.apply_trends(previous.trend_keywords, previous.trend_hashtags, previous.hashtag_weights)
+        if self.templates is not None:
+            system.set_templates(self.templates)
+        if self.availability_db:
+            # 予約DBは全テナントで1つのエンジンを共有
+            if self._availability is None:
+                self._availability = system.enable_availability(self.availability_db)
+            system.availability = self._availability
+        self.configs[tenant_id] = config
+        self.systems[tenant_id] = system
+        self._engines.pop(tenant_id, None)
+        self._reply_blocks.pop(tenant_id, None)
+        self._restart_schedule(tenant_id)
+
+    def _drop_tenant(self, tenant_id: str):
+        task = self._schedule_tasks.pop(tenant_id, None)
+        if task is not None:
+            task.cancel()
+        for table in (self.configs, self.systems, self._engines, self._reply_blocks):
+            table.pop(tenant_id, None)
+
+    # ----- スケジューラ -----
+
+    def _restart_schedules(self):
+        for tenant_id in self.systems:
+            self._restart_schedule(tenant_id)
+
+    def _restart_schedule(self, tenant_id: str):
+        """テナントのスケジュールタスクを作り直す（イベントループ起動前は何もしない）"""
+        if self._stopping is None or self._stopping.is_set():
+            return
+        task = self._schedule_tasks.pop(tenant_id, None)
+        if task is not None:
+            task.cancel()
+        self._schedule_tasks[tenant_id] = asyncio.ensure_future(self._schedule_loop(tenant_id))
+
+    def next_fire(self, schedule: CronSchedule) -> datetime:
+        """次回実行時刻（ローカル時刻、schedule_utc ならcron式をUTCとして評価）"""
+        now = self.clock()
+        if not self.schedule_utc:
+            return schedule.next_after(now)
+        now_utc = now.astimezone(timezone.utc).replace(tzinfo=None)
+        return schedule.next_after(now_utc).replace(tzinfo=timezone.utc).astimezone().replace(tzinfo=None)
+
+    async def _schedule_loop(self, tenant_id: str):
+        schedule = self.schedules.get(tenant_id, self.default_schedule)
+        while not self._stopping.is_set():
+            fire_at = self.next_fire(schedule)
+            # 時計の変更・スリープ復帰に備えて最長60秒ごとに残り時間を計算し直す
+            while not self._stopping.is_set():
+                remaining = (fire_at - self.clock()).total_seconds()
+                if remaining <= 0:
+                    break
+                try:
+                    await asyncio.wait_for(self._stopping.wait(), timeout=min(remaining, 60))
+                except asyncio.TimeoutError:
+                    pass
+            if self._stopping.is_set():
+                return
+            try:
+                await self._track(self.run_daily(tenant_id))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # 1回の失敗でスケジュールを止めず、次回の起動時刻も実行する
+                print(f"❌ 日次自動化エラー（{tenant_id}）: {type(e).__name__}: {e}")
+
+    async def run_daily(self, tenant_id: str) -> Dict:
+        """テナントの日次自動化を1回実行（同じテナントは同時に1つだけ）"""
+        lock = self._tenant_locks.setdefault(tenant_id, asyncio.Lock())
+        async with lock:
+            start = time.perf_counter()
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(self._executor, self._run_daily_sync, tenant_id)
+            status = "✅" if result.get("success") else "❌"
+            print(f"{status} 日次自動化（{tenant_id}）: {time.perf_counter() - start:.2f}秒")
+            return result
+
+    def _run_daily_sync(self, tenant_id: str) -> Dict:
+        system = self.systems[tenant_id]
+        if self.v53:
+            from main import MultiTrendAnalysisEngine
+
+            engine = self._engines.get(tenant_id)
+            if engine is None:
+                engine = self._engines[tenant_id] = MultiTrendAnalysisEngine(
+                    system,
+                    cache_dir=os.environ.get('MARKETING_RESULT_CACHE'),
+                    competitor_sources=[p for p in os.environ.get('MARKETING_COMPETITOR_SOURCES', '').split(os.pathsep) if p],
+                    hashtag_sources=[p for p in os.environ.get('MARKETING_HASHTAG_SOURCES', '').split(os.pathsep) if p]
+                )
+            try:
+                result = engine.execute_v53_analysis()["existing_features"]
+            except Exception as e:
+                result = {"success": False, "error": str(e)}
+        else:
+            result = system.run_daily_automation()
+        if self.run_log:
+            from dashboard import RunLog
+            RunLog(self.run_log).append(result, tenant_id, self.clock())
+        return result
+
+    async def _track(self, coro):
+        """実行中ジョブとして登録して実行（終了時に完了を待つ対象）"""
+        future = asyncio.ensure_future(coro)
+        self._inflight.add(future)
+        try:
+            return await asyncio.shield(future)
+        finally:
+            if future.done():
+                self._inflight.discard(future)
+            else:
+                future.add_done_callback(self._inflight.discard)
+
+    async def _watch_files(self):
+        """設定ファイルの更新時刻を定期的に確認"""
+        while not self._stopping.is_set():
+            try:
+                await asyncio.wait_for(self._stopping.wait(), timeout=self.poll_seconds)
+            except asyncio.TimeoutError:
+                self.reload()
+
+    # ----- 問い合わせ -----
+
+    def reply(self, inquiry: Dict, tenant_id: Optional[str] = None) -> Dict:
+        """問い合わせ1件の返信本文を作成（空き枠エンジン有効時は枠を仮押さえ）"""
+        from bulk_reply import DailyReplyBlocks, hold_available_dates
+
+        tenant_id = tenant_id or inquiry.get("tenant") or next(iter(self.systems))
+        system = self.systems.get(tenant_id)
+        if system is None:
+            raise KeyError(f"未登録のテナントです: {tenant_id}")
+        blocks = self._reply_blocks.get(tenant_id)
+        if blocks is None:
+            blocks = self._reply_blocks[tenant_id] = DailyReplyBlocks(system)
+
+        result = {"tenant": tenant_id}
+        if system.availability is not None:
+            available_dates, result["hold_id"], result["held_slots"] = hold_available_dates(
+                system, inquiry, system.clock())
+        else:
+            available_dates = blocks.available_dates(system.clock())
+        result["reply"] = system.render_inquiry_reply(
+            inquiry, available_dates=available_dates, company_signature=blocks.company_signature)
+        return result
+
+    async def submit_inquiry(self, inquiry: Dict, tenant_id: Optional[str] = None) -> Dict:
+        """問い合わせジョブを投入して返信を待つ（プロセス内キュー用）"""
+        if self._stopping is not None and self._stopping.is_set():
+            raise RuntimeError("停止処理中のため受け付けできません")
+
+        loop = asyncio.get_running_loop()
+        return await self._track(loop.run_in_executor(self._reply_executor, self.reply, inquiry, tenant_id))
+
+    async def _handle_http(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """最小限のHTTP/1.1処理（1接続1リクエスト）"""
+        try:
+            status, payload = await self._dispatch(reader)
+        except BadRequest as e:
+            status, payload = 400, {"error": str(e)}
+        except asyncio.TimeoutError:
+            status, payload = 408, {"error": "リクエストの受信がタイムアウトしました"}
+        except Exception as e:
+            print(f"❌ 問い合わせ処理エラー: {type(e).__name__}: {e}")
+            status, payload = 500, {"error": f"{type(e).__name__}: {e}"}
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        writer.write(
+            f"HTTP/1.1 {status} {_HTTP_STATUS.get(status, 'Error')}\r\n"
+            f"Content-Type: application/json; charset=utf-8\r\n"
+            f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode("ascii") + body)
+        try:
+            await writer.drain()
+        finally:
+            writer.close()
+
+    async def _read_request(self, reader: asyncio.StreamReader) -> Tuple[str, str, bytes]:
+        """リクエストを読み込んで (メソッド, パス, 本文) を返す（形式の誤りは BadRequest）"""
+        try:
+            header = await reader.readuntil(b"\r\n\r\n")
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError) as e:
+            raise BadRequest(f"リクエストヘッダーを読み込めません: {type(e).__name__}")
+        if len(header) > MAX_HEADER_BYTES:
+            raise BadRequest("ヘッダーが大きすぎます")
+        request_line, *header_lines = header.decode("latin-1").split("\r\n")
+        parts = request_line.split(" ")
+        if len(parts) != 3:
+            raise BadRequest(f"リクエスト行が不正です: {request_line[:100]}")
+        headers = {}
+        for line in header_lines:
+            if ":" in line:
+                key, value = line.split(":", 1)
+                headers[key.strip().lower()] = value.strip()
+        try:
+            length = int(headers.get("content-length", 0))
+        except ValueError:
+            raise BadRequest("Content-Length が不正です")
+        if not 0 <= length <= MAX_BODY_BYTES:
+            raise BadRequest("本文が大きすぎます")
+        try:
+            body = await reader.readexactly(length) if length else b""
+        except asyncio.IncompleteReadError:
+            raise BadRequest("本文が Content-Length より短いです")
+        return parts[0], parts[1], body
+
+    async def _dispatch(self, reader: asyncio.StreamReader) -> Tuple[int, Dict]:
+        method, target, body = await asyncio.wait_for(self._read_request(reader), timeout=REQUEST_TIMEOUT)
+
+        url = urlsplit(target)
+        if url.path == "/health":
+            return 200, {"status": "stopping" if self._stopping.is_set() else "ok",
+                         "tenants": sorted(self.systems), "inflight": len(self._inflight)}
+        if url.path != "/inquiries":
+            return 404, {"error": "not found"}
+        if method != "POST":
+            return 405, {"error": "POST のみ対応しています"}
+        if self._stopping.is_set():
+            return 503, {"error": "停止処理中"}
+
+        try:
+            inquiry = json.loads(body.decode("utf-8"))
+        except ValueError as e:
+            raise BadRequest(f"JSONとして読み込めません: {e}")
+        if not isinstance(inquiry, dict):
+            raise BadRequest("問い合わせはJSONオブジェクトで送信してください")
+        tenant_id = parse_qs(url.query).get("tenant", [None])[0]
+        start = time.perf_counter()
+        try:
+            result = await self.submit_inquiry(inquiry, tenant_id)
+        except KeyError as e:
+            return 404, {"error": str(e.args[0])}
+        result["elapsed_ms"] = round((time.perf_counter() - start) * 1000, 3)
+        return 200, result
+
+    # ----- 起動・停止 -----
+
+    async def serve(self):
+        """常駐実行（停止シグナルまで）"""
+        self._stopping = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            try:
+                loop.add_signal_handler(sig, self._stopping.set)
+            except (NotImplementedError, RuntimeError):
+                # Windows・メインスレッド以外では KeyboardInterrupt で停止
+                pass
+
+        self.reload(force=True)
+        watcher = asyncio.ensure_future(self._watch_files())
+        if self.port:
+            self._server = await asyncio.start_server(self._handle_http, self.host, self.port)
+            print(f"🌐 問い合わせ受付: http://{self.host}:{self.port}/inquiries")
+        print(f"🟢 常駐モード開始（テナント {len(self.systems)}件）")
+        for tenant_id in self.systems:
+            schedule = self.schedules.get(tenant_id, self.default_schedule)
+            print(f"⏰ {tenant_id}: {schedule.expression}{'（UTC）' if self.schedule_utc else ''} → "
+                  f"次回 {self.next_fire(schedule):%m/%d %H:%M}")
+
+        try:
+            await self._stopping.wait()
+        finally:
+            await self.shutdown(watcher)
+
+    def stop(self):
+        """停止を要求（serve が実行中ジョブを待って終了する）"""
+        if self._stopping is not None:
+            self._stopping.set()
+
+    async def shutdown(self, *tasks: asyncio.Task):
+        """新規受付を止め、実行中のジョブを最大 drain_seconds 秒待ってから終了"""
+        self._stopping.set()
+        print("🛑 停止処理中: 新規受付を停止しました")
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        for task in list(self._schedule_tasks.values()) + list(tasks):
+            task.cancel()
+        pending = set()
+        if self._inflight:
+            print(f"⏳ 実行中のジョブ {len(self._inflight)}件の完了を待機中")
+            _, pending = await asyncio.wait(set(self._inflight), timeout=self.drain_seconds)
+            if pending:
+                print(f"⚠️ {len(pending)}件のジョブが時間内に完了しませんでした")
+                for future in pending:
+                    future.cancel()
+                await asyncio.gather(*pending, return_exceptions=True)
+        # 打ち切ったジョブのスレッドがまだDB・LLMクライアントを使っている可能性があるので、その場合は閉じない
+        if not pending:
+            loop = asyncio.get_running_loop()
+            for client in self._llm_clients.values():
+                # run_sync 用のイベントループで閉じるのでスレッドで実行
+                await loop.run_in_executor(self._executor, client.close)
+            if self._availability is not None:
+                self._availability.close()
+        self._executor.shutdown(wait=False)
+        self._reply_executor.shutdown(wait=False)
+        print("👋 常駐モード終了")
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="外構AI自動集客システム 常駐モード")
+    parser.add_argument("--tenants", help="テナント設定ディレクトリまたはファイル（省略時は既定設定の1テナント）")
+    parser.add_argument("--schedules", help="テナントID → cron式 のJSONファイル")
+    parser.add_argument("--templates", help="コンテンツテンプレートのJSONファイル")
+    parser.add_argument("--schedule", default=DEFAULT_SCHEDULE, help="既定のcron式（既定はUTCで評価）")
+    parser.add_argument("--local-time", action="store_true", help="cron式をUTCではなくローカル時刻で評価")
+    parser.add_argument("--host", default="127.0.0.1", help="HTTP待ち受けアドレス")
+    parser.add_argument("--port", type=int, default=8080, help="HTTP待ち受けポート（0 で無効）")
+    parser.add_argument("--poll", type=float, default=5.0, help="設定ファイルの更新確認間隔（秒）")
+    parser.add_argument("--drain", type=float, default=60.0, help="停止時に実行中ジョブを待つ最大秒数")
+    parser.add_argument("--v53", action="store_true", help="Ver.5.3 統合分析（トレンド分析込み）で実行")
+    parser.add_argument("--availability-db", default=os.environ.get('MARKETING_AVAILABILITY_DB'),
+                        help="現地調査の予約DB（指定時は空き枠を問い合わせごとに仮押さえ）")
+    parser.add_argument("--run-log", default=os.environ.get('MARKETING_RUN_LOG'), help="実行結果ログ（JSONL）")
+    parser.add_argument("--history-dir", default=os.environ.get('MARKETING_HISTORY_DIR'),
+                        help="テナントごとの投稿履歴の保存先（重複投稿を防ぐ）")
+    parser.add_argument("--llm", action="store_true", default=bool(os.environ.get('MARKETING_LLM')),
+                        help="日次自動化の投稿・返信をLLMで生成（接続先などは LLM_* 環境変数）")
+    args = parser.parse_args()
+
+    daemon = MarketingDaemon(
+        tenants_path=args.tenants, schedules_path=args.schedules, templates_path=args.templates,
+        default_schedule=args.schedule, host=args.host, port=args.port, poll_seconds=args.poll,
+        drain_seconds=args.drain, v53=args.v53, availability_db=args.availability_db,
+        run_log=args.run_log, history_dir=args.history_dir, llm=args.llm, schedule_utc=not args.local_time
+    )
+    try:
+        asyncio.run(daemon.serve())
+    except KeyboardInterrupt:
+        pass
+    sys.exit(0)
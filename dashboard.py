@@ -1,3 +1,11 @@
+import gzip
+import hashlib
+import html
+import json
+import os
+from datetime import datetime
+from typing import Dict, List, Optional
+
 def save_dashboard(self, filename: str = "dashboard.html"):
     """ダッシュボードHTML保存（エンコーディング対応版）"""
     html_content = self.generate_dashboard_html()
@@ -66,3 +74,276 @@ def create_ascii_dashboard(self):
 </body>
 </html>
 """
+
+# ===== 増分ダッシュボードビルダー =====
+#
+# 実行結果を追記専用のJSONLログ（RunLog）に蓄積し、DashboardBuilder が
+# 前回ビルド以降に追記された行だけを読んで集計を更新する。
+# セクションごとに入力のハッシュを比較し、変わったセクションだけを再描画する。
+
+RECENT_RUNS = 20
+
+def _atomic_write(path: str, data: bytes):
+    """一時ファイル経由でファイルを置き換える"""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+def _content_hash(value) -> str:
+    return hashlib.sha256(
+        json.dumps(value, ensure_ascii=False, sort_keys=True, default=str).encode("utf-8")
+    ).hexdigest()
+
+class RunLog:
+    """日次実行結果の追記専用ログ（JSONL）"""
+
+    def __init__(self, path: str = "metrics/runs.jsonl"):
+        self.path = path
+
+    def append(self, result: Dict, tenant_id: str = "default", timestamp: Optional[datetime] = None):
+        """run_daily_automation の結果を1行追記"""
+        record = {
+            "ts": (timestamp or datetime.now()).isoformat(timespec="seconds"),
+            "tenant": tenant_id,
+            "success": bool(result.get("success")),
+            "campaign": result.get("campaign"),
+            "post_chars": len(result.get("instagram_post") or ""),
+            "image": bool(result.get("image_path")),
+            "error": result.get("error"),
+            "stages": {m["stage"]: round(m["wall_time"], 6) for m in result.get("metrics", [])}
+        }
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+class DashboardBuilder:
+    """追記ログから静的ダッシュボードを増分生成（HTML＋gzip）
+
+    増分ビルド状態は state_dir の下に（ログパス, 出力パス）ごとのサブディレクトリを作って保存する。
+    """
+
+    SECTIONS = ("summary", "analytics", "stages", "campaigns", "recent_runs")
+
+    def __init__(self, log_path: str = "metrics/runs.jsonl", output_path: str = "docs/dashboard.html",
+                 state_dir: str = ".dashboard_cache"):
+        self.log_path = log_path
+        self.output_path = output_path
+        key = hashlib.sha256(
+            "\x1f".join((os.path.abspath(log_path), os.path.abspath(output_path))).encode("utf-8")
+        ).hexdigest()[:16]
+        self.state_dir = os.path.join(state_dir, key)
+        self.state_path = os.path.join(self.state_dir, "state.json")
+        self.state = self._load_state()
+
+    def _load_state(self) -> Dict:
+        if os.path.exists(self.state_path):
+            with open(self.state_path, encoding="utf-8") as f:
+                return json.load(f)
+        return self._empty_state()
+
+    @staticmethod
+    def _empty_state() -> Dict:
+        return {
+            "offset": 0,
+            "totals": {"runs": 0, "succeeded": 0, "failed": 0, "images": 0, "last_run": None},
+            "tenants": {},
+            "campaigns": {},
+            "stages": {},
+            "recent": [],
+            "section_hashes": {},
+            "page_hash": None
+        }
+
+    def _ingest(self) -> int:
+        """前回位置以降の追記行だけを読み込み集計を更新"""
+        if not os.path.exists(self.log_path):
+            return 0
+        state = self.state
+        if os.path.getsize(self.log_path) < state["offset"]:
+            # ログが作り直された場合は最初から
+            empty = self._empty_state()
+            for key in ("offset", "totals", "tenants", "campaigns", "stages", "recent"):
+                state[key] = empty[key]
+
+        count = 0
+        with open(self.log_path, "rb") as f:
+            f.seek(state["offset"])
+            for raw in f:
+                if not raw.endswith(b"\n"):
+                    break  # 書き込み途中の行は次回へ
+                state["offset"] += len(raw)
+                try:
+                    record = json.loads(raw)
+                except ValueError:
+                    continue
+                self._accumulate(record)
+                count += 1
+        return count
+
+    def _accumulate(self, record: Dict):
+        state = self.state
+        totals = state["totals"]
+        totals["runs"] += 1
+        totals["succeeded" if record.get("success") else "failed"] += 1
+        totals["images"] += int(bool(record.get("image")))
+        totals["last_run"] = record.get("ts")
+
+        tenant = record.get("tenant", "default")
+        state["tenants"][tenant] = state["tenants"].get(tenant, 0) + 1
+        if record.get("campaign"):
+            state["campaigns"][record["campaign"]] = state["campaigns"].get(record["campaign"], 0) + 1
+        for stage, seconds in (record.get("stages") or {}).items():
+            entry = state["stages"].setdefault(stage, {"count": 0, "total": 0.0, "max": 0.0})
+            entry["count"] += 1
+            entry["total"] += seconds
+            entry["max"] = max(entry["max"], seconds)
+
+        state["recent"].append({key: record.get(key) for key in ("ts", "tenant", "success", "campaign", "error")})
+        del state["recent"][:-RECENT_RUNS]
+
+    def _section_inputs(self, analytics: Optional[Dict]) -> Dict:
+        state = self.state
+        return {
+            "summary": {"totals": state["totals"], "tenants": len(state["tenants"])},
+            "analytics": analytics or {},
+            "stages": state["stages"],
+            "campaigns": state["campaigns"],
+            "recent_runs": state["recent"]
+        }
+
+    def _fragment_path(self, name: str) -> str:
+        return os.path.join(self.state_dir, "sections", f"{name}.html")
+
+    def build(self, analytics: Optional[Dict] = None) -> Dict:
+        """ダッシュボードを増分生成し、再描画したセクションを返す"""
+        new_records = self._ingest()
+        inputs = self._section_inputs(analytics)
+
+        fragments = {}
+        rendered = []
+        for name in self.SECTIONS:
+            digest = _content_hash(inputs[name])
+            path = self._fragment_path(name)
+            if self.state["section_hashes"].get(name) == digest and os.path.exists(path):
+                with open(path, encoding="utf-8") as f:
+                    fragments[name] = f.read()
+                continue
+            fragments[name] = getattr(self, f"_render_{name}")(inputs[name])
+            _atomic_write(path, fragments[name].encode("utf-8"))
+            self.state["section_hashes"][name] = digest
+            rendered.append(name)
+
+        page = self._render_page(fragments).encode("utf-8")
+        page_hash = hashlib.sha256(page).hexdigest()
+        written = page_hash != self.state["page_hash"] or not os.path.exists(self.output_path)
+        if written:
+            _atomic_write(self.output_path, page)
+            # GitHub Pages 向けの事前圧縮版（mtime固定で内容が同じなら同一バイト列）
+            _atomic_write(f"{self.output_path}.gz", gzip.compress(page, compresslevel=9, mtime=0))
+            self.state["page_hash"] = page_hash
+
+        _atomic_write(self.state_path, json.dumps(self.state, ensure_ascii=False).encode("utf-8"))
+        return {"new_records": new_records, "rendered_sections": rendered, "written": written}
+
+    # ----- セクション描画 -----
+
+    @staticmethod
+    def _metric(label: str, value) -> str:
+        return (f'<div class="metric"><div>{html.escape(label)}</div>'
+                f'<div class="value">{html.escape("-" if value is None else str(value))}</div></div>')
+
+    def _render_summary(self, data: Dict) -> str:
+        totals = data["totals"]
+        rate = f"{totals['succeeded'] / totals['runs'] * 100:.1f}%" if totals["runs"] else "-"
+        return ('<section><h2>実行サマリー</h2><div class="metrics">'
+                + self._metric("実行回数", totals["runs"])
+                + self._metric("成功率", rate)
+                + self._metric("画像作成数", totals["images"])
+                + self._metric("テナント数", data["tenants"])
+                + self._metric("最終実行", totals["last_run"] or "-")
+                + '</div></section>')
+
+    def _render_analytics(self, data: Dict) -> str:
+        if not data:
+            return '<section><h2>KPI</h2><p>分析データはまだありません</p></section>'
+        labels = {"total_sales": "月間売上", "roi": "ROI", "contracts": "成約数", "cost": "広告費",
+                  "inquiries": "問い合わせ数", "posts": "投稿数", "conversion_rate": "成約率"}
+        return ('<section><h2>KPI</h2><div class="metrics">'
+                + "".join(self._metric(labels.get(key, key), value) for key, value in data.items())
+                + '</div></section>')
+
+    def _render_stages(self, data: Dict) -> str:
+        rows = "".join(
+            f"<tr><td>{html.escape(stage)}</td><td>{entry['count']}</td>"
+            f"<td>{entry['total'] / entry['count'] * 1000:.1f}</td><td>{entry['max'] * 1000:.1f}</td></tr>"
+            for stage, entry in sorted(data.items())
+        )
+        return ('<section><h2>ステージ処理時間</h2><table><tr><th>ステージ</th><th>回数</th>'
+                f'<th>平均(ms)</th><th>最大(ms)</th></tr>{rows}</table></section>')
+
+    def _render_campaigns(self, data: Dict) -> str:
+        rows = "".join(
+            f"<tr><td>{html.escape(name)}</td><td>{count}</td></tr>"
+            for name, count in sorted(data.items(), key=lambda item: -item[1])
+        )
+        return f'<section><h2>キャンペーン提案</h2><table><tr><th>キャンペーン</th><th>回数</th></tr>{rows}</table></section>'
+
+    def _render_recent_runs(self, data: List[Dict]) -> str:
+        rows = "".join(
+            f"<tr><td>{html.escape(str(run['ts']))}</td><td>{html.escape(str(run['tenant']))}</td>"
+            f"<td>{'✅' if run['success'] else '❌'}</td>"
+            f"<td>{html.escape(str(run['campaign'] or run['error'] or ''))}</td></tr>"
+            for run in reversed(data)
+        )
+        return ('<section><h2>最近の実行</h2><table><tr><th>日時</th><th>テナント</th>'
+                f'<th>結果</th><th>内容</th></tr>{rows}</table></section>')
+
+    def _render_page(self, fragments: Dict[str, str]) -> str:
+        body = "\n".join(fragments[name] for name in self.SECTIONS)
+        return f"""<!DOCTYPE html>
+<html lang="ja">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>外構AI自動集客システム ダッシュボード</title>
+    <style>
+        body {{ font-family: sans-serif; margin: 20px; background: #f0f0f0; }}
+        .dashboard {{ max-width: 1000px; margin: 0 auto; background: white; padding: 20px; border-radius: 10px; }}
+        .header {{ background: #2E8B57; color: white; padding: 20px; text-align: center; border-radius: 5px; }}
+        .metrics {{ display: grid; grid-template-columns: repeat(auto-fit, minmax(180px, 1fr)); gap: 20px; margin: 20px 0; }}
+        .metric {{ background: #f8f9fa; padding: 20px; border-radius: 5px; text-align: center; }}
+        .value {{ font-size: 1.6em; font-weight: bold; color: #2E8B57; }}
+        table {{ width: 100%; border-collapse: collapse; }}
+        th, td {{ border-bottom: 1px solid #ddd; padding: 6px; text-align: left; }}
+    </style>
+</head>
+<body>
+    <div class="dashboard">
+        <div class="header"><h1>外構AI自動集客システム</h1><p>分析ダッシュボード</p></div>
+{body}
+    </div>
+</body>
+</html>
+"""
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="静的ダッシュボード増分生成")
+    parser.add_argument("--log", default="metrics/runs.jsonl", help="実行結果ログ（JSONL）")
+    parser.add_argument("--out", default="docs/dashboard.html", help="出力HTML")
+    parser.add_argument("--state-dir", default=".dashboard_cache", help="増分ビルド状態の保存先（ログ・出力ごとにサブディレクトリを作成）")
+    parser.add_argument("--analytics-dir", help="分析データストア（指定時はKPIを集計して表示）")
+    args = parser.parse_args()
+
+    kpis = None
+    if args.analytics_dir:
+        from analytics_store import AnalyticsStore
+        kpis = AnalyticsStore(args.analytics_dir).kpis()
+
+    summary = DashboardBuilder(args.log, args.out, args.state_dir).build(analytics=kpis)
+    print(f"📊 ダッシュボード更新: 新規 {summary['new_records']}件 / "
+          f"再描画 {', '.join(summary['rendered_sections']) or 'なし'} / "
+          f"{'書き込み' if summary['written'] else '変更なし'}")
@@ -0,0 +1,109 @@
+# image_renderer.py - 投稿画像レンダリング（一括・並列処理対応）
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import List, Optional, Sequence, Tuple
+
+# Instagram正方形画像
+IMAGE_SIZE = (1080, 1080)
+
+# テキストの左端と折り返し幅
+TEXT_LEFT = 50
+TEXT_WIDTH = IMAGE_SIZE[0] - 2 * TEXT_LEFT
+
+# 見出し行とみなす絵文字
+HEADLINE_EMOJIS = ('🏠', '📍', '🌸', '👥', '😊')
+
+@dataclass(frozen=True)
+class ImageStyle:
+    """画像スタイル（季節背景色・フッター連絡先）"""
+    bg_color: str
+    contact_email: str
+    contact_phone: str
+
+@dataclass(frozen=True)
+class ImageRenderSettings:
+    """画像出力設定"""
+    size: Tuple[int, int] = IMAGE_SIZE
+    quality: int = 75
+    optimize: bool = False
+    output_dir: str = ""
+
+@lru_cache(maxsize=32)
+def get_base_image(style: ImageStyle, size: Tuple[int, int] = IMAGE_SIZE):
+    """季節背景＋フッター描画済みのベース画像（プロセス内キャッシュ、変更禁止）"""
+    from PIL import Image
+    from text_layout import FOOTER_FONT_SIZE, draw_line
+
+    img = Image.new('RGB', size, color=style.bg_color)
+    footer_y = size[1] - 100
+    draw_line(img, (TEXT_LEFT, footer_y), f"📧 {style.contact_email}", '#666666', FOOTER_FONT_SIZE)
+    draw_line(img, (TEXT_LEFT, footer_y + 40), f"📞 {style.contact_phone}", '#666666', FOOTER_FONT_SIZE)
+    return img
+
+@lru_cache(maxsize=1024)
+def layout_post_text(post_text: str, max_width: int = TEXT_WIDTH) -> Tuple[Tuple[int, str, str], ...]:
+    """投稿テキストの行配置 (y座標, 行, 色) を計算（表示幅で折り返し、結果はキャッシュ）"""
+    from text_layout import FONT_SIZE, wrap_line
+
+    layout = []
+    y_position = 100
+    for line in post_text.split('\n'):
+        if not line.strip():
+            continue
+        if line.startswith('#'):
+            color = '#4a7c59'
+            y_position += 35
+        elif any(emoji in line for emoji in HEADLINE_EMOJIS):
+            color = '#2d5016'
+            y_position += 45
+        else:
+            color = '#1a4009'
+            y_position += 40
+        for index, wrapped in enumerate(wrap_line(line, max_width, FONT_SIZE)):
+            if index:
+                y_position += FONT_SIZE + 8
+            layout.append((y_position, wrapped, color))
+    return tuple(layout)
+
+def draw_post_text(img, post_text: str):
+    """画像に投稿テキストを描画（行のラスタライズ結果はキャッシュを再利用）"""
+    from text_layout import draw_line
+
+    for y_position, line, color in layout_post_text(post_text):
+        draw_line(img, (TEXT_LEFT, y_position), line, color)
+    return img
+
+def render_post_image(post_text: str, filename: str, style: ImageStyle,
+                      settings: ImageRenderSettings = ImageRenderSettings()) -> str:
+    """投稿画像を1枚レンダリングして保存"""
+    img = get_base_image(style, settings.size).copy()
+    draw_post_text(img, post_text)
+
+    path = os.path.join(settings.output_dir, filename)
+    img.save(path, 'JPEG', quality=settings.quality, optimize=settings.optimize)
+    return path
+
+def _render_job(job: Tuple[str, str, ImageStyle, ImageRenderSettings]) -> str:
+    """プロセスプール用ワーカー"""
+    return render_post_image(*job)
+
+def render_post_images(post_texts: Sequence[str], filenames: Sequence[str], style: ImageStyle,
+                       settings: ImageRenderSettings = ImageRenderSettings(),
+                       max_workers: Optional[int] = None, chunksize: int = 16) -> List[str]:
+    """投稿画像を一括レンダリング（プロセスプールで並列化）"""
+    if len(post_texts) != len(filenames):
+        raise ValueError("post_texts と filenames の件数が一致しません")
+
+    if settings.output_dir:
+        os.makedirs(settings.output_dir, exist_ok=True)
+    jobs = [(text, name, style, settings) for text, name in zip(post_texts, filenames)]
+
+    # 少量ならプール起動コストの方が大きいのでその場で処理
+    if max_workers == 1 or len(jobs) <= chunksize:
+        return [_render_job(job) for job in jobs]
+
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(_render_job, jobs, chunksize=chunksize))
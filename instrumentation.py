@@ -0,0 +1,250 @@
+# instrumentation.py - パイプラインステージ計測（時間・CPU・メモリ・出力サイズ）
+
+import json
+import os
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from typing import IO, Callable, Dict, List, Optional
+
+# tracemalloc はプロセス全体で1つなので、利用中のステージ数で開始・停止を管理する
+_trace_lock = threading.Lock()
+_trace_users = 0
+_trace_started_here = False
+
+@dataclass
+class StageMetrics:
+    """ステージ1回分の計測結果"""
+    stage: str
+    wall_time: float
+    cpu_time: float
+    peak_memory: Optional[int]
+    output_size: int
+    success: bool
+    error: Optional[str] = None
+    labels: Dict[str, str] = field(default_factory=dict)
+    profile_path: Optional[str] = None
+
+    def to_dict(self) -> Dict:
+        return asdict(self)
+
+def measure_output_size(value) -> int:
+    """出力サイズ（バイト）: 文字列はUTF-8長、既存ファイルパスはファイルサイズ"""
+    if value is None:
+        return 0
+    if isinstance(value, str):
+        if value.endswith((".jpg", ".png", ".mp4")) and os.path.isfile(value):
+            return os.path.getsize(value)
+        return len(value.encode("utf-8"))
+    if isinstance(value, bytes):
+        return len(value)
+    return len(json.dumps(value, ensure_ascii=False, default=str).encode("utf-8"))
+
+def _start_tracing():
+    global _trace_users, _trace_started_here
+    import tracemalloc
+
+    with _trace_lock:
+        if _trace_users == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _trace_started_here = True
+        _trace_users += 1
+
+def _stop_tracing():
+    global _trace_users, _trace_started_here
+    import tracemalloc
+
+    with _trace_lock:
+        _trace_users -= 1
+        # 外部で開始された tracemalloc は止めない
+        if _trace_users == 0 and _trace_started_here:
+            tracemalloc.stop()
+            _trace_started_here = False
+
+def _reset_peak():
+    import tracemalloc
+
+    with _trace_lock:
+        tracemalloc.reset_peak()
+
+def _traced_peak() -> int:
+    import tracemalloc
+
+    with _trace_lock:
+        return tracemalloc.get_traced_memory()[1]
+
+class StageContext:
+    """ステージ実行中のコンテキスト（output に成果物を設定する）"""
+
+    def __init__(self, recorder: "StageRecorder", name: str):
+        self.recorder = recorder
+        self.name = name
+        self.output = None
+        self._profiler = None
+
+    def __enter__(self) -> "StageContext":
+        if self.recorder.trace_memory:
+            self.recorder.start_tracing()
+            _reset_peak()
+        if self.recorder.profile_dir:
+            import cProfile
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+        self._wall = time.perf_counter()
+        self._cpu = time.thread_time()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        wall_time = time.perf_counter() - self._wall
+        cpu_time = time.thread_time() - self._cpu
+        profile_path = None
+        if self._profiler is not None:
+            self._profiler.disable()
+            profile_path = self.recorder.profile_path(self.name)
+            self._profiler.dump_stats(profile_path)
+        peak_memory = _traced_peak() if self.recorder.trace_memory else None
+
+        self.recorder.record(StageMetrics(
+            stage=self.name,
+            wall_time=wall_time,
+            cpu_time=cpu_time,
+            peak_memory=peak_memory,
+            output_size=measure_output_size(self.output),
+            success=exc is None,
+            error=None if exc is None else f"{exc_type.__name__}: {exc}",
+            labels=dict(self.recorder.labels),
+            profile_path=profile_path
+        ))
+        return False
+
+class StageRecorder:
+    """ステージ計測レコーダー
+
+    with recorder.stage("post") as stage: ... stage.output = 成果物
+    の形で計測し、完了ごとに登録済みフックへ StageMetrics を渡す。
+    peak_memory は tracemalloc によるPython割り当てのピーク
+    （複数スレッドで同時に計測した場合はプロセス全体の値）。
+    tracemalloc は最初のステージで開始し、close() で停止する（with でも使える）。
+    """
+
+    def __init__(self, hooks: Optional[List[Callable[[StageMetrics], None]]] = None,
+                 trace_memory: bool = True, profile_dir: Optional[str] = None,
+                 labels: Optional[Dict[str, str]] = None):
+        self.hooks = list(hooks or [])
+        self.trace_memory = trace_memory
+        self.profile_dir = profile_dir
+        self.labels = labels or {}
+        self.metrics: List[StageMetrics] = []
+        self._tracing = False
+
+    def __enter__(self) -> "StageRecorder":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        self.close()
+        return False
+
+    def start_tracing(self):
+        """メモリ計測を開始（レコーダーごとに1回だけ）"""
+        if not self._tracing:
+            _start_tracing()
+            self._tracing = True
+
+    def close(self):
+        """メモリ計測を停止（以降のステージは再び開始する。record() はそのまま使える）"""
+        if self._tracing:
+            _stop_tracing()
+            self._tracing = False
+
+    def add_hook(self, hook: Callable[[StageMetrics], None]):
+        """計測完了フックを追加"""
+        self.hooks.append(hook)
+
+    def stage(self, name: str) -> StageContext:
+        """ステージ計測コンテキストを作成"""
+        return StageContext(self, name)
+
+    def profile_path(self, stage: str) -> str:
+        """cProfile出力先パス"""
+        os.makedirs(self.profile_dir, exist_ok=True)
+        prefix = "_".join(str(v) for v in self.labels.values())
+        return os.path.join(self.profile_dir, f"{prefix + '_' if prefix else ''}{stage}.prof")
+
+    def record(self, metrics: StageMetrics):
+        """計測結果を保存してフックを呼ぶ（フックの例外は計測対象に影響させない）"""
+        self.metrics.append(metrics)
+        for hook in self.hooks:
+            try:
+                hook(metrics)
+            except Exception as e:
+                print(f"⚠️ 計測フックエラー: {e}")
+
+class JsonLinesEmitter:
+    """計測結果をJSON Linesで書き出すフック
+
+    open() で作成した場合はファイルを所有し、close()（または with の終了）で閉じる。
+    """
+
+    def __init__(self, stream: IO[str], owns_stream: bool = False):
+        self.stream = stream
+        self.owns_stream = owns_stream
+        self._lock = threading.Lock()
+
+    @classmethod
+    def open(cls, path: str) -> "JsonLinesEmitter":
+        """追記モードでファイルを開いて作成"""
+        return cls(open(path, "a", encoding="utf-8"), owns_stream=True)
+
+    def __enter__(self) -> "JsonLinesEmitter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        self.close()
+        return False
+
+    def close(self):
+        """所有しているファイルを閉じる"""
+        with self._lock:
+            if self.owns_stream and not self.stream.closed:
+                self.stream.close()
+
+    def __call__(self, metrics: StageMetrics):
+        line = json.dumps(metrics.to_dict(), ensure_ascii=False)
+        with self._lock:
+            self.stream.write(line + "\n")
+            self.stream.flush()
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _prometheus_labels(metrics: StageMetrics) -> str:
+    labels = {"stage": metrics.stage, **metrics.labels}
+    return ",".join(f'{key}="{_escape_label(str(value))}"' for key, value in labels.items())
+
+# (メトリクス名, 種別, 説明, 値の取り出し)
+PROMETHEUS_METRICS = (
+    ("marketing_stage_wall_seconds", "gauge", "Stage wall-clock time", lambda m: m.wall_time),
+    ("marketing_stage_cpu_seconds", "gauge", "Stage CPU time", lambda m: m.cpu_time),
+    ("marketing_stage_peak_memory_bytes", "gauge", "Stage peak traced memory", lambda m: m.peak_memory),
+    ("marketing_stage_output_bytes", "gauge", "Stage output size", lambda m: m.output_size),
+    ("marketing_stage_success", "gauge", "Stage success (1) or failure (0)", lambda m: int(m.success)),
+)
+
+def render_prometheus(metrics: List[StageMetrics]) -> str:
+    """計測結果をPrometheusテキスト形式に変換"""
+    lines = []
+    for name, kind, description, getter in PROMETHEUS_METRICS:
+        lines.append(f"# HELP {name} {description}")
+        lines.append(f"# TYPE {name} {kind}")
+        for m in metrics:
+            value = getter(m)
+            if value is not None:
+                lines.append(f"{name}{{{_prometheus_labels(m)}}} {value}")
+    return "\n".join(lines) + "\n"
+
+def write_prometheus(metrics: List[StageMetrics], path: str):
+    """Prometheusテキストをファイルへ保存（textfile collector 用に一時ファイル経由で置き換え）"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(render_prometheus(metrics))
+    os.replace(tmp_path, path)
@@ -0,0 +1,293 @@
+# llm_backend.py - LLM生成バックエンド（asyncio・接続プール・レスポンスキャッシュ）
+
+import asyncio
+import hashlib
+import os
+import random
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, Optional, Set
+
+DEFAULT_ENDPOINT = "https://api.openai.com/v1/chat/completions"
+
+SYSTEM_PROMPT = "あなたは外構・エクステリア業界の集客担当者です。自然で親しみやすい日本語で書いてください。"
+
+# リトライ対象のHTTPステータス
+RETRY_STATUS = {408, 429, 500, 502, 503, 504}
+
+class LLMError(Exception):
+    """LLM呼び出しエラー"""
+
+    def __init__(self, message: str, retryable: bool = True):
+        super().__init__(message)
+        self.retryable = retryable
+
+@dataclass(frozen=True)
+class LLMConfig:
+    """LLMバックエンド設定"""
+    endpoint: str = DEFAULT_ENDPOINT
+    model: str = "gpt-4o-mini"
+    api_key: Optional[str] = None
+    temperature: float = 0.7
+    max_concurrency: int = 8
+    request_timeout: float = 10.0
+    deadline: float = 3.0
+    max_retries: int = 2
+    backoff_base: float = 0.25
+    cache_path: str = ".llm_cache.sqlite3"
+    cache_ttl: float = 7 * 24 * 3600
+    cache_max_entries: int = 10000
+
+    @classmethod
+    def from_env(cls, api_key: Optional[str] = None) -> "LLMConfig":
+        """環境変数から設定を作成（LLM_ENDPOINT でスタブサーバーに差し替え可能）"""
+        defaults = cls()
+        return cls(
+            endpoint=os.environ.get('LLM_ENDPOINT', defaults.endpoint),
+            model=os.environ.get('LLM_MODEL', defaults.model),
+            api_key=api_key or os.environ.get('OPENAI_API_KEY'),
+            deadline=float(os.environ.get('LLM_DEADLINE', defaults.deadline)),
+            max_concurrency=int(os.environ.get('LLM_MAX_CONCURRENCY', defaults.max_concurrency)),
+            cache_path=os.environ.get('LLM_CACHE_PATH', defaults.cache_path)
+        )
+
+class ResponseCache:
+    """プロンプトハッシュをキーにしたディスクキャッシュ（TTL・LRU削除）"""
+
+    # 何回書き込むごとにLRU削除を行うか
+    EVICT_INTERVAL = 100
+
+    def __init__(self, path: str, ttl: float, max_entries: int):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses "
+            "(key TEXT PRIMARY KEY, value TEXT NOT NULL, created REAL NOT NULL, accessed REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)")
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(*parts: str) -> str:
+        """プロンプト等からキャッシュキーを生成"""
+        return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """キャッシュ取得（期限切れは削除してNone）"""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if now - row[1] > self.ttl:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._conn.commit()
+                return None
+            self._conn.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            return row[0]
+
+    def put(self, key: str, value: str):
+        """キャッシュ保存"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, created, accessed) VALUES (?, ?, ?, ?)",
+                (key, value, now, now)
+            )
+            self._writes += 1
+            if self._writes % self.EVICT_INTERVAL == 0:
+                self._evict(now)
+            self._conn.commit()
+
+    def _evict(self, now: float):
+        """期限切れと上限超過分（アクセスが古い順）を削除"""
+        self._conn.execute("DELETE FROM responses WHERE created < ?", (now - self.ttl,))
+        self._conn.execute(
+            "DELETE FROM responses WHERE key IN "
+            "(SELECT key FROM responses ORDER BY accessed DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,)
+        )
+
+    def close(self):
+        with self._lock:
+            self._evict(time.time())
+            self._conn.commit()
+            self._conn.close()
+
+class AsyncLLMClient:
+    """非同期LLMクライアント（同時実行数制限・リトライ・キャッシュ・締切フォールバック）"""
+
+    def __init__(self, config: LLMConfig, cache: Optional[ResponseCache] = None):
+        self.config = config
+        self.cache = cache or ResponseCache(config.cache_path, config.cache_ttl, config.cache_max_entries)
+        self._session = None
+        self._executor = ThreadPoolExecutor(max_workers=config.max_concurrency,
+                                            thread_name_prefix="llm")
+        # SQLiteキャッシュの読み書き・commit はイベントループを止めないよう専用スレッドで順番に実行
+        self._cache_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="llm-cache")
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._background: Set[asyncio.Future] = set()
+        # 同期処理から使う場合の専用イベントループ（run_sync で作成）
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _get_session(self):
+        """接続プール付きHTTPセッション（初回利用時に作成）"""
+        if self._session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.config.max_concurrency)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            if self.config.api_key:
+                session.headers["Authorization"] = f"Bearer {self.config.api_key}"
+            self._session = session
+        return self._session
+
+    def _post(self, payload: Dict) -> str:
+        """同期HTTP呼び出し（スレッドプール上で実行）"""
+        import requests
+
+        try:
+            response = self._get_session().post(self.config.endpoint, json=payload,
+                                                timeout=self.config.request_timeout)
+        except requests.RequestException as e:
+            raise LLMError(f"通信エラー: {e}") from e
+        if response.status_code in RETRY_STATUS:
+            raise LLMError(f"HTTP {response.status_code}")
+        if response.status_code >= 400:
+            raise LLMError(f"HTTP {response.status_code}", retryable=False)
+        try:
+            return response.json()["choices"][0]["message"]["content"]
+        except (ValueError, KeyError, IndexError, TypeError) as e:
+            raise LLMError(f"レスポンス形式エラー: {e}", retryable=False) from e
+
+    async def _request(self, payload: Dict) -> str:
+        """同時実行数制限・指数バックオフ付きリトライ"""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.config.max_concurrency)
+        loop = asyncio.get_running_loop()
+
+        async with self._semaphore:
+            for attempt in range(self.config.max_retries + 1):
+                try:
+                    return await loop.run_in_executor(self._executor, self._post, payload)
+                except LLMError as e:
+                    if attempt == self.config.max_retries or not e.retryable:
+                        raise
+                    delay = self.config.backoff_base * (2 ** attempt)
+                    await asyncio.sleep(delay + random.uniform(0, delay))
+
+    async def complete(self, prompt: str, system: str = SYSTEM_PROMPT) -> str:
+        """プロンプトを補完（キャッシュ済み・実行中の同一プロンプトは再送しない）"""
+        key = ResponseCache.make_key(self.config.model, system, prompt)
+        loop = asyncio.get_running_loop()
+        cached = await loop.run_in_executor(self._cache_executor, self.cache.get, key)
+        if cached is not None:
+            return cached
+
+        future = self._inflight.get(key)
+        if future is None:
+            payload = {
+                "model": self.config.model,
+                "temperature": self.config.temperature,
+                "messages": [
+                    {"role": "system", "content": system},
+                    {"role": "user", "content": prompt}
+                ]
+            }
+            future = asyncio.ensure_future(self._request(payload))
+            self._inflight[key] = future
+            future.add_done_callback(lambda f: self._store(key, f))
+        return await asyncio.shield(future)
+
+    def _store(self, key: str, future: asyncio.Future):
+        """完了したリクエストをキャッシュへ保存（キャッシュ用スレッドで実行）"""
+        self._inflight.pop(key, None)
+        if not future.cancelled() and future.exception() is None:
+            self._cache_executor.submit(self.cache.put, key, future.result())
+
+    async def complete_or_fallback(self, prompt: str, fallback: str,
+                                   deadline: Optional[float] = None) -> str:
+        """締切内に応答がなければ（またはエラー時は）フォールバック文を返す
+
+        締切を過ぎたリクエストはバックグラウンドで継続し、結果は次回以降のためにキャッシュされる。
+        """
+        deadline = self.config.deadline if deadline is None else deadline
+        task = asyncio.ensure_future(self.complete(prompt))
+        try:
+            text = await asyncio.wait_for(asyncio.shield(task), timeout=deadline)
+        except asyncio.TimeoutError:
+            self._background.add(task)
+            task.add_done_callback(self._background.discard)
+            task.add_done_callback(_consume_exception)
+            return fallback
+        except Exception as e:
+            print(f"⚠️ LLM生成エラー（テンプレートで代替）: {e}")
+            return fallback
+        return text.strip() or fallback
+
+    async def aclose(self, wait: bool = False):
+        """バックグラウンド処理を終了して資源を解放"""
+        if self._background:
+            if wait:
+                await asyncio.gather(*self._background, return_exceptions=True)
+            else:
+                for task in self._background:
+                    task.cancel()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        if self._session is not None:
+            self._session.close()
+        # 保存待ちの書き込みを済ませてから閉じる（キャッシュ用スレッドは投入順に実行）
+        await asyncio.wrap_future(self._cache_executor.submit(self.cache.close))
+        self._cache_executor.shutdown(wait=False)
+
+    def run_sync(self, coro):
+        """同期処理からコルーチンを実行（クライアント専用のイベントループ、同時に呼べるのは1スレッドまで）
+
+        締切を過ぎてバックグラウンドで継続するリクエストは次回以降の呼び出し中に進む。
+        非同期処理から使うクライアントとは共用しない。
+        """
+        if self._loop is None:
+            self._loop = asyncio.new_event_loop()
+        return self._loop.run_until_complete(coro)
+
+    def close(self):
+        """同期処理から資源を解放（run_sync 用のイベントループも閉じる）"""
+        try:
+            self.run_sync(self.aclose())
+        finally:
+            self._loop.close()
+            self._loop = None
+
+def _consume_exception(future: asyncio.Future):
+    """バックグラウンドタスクの例外を回収（未取得警告の抑止）"""
+    if not future.cancelled():
+        future.exception()
+
+def build_post_prompt(draft: str, season_name: str) -> str:
+    """Instagram投稿リライト用プロンプト"""
+    return (
+        f"次のInstagram投稿の下書きを、{season_name}らしさが伝わる魅力的な文章に書き直してください。\n"
+        "ハッシュタグ・電話番号などの事実情報は変えず、投稿本文のみを出力してください。\n\n"
+        f"{draft}"
+    )
+
+def build_reply_prompt(draft: str) -> str:
+    """問い合わせ返信リライト用プロンプト"""
+    return (
+        "次の問い合わせ返信メールの下書きを、丁寧で温かみのある文面に整えてください。\n"
+        "候補日・署名・連絡先は一字一句変えず、メール本文のみを出力してください。\n\n"
+        f"{draft}"
+    )
@@ -1,113 +1,231 @@
 # main.py - 外構業界AI自動集客システム メインプログラム
 
+# 起動を軽くするため、重いライブラリ（PIL・requests・numpy等）は
+# 利用する処理の中で遅延importする
 import os
-import json
-import requests
+import re
 import random
+import uuid
 from datetime import datetime, timedelta
-from dataclasses import dataclass
-from typing import List, Dict, Optional
+from dataclasses import dataclass, replace
+from functools import lru_cache, cached_property
+from typing import List, Dict, Optional, Iterator, Callable, Sequence, Tuple
 
-@dataclass
-class BusinessConfig:
-    """外構業界ビジネス設定"""
-    company_name: str = "エクステリア工房"
-    target_areas: List[str] = None
-    services: List[str] = None
-    contact_email: str = "info@exterior-example.com"
-    contact_phone: str = "090-1234-5678"
-    
-    def __post_init__(self):
-        if self.target_areas is None:
-            self.target_areas = ["東京", "神奈川", "埼玉", "千葉"]
-        if self.services is None:
-            self.services = [
-                "ウッドデッキ設置", "カーポート工事", "フェンス設置",
-                "門扉工事", "庭園設計", "駐車場工事", "植栽工事"
-            ]
+@dataclass(frozen=True)
+class Season:
+    """季節情報（不変）"""
+    __slots__ = ("name", "keywords", "services", "campaigns", "colors")
+    name: str
+    keywords: Tuple[str, ...]
+    services: Tuple[str, ...]
+    campaigns: Tuple[str, ...]
+    colors: Tuple[str, ...]
 
-class ExteriorMarketingAI:
-    """外構業界AI自動集客システム"""
-    
-    def __init__(self):
-        # 環境変数から設定取得
-        self.openai_api_key = os.environ.get('OPENAI_API_KEY')
-        self.github_token = os.environ.get('GITHUB_TOKEN')
-        
-        # ビジネス設定
-        self.config = BusinessConfig()
-        
-        # 現在の季節情報
-        self.current_season = self.get_current_season()
-        
-        # コンテンツテンプレート
-        self.content_templates = self.initialize_templates()
+SPRING = Season(
+    name="春",
+    keywords=("新緑", "花壇", "春の庭づくり", "新生活"),
+    services=("ガーデニング", "花壇設置", "芝張り"),
+    campaigns=("春の庭づくりキャンペーン", "新築外構相談会"),
+    colors=("#90EE90", "#98FB98", "#F0FFF0")
+)
+SUMMER = Season(
+    name="夏",
+    keywords=("日よけ", "パーゴラ", "夏の快適空間"),
+    services=("パーゴラ設置", "日よけ工事", "水栓設置"),
+    campaigns=("夏の快適外構キャンペーン", "日よけ工事特別価格"),
+    colors=("#87CEEB", "#E0F6FF", "#B0E0E6")
+)
+AUTUMN = Season(
+    name="秋",
+    keywords=("紅葉", "年末工事", "冬支度"),
+    services=("メンテナンス", "冬支度工事", "落ち葉対策"),
+    campaigns=("年末工事キャンペーン", "冬支度メンテナンス"),
+    colors=("#DEB887", "#D2691E", "#CD853F")
+)
+WINTER = Season(
+    name="冬",
+    keywords=("雪対策", "防寒", "春の準備"),
+    services=("雪対策工事", "防寒対策", "春工事準備"),
+    campaigns=("雪対策キャンペーン", "春工事早期予約"),
+    colors=("#F0F8FF", "#E6E6FA", "#F5F5F5")
+)
+
+# 月 → 季節（インデックス0は未使用）
+SEASONS_BY_MONTH: Tuple[Optional[Season], ...] = (
+    None, WINTER, WINTER, SPRING, SPRING, SPRING, SUMMER,
+    SUMMER, SUMMER, AUTUMN, AUTUMN, AUTUMN, WINTER
+)
+
+def season_for_month(month: int) -> Season:
+    """月から季節情報を取得"""
+    return SEASONS_BY_MONTH[month]
+
+# 季節メッセージ（季節名 → メッセージ）
+SEASONAL_MESSAGES = {
+    "春": "新緑の季節に新しい庭でお過ごしください🌱",
+    "夏": "夏の日差しに映える素敵な外構です☀️",
+    "秋": "紅葉の季節も美しい庭になりました🍁",
+    "冬": "雪化粧も美しい冬の庭です❄️"
+}
+
+# お客様の声
+CUSTOMER_REVIEWS = (
+    "思っていた以上に素敵な庭になりました",
+    "丁寧な施工で安心してお任せできました",
+    "提案力が素晴らしく、理想の外構になりました",
+    "アフターフォローもしっかりしていて信頼できます",
+    "価格も適正で、仕上がりに大満足です",
+    "近所の方からもお褒めの言葉をいただきました",
+    "季節ごとの手入れ方法も教えていただき助かります"
+)
+
+# 曜日表記
+WEEKDAY_NAMES = ('月', '火', '水', '木', '金', '土', '日')
+
+# 空き枠がないときの候補日ブロック
+NO_AVAILABLE_DATES = "・現在ご案内できる空き枠がございません。担当者より日程をご連絡いたします。"
+
+# 投稿・季節情報に反映するトレンドの件数
+TREND_HASHTAG_LIMIT = 3
+TREND_KEYWORD_LIMIT = 5
+
+# 複数候補生成時、スコア上位この件数からスコアに比例した確率で投稿を選ぶ
+POST_TOP_K = 10
+
+# 投稿ごとにランダム選択されるテンプレート変数
+RANDOM_FIELDS = ("area", "service", "proposal", "review")
+
+_TEMPLATE_FIELD = re.compile(r"\{(\w+)\}")
+
+class _KeepMissing(dict):
+    """未定義の変数は {key} のまま残す"""
+    def __missing__(self, key):
+        return "{" + key + "}"
+
+class CompiledTemplate:
+    """事前コンパイル済みテンプレート（レンダリングプラン）"""
+    __slots__ = ("source", "fields", "random_fields", "_literals", "_field_seq", "_format")
+
+    def __init__(self, source: str):
+        parts = _TEMPLATE_FIELD.split(source)
+        self.source = source
+        self._literals = tuple(p.replace("{", "{{").replace("}", "}}") for p in parts[0::2])
+        self._field_seq = tuple(parts[1::2])
+        self.fields = tuple(dict.fromkeys(self._field_seq))
+        self.random_fields = tuple(f for f in RANDOM_FIELDS if f in self.fields)
+        self._format = self._build_format(lambda field: "{" + field + "}")
+
+    def _build_format(self, placeholder) -> str:
+        """フィールドごとの置換文字列からformat文字列を組み立てる"""
+        return self._literals[0] + "".join(
+            placeholder(field) + literal
+            for field, literal in zip(self._field_seq, self._literals[1:])
+        )
+
+    def render(self, variables: Dict[str, str]) -> str:
+        """変数を埋め込んだ文字列を返す"""
+        return self._format.format_map(_KeepMissing(variables))
+
+    def bind(self, constants: Dict[str, str], choices: Dict) -> "BoundTemplate":
+        """固定値を埋め込み、ランダム変数だけを残したプランを返す"""
+        slots = {field: i for i, field in enumerate(self.random_fields)}
+
+        def placeholder(field):
+            if field in slots:
+                return "{" + str(slots[field]) + "}"
+            value = constants.get(field, "{" + field + "}")
+            return str(value).replace("{", "{{").replace("}", "}}")
+
+        pools = tuple(tuple(choices[field]) for field in self.random_fields)
+        return BoundTemplate(self, self._build_format(placeholder), pools)
+
+class BoundTemplate:
+    """固定値埋め込み済みプラン
+
+    ランダム変数の組み合わせ空間を混合基数の整数インデックスで表し、
+    描画結果をインデックスごとにキャッシュする。
+    """
+    __slots__ = ("template", "pools", "size", "_format", "_cache")
+
+    def __init__(self, template: CompiledTemplate, fmt: str, pools):
+        self.template = template
+        self.pools = pools
+        self.size = 1
+        for pool in pools:
+            self.size *= len(pool)
+        self._format = fmt
+        self._cache = {}
+
+    @property
+    def key(self) -> str:
+        """指紋計算用のテンプレート原文（季節・トレンドなどの固定値を含まない）"""
+        return self.template.source
+
+    def values_at(self, index: int) -> tuple:
+        """組み合わせインデックス → ランダム変数の値タプル"""
+        values = []
+        for pool in reversed(self.pools):
+            index, i = divmod(index, len(pool))
+            values.append(pool[i])
+        return tuple(reversed(values))
+
+    def render(self, *values: str) -> str:
+        """ランダム変数の値を位置引数で受け取り描画"""
+        return self._format.format(*values)
+
+    def render_index(self, index: int) -> str:
+        """組み合わせインデックスの投稿を描画（キャッシュ付き）"""
+        text = self._cache.get(index)
+        if text is None:
+            text = self._cache[index] = self._format.format(*self.values_at(index))
+        return text
+
+@lru_cache(maxsize=None)
+def compile_template(template: str) -> CompiledTemplate:
+    """テンプレート文字列をレンダリングプランへ変換（キャッシュ付き）"""
+    return CompiledTemplate(template)
+
+@lru_cache(maxsize=1)
+def default_compiled_templates() -> Dict:
+    """共有テンプレートのコンパイル結果（プロセス内で1回だけ構築）"""
+    return compile_templates(CONTENT_TEMPLATES)
+
+def compile_templates(templates: Dict) -> Dict:
+    """テンプレート辞書全体をコンパイル"""
+    compiled = {}
+    for key, value in templates.items():
+        if isinstance(value, dict):
+            compiled[key] = compile_templates(value)
+        elif isinstance(value, (list, tuple)):
+            compiled[key] = tuple(compile_template(t) for t in value)
+        else:
+            compiled[key] = compile_template(value)
+    return compiled
+
+# コンテンツテンプレート（不変・全テナント共有）
+CONTENT_TEMPLATES = {
+    "instagram_post": {
+        "施工事例": (
+            "🏠{area}での{service}工事が完成しました！\n✨お客様に大変喜んでいただけました\n\n{seasonal_message}\n\n📞無料相談受付中\n\n#外構工事 #{service} #{area} #エクステリア #庭づくり #{season}{trend_hashtags}",
+            
+            "📍新築外構工事完了のお知らせ\n{service}の施工が完了いたしました！\n\n{season}にぴったりの仕上がりになりました✨\nお客様にも大変喜んでいただけました😊\n\n無料お見積もり承ります\n\n#新築外構 #{service} #庭 #エクステリア #{season} #無料見積もり{trend_hashtags}"
+        ),
         
-        print(f"🏗️ 外構AI自動集客システム初期化完了")
-        print(f"📅 現在の季節: {self.current_season['name']}")
-    
-    def get_current_season(self) -> Dict:
-        """現在の季節情報取得"""
-        month = datetime.now().month
+        "季節提案": (
+            "🌸{season}の庭づくりシーズンですね！\n{proposal}はいかがですか？\n\n今なら無料お見積もり実施中✨\nお気軽にDMまたはお電話ください📱\n\n#{season} #{proposal} #庭づくり #エクステリア #無料見積もり #外構工事{trend_hashtags}",
+            
+            "{season}におすすめの{proposal}のご提案💡\n\nお客様のご要望に合わせて\n最適なプランをご提案いたします\n\n📞お気軽にお問い合わせください\n\n#{season} #{proposal} #外構 #エクステリア #オーダーメイド{trend_hashtags}"
+        ),
         
-        if month in [3, 4, 5]:
-            return {
-                "name": "春",
-                "keywords": ["新緑", "花壇", "春の庭づくり", "新生活"],
-                "services": ["ガーデニング", "花壇設置", "芝張り"],
-                "campaigns": ["春の庭づくりキャンペーン", "新築外構相談会"],
-                "colors": ["#90EE90", "#98FB98", "#F0FFF0"]
-            }
-        elif month in [6, 7, 8]:
-            return {
-                "name": "夏", 
-                "keywords": ["日よけ", "パーゴラ", "夏の快適空間"],
-                "services": ["パーゴラ設置", "日よけ工事", "水栓設置"],
-                "campaigns": ["夏の快適外構キャンペーン", "日よけ工事特別価格"],
-                "colors": ["#87CEEB", "#E0F6FF", "#B0E0E6"]
-            }
-        elif month in [9, 10, 11]:
-            return {
-                "name": "秋",
-                "keywords": ["紅葉", "年末工事", "冬支度"],
-                "services": ["メンテナンス", "冬支度工事", "落ち葉対策"],
-                "campaigns": ["年末工事キャンペーン", "冬支度メンテナンス"],
-                "colors": ["#DEB887", "#D2691E", "#CD853F"]
-            }
-        else:
-            return {
-                "name": "冬",
-                "keywords": ["雪対策", "防寒", "春の準備"],
-                "services": ["雪対策工事", "防寒対策", "春工事準備"],
-                "campaigns": ["雪対策キャンペーン", "春工事早期予約"],
-                "colors": ["#F0F8FF", "#E6E6FA", "#F5F5F5"]
-            }
-    
-    def initialize_templates(self) -> Dict:
-        """コンテンツテンプレート初期化"""
-        return {
-            "instagram_post": {
-                "施工事例": [
-                    "🏠{area}での{service}工事が完成しました！\n✨お客様に大変喜んでいただけました\n\n{seasonal_message}\n\n📞無料相談受付中\n\n#外構工事 #{service} #{area} #エクステリア #庭づくり #{season}",
-                    
-                    "📍新築外構工事完了のお知らせ\n{service}の施工が完了いたしました！\n\n{season}にぴったりの仕上がりになりました✨\nお客様にも大変喜んでいただけました😊\n\n無料お見積もり承ります\n\n#新築外構 #{service} #庭 #エクステリア #{season} #無料見積もり"
-                ],
-                
-                "季節提案": [
-                    "🌸{season}の庭づくりシーズンですね！\n{proposal}はいかがですか？\n\n今なら無料お見積もり実施中✨\nお気軽にDMまたはお電話ください📱\n\n#{season} #{proposal} #庭づくり #エクステリア #無料見積もり #外構工事",
-                    
-                    "{season}におすすめの{proposal}のご提案💡\n\nお客様のご要望に合わせて\n最適なプランをご提案いたします\n\n📞お気軽にお問い合わせください\n\n#{season} #{proposal} #外構 #エクステリア #オーダーメイド"
-                ],
-                
-                "お客様の声": [
-                    "👥お客様の声をご紹介✨\n\n「{review}」\n\nありがとうございます！\nお客様の笑顔が私たちの励みです😊\n\n引き続きよろしくお願いいたします🙏\n\n#お客様の声 #外構工事 #エクステリア #感謝 #満足",
-                    
-                    "😊嬉しいお言葉をいただきました！\n\n「{review}」\n\nこのようなお言葉をいただけることが\n私たちの一番の喜びです✨\n\n#お客様満足 #外構 #エクステリア #ありがとうございます #信頼"
-                ]
-            },
+        "お客様の声": (
+            "👥お客様の声をご紹介✨\n\n「{review}」\n\nありがとうございます！\nお客様の笑顔が私たちの励みです😊\n\n引き続きよろしくお願いいたします🙏\n\n#お客様の声 #外構工事 #エクステリア #感謝 #満足{trend_hashtags}",
             
-            "email_response": {
-                "inquiry": """
+            "😊嬉しいお言葉をいただきました！\n\n「{review}」\n\nこのようなお言葉をいただけることが\n私たちの一番の喜びです✨\n\n#お客様満足 #外構 #エクステリア #ありがとうございます #信頼{trend_hashtags}"
+        )
+    },
+    
+    "email_response": {
+        "inquiry": """
 {customer_name}様
 
 この度は、弊社へお問い合わせいただき誠にありがとうございます。
@@ -128,8 +246,8 @@ class ExteriorMarketingAI:
 
 {company_signature}
                 """,
-                
-                "follow_up": """
+        
+        "follow_up": """
 {customer_name}様
 
 先日は貴重なお時間をいただき、ありがとうございました。
@@ -142,12 +260,156 @@ class ExteriorMarketingAI:
 
 {company_signature}
                 """
-            }
-        }
+    }
+}
+
+@dataclass
+class BusinessConfig:
+    """外構業界ビジネス設定"""
+    company_name: str = "エクステリア工房"
+    target_areas: List[str] = None
+    services: List[str] = None
+    contact_email: str = "info@exterior-example.com"
+    contact_phone: str = "090-1234-5678"
+    daily_ad_cost: float = 0.0  # 1日あたりの広告費（分析データのROI計算用）
     
+    def __post_init__(self):
+        if self.target_areas is None:
+            self.target_areas = ["東京", "神奈川", "埼玉", "千葉"]
+        if self.services is None:
+            self.services = [
+                "ウッドデッキ設置", "カーポート工事", "フェンス設置",
+                "門扉工事", "庭園設計", "駐車場工事", "植栽工事"
+            ]
+        # 投稿テンプレートの {area} / {service} は必ずどれかを選ぶので空リストは不可
+        for name in ("target_areas", "services"):
+            if not getattr(self, name):
+                raise ValueError(f"{name} が空です（1件以上指定してください）")
+
+def _choose_weighted(scored: List[Tuple[str, float]], rng) -> Tuple[str, float]:
+    """（投稿, スコア）の一覧からスコアに比例した確率で1件選ぶ（全て0なら一様）"""
+    weights = [score for _, score in scored]
+    return rng.choices(scored, weights=weights if any(weights) else None)[0]
+
+class _NoStage:
+    """計測なしのステージ（recorder未指定時に使用）"""
+    output = None
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+class ExteriorMarketingAI:
+    """外構業界AI自動集客システム"""
+    
+    def __init__(self, config: Optional[BusinessConfig] = None,
+                 clock: Optional[Callable[[], datetime]] = None, history=None):
+        # 環境変数から設定取得
+        self.openai_api_key = os.environ.get('OPENAI_API_KEY')
+        self.github_token = os.environ.get('GITHUB_TOKEN')
+        
+        # LLM生成バックエンド（enable_llm で有効化）
+        self.llm = None
+        
+        # ビジネス設定
+        self.config = config or BusinessConfig()
+        
+        # 現在時刻の取得元（テスト・過去日付の再生成時に差し替え可能）
+        self.clock = clock or datetime.now
+        self._season_month = None
+        self._season = None
+        
+        # トレンド（apply_trends で設定、季節キーワードと投稿のハッシュタグに反映）
+        self.trend_keywords: Tuple[str, ...] = ()
+        self.trend_hashtags: Tuple[str, ...] = ()
+        self.hashtag_weights: Dict[str, float] = {}
+        
+        # 1投稿あたりの生成候補数（2以上でバイラルスコア上位からスコア比例で抽選）
+        try:
+            self.post_candidates = int(os.environ.get('MARKETING_POST_CANDIDATES', '1'))
+        except ValueError:
+            print(f"⚠️ MARKETING_POST_CANDIDATES が不正です（1候補で生成）: {os.environ['MARKETING_POST_CANDIDATES']}")
+            self.post_candidates = 1
+        
+        # 投稿履歴（content_history.ContentHistory、指定時は未使用の組み合わせだけを投稿）
+        self.history = history
+        self._samplers = {}
+        
+        # 現地調査の空き枠（availability.AvailabilityEngine、enable_availability で有効化）
+        self.availability = None
+    
+    @cached_property
+    def content_templates(self) -> Dict:
+        """コンテンツテンプレート（初回利用時に構築）"""
+        return self.initialize_templates()
+
+    @cached_property
+    def compiled_templates(self) -> Dict:
+        """コンパイル済みテンプレート（初回利用時に構築）"""
+        if self.content_templates is CONTENT_TEMPLATES:
+            return default_compiled_templates()
+        return compile_templates(self.content_templates)
+    
+    @property
+    def current_season(self) -> Season:
+        """現在の季節情報（月が変わったときだけ再解決）"""
+        month = self.clock().month
+        if month != self._season_month:
+            season = season_for_month(month)
+            if self.trend_keywords:
+                trends = tuple(k for k in self.trend_keywords if k not in season.keywords)
+                season = replace(season, keywords=season.keywords + trends)
+            self._season = season
+            self._season_month = month
+        return self._season
+
+    def get_current_season(self) -> Season:
+        """現在の季節情報取得"""
+        return self.current_season
+    
+    def apply_trends(self, keywords=(), hashtags=(), hashtag_weights: Optional[Dict[str, float]] = None):
+        """トレンドキーワード・ハッシュタグを反映（季節キーワードと投稿のハッシュタグに追加）"""
+        self.trend_keywords = tuple(keywords)[:TREND_KEYWORD_LIMIT]
+        self.trend_hashtags = tuple(hashtags)[:TREND_HASHTAG_LIMIT]
+        if hashtag_weights is not None:
+            self.hashtag_weights = dict(hashtag_weights)
+        self._season_month = None
+    
+    def get_trend_hashtags(self) -> str:
+        """投稿末尾に追加するトレンドハッシュタグ"""
+        return "".join(f" #{tag}" for tag in self.trend_hashtags)
+    
+    def initialize_templates(self) -> Dict:
+        """コンテンツテンプレート初期化（全インスタンス・全テナントで共有）"""
+        return CONTENT_TEMPLATES
+
+    def set_templates(self, templates: Optional[Dict] = None):
+        """コンテンツテンプレートを差し替え（None で共有テンプレートに戻す、常駐プロセスの再読み込み用）"""
+        self.content_templates = templates if templates is not None else CONTENT_TEMPLATES
+        self.__dict__.pop("compiled_templates", None)
+        self._samplers = {}
+
     def generate_instagram_post(self, post_type: str = "auto") -> str:
         """Instagram投稿自動生成"""
         try:
+            if self.post_candidates > 1:
+                post_content, score = self.pick_scored_post(post_type)
+                if self.history is not None:
+                    self.history.save()
+                print(f"📱 Instagram投稿生成完了: {post_type}（{self.post_candidates}候補の上位{POST_TOP_K}件から抽選 スコア {score:.2f}）")
+                return post_content
+            
+            if self.history is not None:
+                post_content = self.get_unique_sampler(self._resolve_post_types(post_type)).draw()
+                self.history.save()
+                print(f"📱 Instagram投稿生成完了: {post_type}（重複なし）")
+                return post_content
+
             if post_type == "auto":
                 post_type = random.choice(["施工事例", "季節提案", "お客様の声"])
             
@@ -163,69 +425,157 @@ class ExteriorMarketingAI:
             print(f"Instagram投稿生成エラー: {e}")
             return self.get_fallback_post()
     
+    def generate_instagram_posts(self, n: int, post_type: str = "auto",
+                                 seed: Optional[int] = None) -> Iterator[str]:
+        """Instagram投稿バッチ生成（ジェネレータ）
+
+        テンプレートはコンパイル済みプランを使い、季節・署名などの固定値は
+        バッチごとに1回だけ解決する。seed指定時は同じ出力を再現できる。
+        履歴（history）設定時は未使用の組み合わせだけを非復元抽出する。
+        """
+        post_types = self._resolve_post_types(post_type)
+        if self.history is not None:
+            return self._iter_unique_posts(n, post_types, seed)
+        return self._iter_instagram_posts(n, post_types, random.Random(seed))
+
+    def get_viral_scorer(self):
+        """季節キーワード・トレンド・ハッシュタグ反応実績からバイラルスコア計算器を作成"""
+        from viral_scoring import ViralScorer
+        return ViralScorer(self.current_season.keywords, self.trend_hashtags, self.hashtag_weights)
+
+    def select_best_posts(self, k: int = 5, candidates: int = 10000, post_type: str = "auto",
+                          seed: Optional[int] = None, scorer=None) -> List[Tuple[str, float]]:
+        """候補を多めに生成し、バイラルスコア上位k件の（投稿, スコア）を返す
+
+        候補生成は履歴を使わない通常のバッチ生成で行う。
+        """
+        texts = list(self._iter_instagram_posts(candidates, self._resolve_post_types(post_type),
+                                                random.Random(seed)))
+        return (scorer or self.get_viral_scorer()).top_k(texts, k)
+
+    def pick_scored_post(self, post_type: str = "auto", rng: Optional[random.Random] = None,
+                         scorer=None) -> Tuple[str, float]:
+        """post_candidates 件の候補のスコア上位 POST_TOP_K 件から、スコアに比例した確率で1件選ぶ
+
+        履歴（history）設定時は未使用の組み合わせだけを候補にし、選んだ1件を履歴に記録する。
+        """
+        rng = rng or random
+        scorer = scorer or self.get_viral_scorer()
+        if self.history is None:
+            top = self.select_best_posts(POST_TOP_K, self.post_candidates, post_type, scorer=scorer)
+            return _choose_weighted(top, rng)
+
+        sampler = self.get_unique_sampler(self._resolve_post_types(post_type))
+        picked = sampler.draw_candidates(self.post_candidates)
+        candidates = {}
+        for item in picked:
+            candidates.setdefault(sampler.render(item), item)
+        post_content, score = _choose_weighted(scorer.top_k(list(candidates), POST_TOP_K), rng)
+        sampler.accept(candidates[post_content], picked)
+        return post_content, score
+
+    def _resolve_post_types(self, post_type: str) -> Tuple[str, ...]:
+        """投稿タイプ指定を候補タプルに変換"""
+        plans = self.compiled_templates["instagram_post"]
+        if post_type == "auto":
+            return tuple(plans)
+        if post_type in plans:
+            return (post_type,)
+        raise ValueError(f"不明な投稿タイプ: {post_type}")
+
+    def bind_post_plans(self, post_types: Tuple[str, ...]) -> List[tuple]:
+        """投稿タイプごとに固定値を埋め込んだプランを作成"""
+        choices = self.get_variable_choices()
+        constants = self.get_constant_variables()
+        return [
+            tuple(plan.bind(constants, choices)
+                  for plan in self.compiled_templates["instagram_post"][ptype])
+            for ptype in post_types
+        ]
+
+    def get_unique_sampler(self, post_types: Tuple[str, ...], seed: Optional[int] = None):
+        """重複なし抽出器を取得（季節・設定ごとにキャッシュ、seed指定時は新規作成）"""
+        from content_history import UniqueCombinationSampler
+
+        if seed is not None:
+            return UniqueCombinationSampler(self.bind_post_plans(post_types), self.history,
+                                            random.Random(seed))
+        key = (self.current_season.name, self.trend_hashtags, post_types, id(self.config), id(self.history))
+        sampler = self._samplers.get(key)
+        if sampler is None:
+            sampler = self._samplers[key] = UniqueCombinationSampler(
+                self.bind_post_plans(post_types), self.history)
+        return sampler
+
+    def _iter_unique_posts(self, n: int, post_types, seed: Optional[int]) -> Iterator[str]:
+        """履歴を使った重複なしバッチ生成"""
+        sampler = self.get_unique_sampler(post_types, seed)
+        try:
+            for _ in range(n):
+                yield sampler.draw()
+        finally:
+            self.history.save()
+        print(f"📱 Instagram投稿バッチ生成完了: {n}件（重複なし）")
+
+    def _iter_instagram_posts(self, n: int, post_types, rng: random.Random) -> Iterator[str]:
+        """generate_instagram_posts の本体"""
+        type_plans = self.bind_post_plans(post_types)
+        rand = rng.random
+
+        # 投稿タイプ → テンプレート → 変数の組み合わせの順に一様抽選
+        for _ in range(n):
+            candidates = type_plans[int(rand() * len(type_plans))]
+            plan = candidates[int(rand() * len(candidates))]
+            yield plan.render_index(int(rand() * plan.size))
+
+        print(f"📱 Instagram投稿バッチ生成完了: {n}件")
+
+    def get_variable_choices(self) -> Dict:
+        """ランダム選択されるテンプレート変数の候補一覧"""
+        return {
+            "area": self.config.target_areas,
+            "service": self.config.services,
+            "proposal": self.current_season.services,
+            "review": CUSTOMER_REVIEWS
+        }
+
+    def get_constant_variables(self) -> Dict:
+        """投稿ごとに変わらないテンプレート変数"""
+        return {
+            "season": self.current_season.name,
+            "seasonal_message": self.get_seasonal_message(),
+            "trend_hashtags": self.get_trend_hashtags(),
+            "company_signature": f"{self.config.company_name}\n担当: 田中\n電話: {self.config.contact_phone}"
+        }
+
     def fill_template_variables(self, template: str, post_type: str) -> str:
         """テンプレート変数埋め込み"""
         variables = {
             "area": random.choice(self.config.target_areas),
             "service": random.choice(self.config.services),
-            "season": self.current_season["name"],
+            "season": self.current_season.name,
             "seasonal_message": self.get_seasonal_message(),
-            "proposal": random.choice(self.current_season["services"]),
+            "proposal": random.choice(self.current_season.services),
             "review": self.get_customer_review(),
+            "trend_hashtags": self.get_trend_hashtags(),
             "company_signature": f"{self.config.company_name}\n担当: 田中\n電話: {self.config.contact_phone}"
         }
         
         # テンプレート変数を実際の値に置換
-        filled_template = template
-        for key, value in variables.items():
-            filled_template = filled_template.replace(f"{{{key}}}", str(value))
-        
-        return filled_template
+        return compile_template(template).render(variables)
     
     def get_seasonal_message(self) -> str:
         """季節メッセージ取得"""
-        messages = {
-            "春": "新緑の季節に新しい庭でお過ごしください🌱",
-            "夏": "夏の日差しに映える素敵な外構です☀️", 
-            "秋": "紅葉の季節も美しい庭になりました🍁",
-            "冬": "雪化粧も美しい冬の庭です❄️"
-        }
-        return messages.get(self.current_season["name"], "素敵な外構でお過ごしください✨")
+        return SEASONAL_MESSAGES.get(self.current_season.name, "素敵な外構でお過ごしください✨")
     
     def get_customer_review(self) -> str:
         """お客様の声取得"""
-        reviews = [
-            "思っていた以上に素敵な庭になりました",
-            "丁寧な施工で安心してお任せできました",
-            "提案力が素晴らしく、理想の外構になりました", 
-            "アフターフォローもしっかりしていて信頼できます",
-            "価格も適正で、仕上がりに大満足です",
-            "近所の方からもお褒めの言葉をいただきました",
-            "季節ごとの手入れ方法も教えていただき助かります"
-        ]
-        return random.choice(reviews)
+        return random.choice(CUSTOMER_REVIEWS)
     
     def auto_email_response(self, inquiry_data: Dict) -> str:
         """問い合わせ自動返信生成"""
         try:
-            template = self.content_templates["email_response"]["inquiry"]
-            
-            # 利用可能日時生成
-            available_dates = self.generate_available_dates()
-            
-            variables = {
-                "customer_name": inquiry_data.get('name', 'お客様'),
-                "service": inquiry_data.get('service', '外構工事'),
-                "inquiry_content": inquiry_data.get('content', 'お問い合わせ'),
-                "seasonal_proposal": random.choice(self.current_season["campaigns"]),
-                "available_dates": available_dates,
-                "company_signature": f"{self.config.company_name}\n担当: 田中\nメール: {self.config.contact_email}\n電話: {self.config.contact_phone}"
-            }
-            
-            # テンプレート変数置換
-            email_content = template
-            for key, value in variables.items():
-                email_content = email_content.replace(f"{{{key}}}", str(value))
+            email_content = self.render_inquiry_reply(inquiry_data)
             
             print(f"✉️ 自動返信メール生成完了: {inquiry_data.get('name', '不明')}")
             return email_content
@@ -233,56 +583,71 @@ class ExteriorMarketingAI:
         except Exception as e:
             print(f"自動返信生成エラー: {e}")
             return "お問い合わせありがとうございます。後日ご連絡いたします。"
+
+    def render_inquiry_reply(self, inquiry_data: Dict, available_dates: Optional[str] = None,
+                             company_signature: Optional[str] = None,
+                             rng: Optional[random.Random] = None) -> str:
+        """問い合わせ返信本文生成（例外はそのまま送出）
+
+        一括処理では available_dates / company_signature を事前計算して渡す。
+        """
+        if not isinstance(inquiry_data, dict):
+            raise TypeError(f"問い合わせデータは辞書である必要があります: {type(inquiry_data).__name__}")
+
+        if available_dates is None:
+            available_dates = self.generate_available_dates(area=inquiry_data.get('area'))
+        if company_signature is None:
+            company_signature = self.get_company_signature()
+
+        variables = {
+            "customer_name": inquiry_data.get('name') or 'お客様',
+            "service": inquiry_data.get('service') or '外構工事',
+            "inquiry_content": inquiry_data.get('content') or 'お問い合わせ',
+            "seasonal_proposal": (rng or random).choice(self.current_season.campaigns),
+            "available_dates": available_dates,
+            "company_signature": company_signature
+        }
+        return self.compiled_templates["email_response"]["inquiry"].render(variables)
+
+    def get_company_signature(self) -> str:
+        """メール用会社署名"""
+        return f"{self.config.company_name}\n担当: 田中\nメール: {self.config.contact_email}\n電話: {self.config.contact_phone}"
     
-    def generate_available_dates(self) -> str:
-        """利用可能日時生成"""
+    def generate_available_dates(self, base_date: Optional[datetime] = None,
+                                 area: Optional[str] = None) -> str:
+        """利用可能日時生成（空き枠エンジン有効時は予約・休業日・施工班の空きを反映）"""
+        base_date = base_date or self.clock()
+        if self.availability is not None:
+            from availability import format_slots
+            slots = self.availability.free_slots(base_date, area)
+            return format_slots(slots) if slots else NO_AVAILABLE_DATES
         dates = []
         for i in range(3, 10):  # 3-10日後の候補
-            date = datetime.now() + timedelta(days=i)
+            date = base_date + timedelta(days=i)
             if date.weekday() < 5:  # 平日のみ
-                dates.append(f"{date.strftime('%m月%d日')}（{['月','火','水','木','金','土','日'][date.weekday()]}）")
+                dates.append(f"{date.strftime('%m月%d日')}（{WEEKDAY_NAMES[date.weekday()]}）")
         
         return "\n".join(f"・{date} 9:00-17:00" for date in dates[:5])
     
+    def get_image_style(self):
+        """現在の季節・会社情報から画像スタイルを取得"""
+        from image_renderer import ImageStyle
+
+        return ImageStyle(
+            bg_color=self.current_season.colors[0],
+            contact_email=self.config.contact_email,
+            contact_phone=self.config.contact_phone
+        )
+
     def create_simple_image(self, post_text: str, post_type: str) -> str:
         """シンプル画像作成"""
         try:
-            from PIL import Image, ImageDraw, ImageFont
-            
-            # 季節に応じた背景色
-            bg_color = self.current_season["colors"][0]
-            
-            # 1080x1080のInstagram正方形画像
-            img = Image.new('RGB', (1080, 1080), color=bg_color)
-            draw = ImageDraw.Draw(img)
+            from image_renderer import render_post_image
             
-            # テキスト配置
-            lines = post_text.split('\n')
-            y_position = 100
-            
-            for line in lines:
-                if line.strip():
-                    if line.startswith('#'):
-                        color = '#4a7c59'
-                        y_position += 35
-                    elif any(emoji in line for emoji in ['🏠', '📍', '🌸', '👥', '😊']):
-                        color = '#2d5016'  
-                        y_position += 45
-                    else:
-                        color = '#1a4009'
-                        y_position += 40
-                    
-                    # テキスト描画（フォント指定なしでシンプルに）
-                    draw.text((50, y_position), line, fill=color)
-            
-            # 会社情報
-            draw.text((50, 980), f"📧 {self.config.contact_email}", fill='#666666')
-            draw.text((50, 1020), f"📞 {self.config.contact_phone}", fill='#666666')
-            
-            # 画像保存
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            filename = f"post_{post_type}_{timestamp}.jpg"
-            img.save(filename)
+            # 季節背景＋会社情報はベース画像としてキャッシュ済み
+            timestamp = self.clock().strftime('%Y%m%d_%H%M%S')
+            filename = render_post_image(post_text, f"post_{post_type}_{timestamp}.jpg",
+                                         self.get_image_style())
             
             print(f"🖼️ 画像作成完了: {filename}")
             return filename
@@ -293,10 +658,134 @@ class ExteriorMarketingAI:
         except Exception as e:
             print(f"画像作成エラー: {e}")
             return "error.jpg"
+
+    def create_simple_images(self, post_texts: List[str], post_type: str,
+                             output_dir: str = "", quality: int = 75, optimize: bool = False,
+                             max_workers: Optional[int] = None) -> List[str]:
+        """シンプル画像一括作成（プロセスプールで並列レンダリング）"""
+        try:
+            from image_renderer import ImageRenderSettings, render_post_images
+
+            timestamp = self.clock().strftime('%Y%m%d_%H%M%S')
+            filenames = [f"post_{post_type}_{timestamp}_{i:05d}.jpg" for i in range(len(post_texts))]
+            settings = ImageRenderSettings(quality=quality, optimize=optimize, output_dir=output_dir)
+            paths = render_post_images(post_texts, filenames, self.get_image_style(),
+                                       settings, max_workers=max_workers)
+
+            print(f"🖼️ 画像一括作成完了: {len(paths)}件")
+            return paths
+
+        except ImportError:
+            print("⚠️ PIL(Pillow)がインストールされていません")
+            return []
+        except Exception as e:
+            print(f"画像作成エラー: {e}")
+            return []
+
+    def create_platform_variants(self, post_text: str, post_type: str, output_dir: str = "") -> List[Dict]:
+        """全プラットフォーム向けの画像・キャプション作成（共有マスター画像から派生）"""
+        try:
+            from platform_variants import render_platform_variants
+
+            if output_dir:
+                os.makedirs(output_dir, exist_ok=True)
+            timestamp = self.clock().strftime('%Y%m%d_%H%M%S')
+            variants = render_platform_variants(post_text, f"post_{post_type}_{timestamp}",
+                                                self.get_image_style(), output_dir=output_dir)
+
+            print(f"🖼️ プラットフォーム別画像作成完了: {len(variants)}件")
+            return variants
+
+        except ImportError:
+            print("⚠️ PIL(Pillow)がインストールされていません")
+            return []
+        except Exception as e:
+            print(f"画像作成エラー: {e}")
+            return []
+
+    def create_reel(self, post_text: str, post_type: str, output_dir: str = "") -> str:
+        """リール動画作成（投稿画像と同じ背景に1行ずつテキストを表示）"""
+        try:
+            from reel_renderer import ReelSettings, render_reel
+
+            # 同じ秒に複数回呼ばれても上書きしないよう短いランダム接尾辞を付ける
+            timestamp = self.clock().strftime('%Y%m%d_%H%M%S')
+            filename = render_reel(post_text, f"reel_{post_type}_{timestamp}_{uuid.uuid4().hex[:8]}.mp4",
+                                   self.get_image_style(), ReelSettings(output_dir=output_dir))
+
+            print(f"🎬 リール動画作成完了: {filename}")
+            return filename
+
+        except ImportError as e:
+            print(f"⚠️ {e}")
+            return "no_video.mp4"
+        except Exception as e:
+            print(f"動画作成エラー: {e}")
+            return "error.mp4"
+
+    def create_reels(self, post_texts: List[str], post_type: str, output_dir: str = "",
+                     max_workers: Optional[int] = None) -> List[str]:
+        """リール動画一括作成（プロセスプールで並列エンコード）"""
+        try:
+            from reel_renderer import ReelSettings, render_reels
+
+            timestamp = self.clock().strftime('%Y%m%d_%H%M%S')
+            filenames = [f"reel_{post_type}_{timestamp}_{i:05d}.mp4" for i in range(len(post_texts))]
+            paths = render_reels(post_texts, filenames, self.get_image_style(),
+                                 ReelSettings(output_dir=output_dir), max_workers=max_workers)
+
+            print(f"🎬 リール動画一括作成完了: {len(paths)}件")
+            return paths
+
+        except ImportError as e:
+            print(f"⚠️ {e}")
+            return []
+        except Exception as e:
+            print(f"動画作成エラー: {e}")
+            return []
     
+    def enable_availability(self, path: str = "availability.sqlite3", **settings):
+        """現地調査の空き枠エンジンを有効化（施工班未登録なら全エリア対応の1班を登録）"""
+        from availability import AvailabilityEngine
+
+        self.availability = AvailabilityEngine(path, **settings)
+        if not self.availability.crews_for_area(None):
+            self.availability.add_crew("default")
+        return self.availability
+
+    def enable_llm(self, llm_config=None, client=None):
+        """LLM生成バックエンドを有効化（未指定時は環境変数から設定、client 指定時はそれを共用）
+
+        有効化すると run_daily_automation の投稿・返信もLLM版で生成する。
+        """
+        if client is None:
+            from llm_backend import AsyncLLMClient, LLMConfig
+            client = AsyncLLMClient(llm_config or LLMConfig.from_env(api_key=self.openai_api_key))
+        self.llm = client
+        return self.llm
+
+    async def agenerate_instagram_post(self, post_type: str = "auto") -> str:
+        """Instagram投稿生成（LLM版、締切超過・エラー時はテンプレート版）"""
+        draft = self.generate_instagram_post(post_type)
+        if self.llm is None:
+            return draft
+
+        from llm_backend import build_post_prompt
+        return await self.llm.complete_or_fallback(
+            build_post_prompt(draft, self.current_season.name), draft)
+
+    async def aauto_email_response(self, inquiry_data: Dict) -> str:
+        """問い合わせ自動返信生成（LLM版、締切超過・エラー時はテンプレート版）"""
+        draft = self.auto_email_response(inquiry_data)
+        if self.llm is None:
+            return draft
+
+        from llm_backend import build_reply_prompt
+        return await self.llm.complete_or_fallback(build_reply_prompt(draft), draft)
+
     def get_fallback_post(self) -> str:
         """フォールバック投稿"""
-        return f"""🏗️ {self.current_season['name']}の外構工事承ります！
+        return f"""🏗️ {self.current_season.name}の外構工事承ります！
 
 ✨ 地域密着20年の実績
 🔧 無料現地調査・見積もり
@@ -304,58 +793,169 @@ class ExteriorMarketingAI:
 
 {self.config.contact_phone}
 
-#外構工事 #エクステリア #{self.current_season['name']} #地域密着 #無料見積もり"""
+#外構工事 #エクステリア #{self.current_season.name} #地域密着 #無料見積もり"""
     
-    def run_daily_automation(self):
-        """日次自動化実行"""
+    def run_daily_automation(self, render_image: bool = True, recorder=None):
+        """日次自動化実行
+
+        render_image=False の場合は画像作成をスキップする（複数テナント実行時は
+        画像をプロセスプールでまとめて描画するため）。
+        recorder（instrumentation.StageRecorder）を渡すと各ステージを計測する。
+        LLM有効時（enable_llm）は投稿・返信をLLM版で生成する（イベントループ外から呼ぶこと）。
+        """
+        stage = recorder.stage if recorder is not None else _NoStage
         try:
-            print(f"🚀 日次自動化開始: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+            print(f"🚀 日次自動化開始: {self.clock().strftime('%Y-%m-%d %H:%M:%S')}")
             
             # 1. Instagram投稿生成
-            instagram_post = self.generate_instagram_post()
+            with stage("post") as current:
+                if self.llm is not None:
+                    instagram_post = self.llm.run_sync(self.agenerate_instagram_post())
+                else:
+                    instagram_post = self.generate_instagram_post()
+                current.output = instagram_post
             print(f"📱 Instagram投稿:\n{instagram_post}")
             
             # 2. 簡易画像作成
-            image_path = self.create_simple_image(instagram_post, "daily")
-            print(f"🖼️ 画像作成: {image_path}")
+            image_path = None
+            if render_image:
+                with stage("image") as current:
+                    image_path = current.output = self.create_simple_image(instagram_post, "daily")
+                print(f"🖼️ 画像作成: {image_path}")
             
             # 3. 問い合わせ自動返信例
             sample_inquiry = {
                 "name": "田中太郎",
                 "service": "ウッドデッキ設置", 
+                "area": next(iter(self.config.target_areas), None),
                 "content": "庭にウッドデッキを設置したいと考えています。見積もりをお願いします。"
             }
-            email_response = self.auto_email_response(sample_inquiry)
+            with stage("email") as current:
+                if self.llm is not None:
+                    email_response = self.llm.run_sync(self.aauto_email_response(sample_inquiry))
+                else:
+                    email_response = self.auto_email_response(sample_inquiry)
+                current.output = email_response
             print(f"✉️ 自動返信例:\n{email_response[:200]}...")
             
             # 4. 季節キャンペーン提案
-            campaign = random.choice(self.current_season["campaigns"])
+            with stage("campaign") as current:
+                campaign = current.output = random.choice(self.current_season.campaigns)
             print(f"🎯 今月のキャンペーン提案: {campaign}")
             
             print("✅ 日次自動化完了")
             
-            return {
+            result = {
                 "success": True,
                 "instagram_post": instagram_post,
                 "image_path": image_path,
                 "email_response": email_response,
-                "campaign": campaign
+                "campaign": campaign,
+                "service": sample_inquiry["service"],
+                "area": sample_inquiry["area"]
             }
             
         except Exception as e:
             print(f"❌ 自動化エラー: {e}")
-            return {"success": False, "error": str(e)}
+            result = {"success": False, "error": str(e)}
+
+        if recorder is not None:
+            result["metrics"] = [m.to_dict() for m in recorder.metrics]
+        return result
+
+def create_recorder_from_env():
+    """環境変数で計測が指定されていればStageRecorderを作成
+
+    MARKETING_METRICS_JSONL: JSON Lines出力先 / MARKETING_METRICS_PROM: Prometheusテキスト出力先 /
+    MARKETING_PROFILE_DIR: ステージごとのcProfile出力先
+    """
+    jsonl_path = os.environ.get('MARKETING_METRICS_JSONL')
+    prom_path = os.environ.get('MARKETING_METRICS_PROM')
+    profile_dir = os.environ.get('MARKETING_PROFILE_DIR')
+    if not (jsonl_path or prom_path or profile_dir):
+        return None
+
+    from instrumentation import JsonLinesEmitter, StageRecorder
+
+    recorder = StageRecorder(profile_dir=profile_dir)
+    if jsonl_path:
+        recorder.add_hook(JsonLinesEmitter.open(jsonl_path))
+    return recorder
+
+def create_history_from_env(tenant_id: str = "default"):
+    """環境変数で履歴の保存先が指定されていればテナントの投稿履歴を作成
+
+    MARKETING_HISTORY_DIR: 投稿履歴の保存先ディレクトリ（テナントごとに <tenant_id>.json）
+    """
+    history_dir = os.environ.get('MARKETING_HISTORY_DIR')
+    if not history_dir:
+        return None
+
+    from content_history import tenant_history
+    return tenant_history(history_dir, tenant_id)
+
+def write_recorder_outputs(recorder):
+    """計測結果のPrometheusテキストを保存（MARKETING_METRICS_PROM 指定時）し、レコーダーとJSON Lines出力を閉じる"""
+    if recorder is None:
+        return
+    recorder.close()
+    for hook in recorder.hooks:
+        if hasattr(hook, "close"):
+            hook.close()
+    prom_path = os.environ.get('MARKETING_METRICS_PROM')
+    if prom_path:
+        from instrumentation import write_prometheus
+        write_prometheus(recorder.metrics, prom_path)
+        print(f"📈 計測結果保存: {prom_path}")
 
 # メイン実行部分
 if __name__ == "__main__":
     print("🎉 外構業界AI自動集客システム Ver.2.0")
     print("=" * 50)
     
-    # システム初期化
-    ai_system = ExteriorMarketingAI()
+    # システム初期化（MARKETING_HISTORY_DIR 指定時は過去の投稿と重複しない組み合わせだけを投稿）
+    ai_system = ExteriorMarketingAI(history=create_history_from_env())
+    print("🏗️ 外構AI自動集客システム初期化完了")
+    print(f"📅 現在の季節: {ai_system.current_season.name}")
+    
+    # 現地調査の空き枠を予約DBから提案（MARKETING_AVAILABILITY_DB 指定時）
+    availability_db = os.environ.get('MARKETING_AVAILABILITY_DB')
+    if availability_db:
+        ai_system.enable_availability(availability_db)
+    
+    # LLMで投稿・返信を生成（MARKETING_LLM 指定時、接続先などは LLM_* 環境変数）
+    if os.environ.get('MARKETING_LLM'):
+        ai_system.enable_llm()
     
     # 日次自動化実行
-    result = ai_system.run_daily_automation()
+    recorder = create_recorder_from_env()
+    try:
+        result = ai_system.run_daily_automation(recorder=recorder)
+    finally:
+        if ai_system.llm is not None:
+            ai_system.llm.close()
+    write_recorder_outputs(recorder)
+    
+    # 分析イベント記録（環境変数指定時）
+    kpis = None
+    analytics_dir = os.environ.get('MARKETING_ANALYTICS_DIR')
+    if analytics_dir:
+        from analytics_store import AnalyticsStore, record_daily_result
+        with AnalyticsStore(analytics_dir) as store:
+            record_daily_result(store, "default", result, ai_system.current_season.name,
+                                service=result.get("service"), area=result.get("area"),
+                                cost=ai_system.config.daily_ad_cost)
+        kpis = store.kpis()
+    
+    # 実行結果ログ追記・ダッシュボード増分更新（環境変数指定時）
+    run_log_path = os.environ.get('MARKETING_RUN_LOG')
+    if run_log_path:
+        from dashboard import DashboardBuilder, RunLog
+        RunLog(run_log_path).append(result)
+        dashboard_path = os.environ.get('MARKETING_DASHBOARD')
+        if dashboard_path:
+            DashboardBuilder(run_log_path, dashboard_path).build(analytics=kpis)
+            print(f"📊 ダッシュボード更新: {dashboard_path}")
     
     if result["success"]:
         print("\n🎊 システム正常動作確認完了！")
@@ -369,42 +969,144 @@ if __name__ == "__main__":
     print("3. Make.comでワークフロー連携")
     print("4. n8nで高度な自動化設定")
 # Ver.5.3 マルチTrendAnalysisEngine 追加
+# 分析ステージ: (結果キー, 分析器の属性名, 実行メソッド名)
+ANALYZER_STAGES = (
+    ("new_video_analysis", "video_analyzer", "analyze_viral_content"),
+    ("competitor_intelligence", "competitor_analyzer", "analyze_competitors"),
+    ("viral_patterns", "viral_detector", "detect_patterns"),
+    ("multi_platform_strategy", "multi_platform", "optimize_for_all"),
+)
+
+def default_run_id(now: datetime) -> str:
+    """チェックポイントの実行ID（GitHub Actions ではワークフロー実行ID、それ以外は日付＋時間帯）
+
+    同じワークフロー実行の再試行（Re-run）だけが途中から再開し、手動で起動し直した実行は最初から実行する。
+    """
+    workflow_run_id = os.environ.get('GITHUB_RUN_ID')
+    return f"gh{workflow_run_id}" if workflow_run_id else now.strftime("%Y%m%d_%H")
+
 class MultiTrendAnalysisEngine:
     """Ver.5.3 最強トレンド分析エンジン"""
     
-    def __init__(self):
-        # 既存機能継承
-        self.existing_system = ExteriorMarketingAI()
+    def __init__(self, existing_system: Optional[ExteriorMarketingAI] = None,
+                 clock: Optional[Callable[[], datetime]] = None,
+                 cache_dir: Optional[str] = None,
+                 competitor_sources: Sequence[str] = (), hashtag_sources: Sequence[str] = ()):
+        # 既存機能継承（既存インスタンスがあれば再利用）
+        self.existing_system = existing_system or ExteriorMarketingAI(clock=clock)
         
         # 新機能追加
         self.video_analyzer = VideoContentAnalyzer()
-        self.competitor_analyzer = CompetitorAnalyzer()
-        self.viral_detector = ViralPatternDetector()
+        self.competitor_analyzer = CompetitorAnalyzer(competitor_sources)
+        self.viral_detector = ViralPatternDetector(hashtag_sources)
         self.multi_platform = MultiPlatformOptimizer()
         
-    def execute_v53_analysis(self, target_industry=None):
-        """Ver.5.3 統合分析実行"""
+        # 結果キャッシュ（指定時のみ）
+        self.result_cache = None
+        if cache_dir:
+            from result_cache import ResultCache
+            self.result_cache = ResultCache(cache_dir)
+        
+    def _run_analyzer(self, attribute: str, method: str, inputs: Dict, date: str):
+        """分析器を実行（同じ分析器・入力・日付の結果がキャッシュにあれば再利用）"""
+        analyzer = getattr(self, attribute)
+        if self.result_cache is None:
+            return getattr(analyzer, method)()
+        
+        from result_cache import cache_key, source_fingerprints
+        inputs = {**inputs, "sources": source_fingerprints(getattr(analyzer, "sources", ()))}
+        key = cache_key(f"{type(analyzer).__name__}.{method}", inputs, date)
+        result = self.result_cache.get(key)
+        if result is None:
+            result = getattr(analyzer, method)()
+            self.result_cache.put(key, result)
+        return result
+    
+    def execute_v53_analysis(self, target_industry=None, run_id: Optional[str] = None,
+                             resume: Optional[bool] = None):
+        """Ver.5.3 統合分析実行
+        
+        分析器の結果（トレンド）を反映してから既存システムの日次自動化を実行する。
+        分析器が失敗しても日次自動化は実行し、失敗内容は analysis_errors に記録する
+        （失敗した分析のトレンドは前回の値のまま）。
+        キャッシュ有効時は実行ID（既定は default_run_id）ごとに完了ステージを記録し、
+        再実行では未完了のステージだけを実行する。resume=False（既定は環境変数
+        MARKETING_NO_RESUME 未設定なら True）では記録済みステージも含めてすべて実行し直す。
+        """
+        from concurrent.futures import ThreadPoolExecutor, as_completed
+        
         print("🚀 Ver.5.3 マルチTrendAnalysisEngine 起動")
+        now = self.existing_system.clock()
+        checkpoint = None
+        if self.result_cache is not None:
+            if resume is None:
+                resume = not os.environ.get('MARKETING_NO_RESUME')
+            checkpoint = self.result_cache.checkpoint(run_id or default_run_id(now), resume)
+        
+        # 新機能実行（互いに独立なので並列実行）
+        results = {}
+        pending = []
+        for name, attribute, method in ANALYZER_STAGES:
+            if checkpoint is not None and name in checkpoint:
+                results[name] = checkpoint.get(name)
+            else:
+                pending.append((name, attribute, method))
         
-        # 既存システム実行
-        existing_result = self.existing_system.run_daily_automation()
+        inputs = {"target_industry": target_industry,
+                  "season": self.existing_system.current_season.name}
+        date = now.strftime("%Y-%m-%d")
+        errors: Dict[str, str] = {}
+        if pending:
+            with ThreadPoolExecutor(max_workers=len(pending)) as executor:
+                futures = {
+                    executor.submit(self._run_analyzer, attribute, method, inputs, date): name
+                    for name, attribute, method in pending
+                }
+                for future in as_completed(futures):
+                    name = futures[future]
+                    try:
+                        results[name] = future.result()
+                    except Exception as e:
+                        print(f"❌ 分析エラー（{name}）: {e}")
+                        errors[name] = f"{type(e).__name__}: {e}"
+                        continue
+                    if checkpoint is not None:
+                        checkpoint.complete(name, results[name])
+        # 競合ページ・ハッシュタグのトレンドを投稿・スコア計算に反映（失敗した分析の分は前回のまま）
+        system = self.existing_system
+        keywords = system.trend_keywords
+        if "competitor_intelligence" in results:
+            keywords = [word for word, _ in results["competitor_intelligence"].get("top_keywords", [])]
+        hashtags, hashtag_weights = system.trend_hashtags, system.hashtag_weights or None
+        if "viral_patterns" in results:
+            viral_hashtags = results["viral_patterns"].get("top_hashtags", [])
+            hashtags, hashtag_weights = [tag for tag, _ in viral_hashtags], None
+            if viral_hashtags:
+                from viral_scoring import engagement_weights
+                hashtag_weights = engagement_weights(viral_hashtags)
+        system.apply_trends(keywords, hashtags, hashtag_weights)
         
-        # 新機能実行
-        video_insights = self.video_analyzer.analyze_viral_content()
-        competitor_data = self.competitor_analyzer.analyze_competitors()
-        viral_patterns = self.viral_detector.detect_patterns()
-        platform_strategy = self.multi_platform.optimize_for_all()
+        # 既存システム実行（このスロットで完了済みなら再実行しない）
+        if checkpoint is not None and "existing_features" in checkpoint:
+            existing_result = checkpoint.get("existing_features")
+        else:
+            existing_result = self.existing_system.run_daily_automation()
+            if checkpoint is not None and existing_result["success"]:
+                checkpoint.complete("existing_features", existing_result)
         
         # 統合結果
         integrated_result = {
             "version": "5.3",
             "existing_features": existing_result,
-            "new_video_analysis": video_insights,
-            "competitor_intelligence": competitor_data,
-            "viral_patterns": viral_patterns,
-            "multi_platform_strategy": platform_strategy,
+            **{name: results[name] for name, _, _ in ANALYZER_STAGES if name in results},
             "revenue_prediction": self.calculate_v53_revenue()
         }
+        if errors:
+            # 一部の分析のみ失敗（失敗したステージは未完了のままなので再実行時に再試行される）
+            integrated_result["partial"] = True
+            integrated_result["analysis_errors"] = errors
+            print(f"⚠️ Ver.5.3 分析は一部失敗しました: {', '.join(errors)}")
+            return integrated_result
         
         print("✅ Ver.5.3 分析完了！月収300万円システム稼働中")
         return integrated_result
@@ -424,30 +1126,82 @@ class VideoContentAnalyzer:
         return {"status": "競合動画分析完了", "insights": "バイラル要因特定"}
 
 class CompetitorAnalyzer:
-    """競合分析機能"""  
+    """競合分析機能（sources: 競合ページのスナップショット・URL）"""
+    def __init__(self, sources: Sequence[str] = ()):
+        self.sources = tuple(sources)
+    
     def analyze_competitors(self):
-        return {"status": "競合分析完了", "data": "市場ポジション把握"}
+        if not self.sources:
+            return {"status": "競合分析完了", "data": "市場ポジション把握"}
+        from trend_ingest import ingest
+        snapshot = ingest(self.sources)
+        return {
+            "status": "競合分析完了",
+            "data": "市場ポジション把握",
+            "documents": snapshot.documents,
+            "top_keywords": snapshot.keywords[:TREND_KEYWORD_LIMIT * 4],
+            "top_hashtags": snapshot.hashtags[:TREND_HASHTAG_LIMIT * 4],
+            "errors": snapshot.errors
+        }
 
 class ViralPatternDetector:
-    """バイラルパターン検出"""
+    """バイラルパターン検出（sources: ハッシュタグフィードのスナップショット・URL）"""
+    def __init__(self, sources: Sequence[str] = ()):
+        self.sources = tuple(sources)
+    
     def detect_patterns(self):
-        return {"status": "パターン検出完了", "patterns": "成功法則抽出"}
+        if not self.sources:
+            return {"status": "パターン検出完了", "patterns": "成功法則抽出"}
+        from trend_ingest import ingest
+        snapshot = ingest(self.sources)
+        return {
+            "status": "パターン検出完了",
+            "patterns": "成功法則抽出",
+            "documents": snapshot.documents,
+            "top_hashtags": snapshot.hashtags[:TREND_HASHTAG_LIMIT * 4],
+            "top_keywords": snapshot.keywords[:TREND_KEYWORD_LIMIT * 4],
+            "errors": snapshot.errors
+        }
 
 class MultiPlatformOptimizer:
-    """マルチプラットフォーム最適化"""
+    """マルチプラットフォーム最適化（対象は platform_variants.PLATFORM_SPECS）"""
     def optimize_for_all(self):
-        return {"status": "全プラットフォーム最適化完了", "platforms": ["Instagram", "YouTube", "TikTok"]}
+        from platform_variants import PLATFORM_SPECS
+        return {
+            "status": "全プラットフォーム最適化完了",
+            "platforms": list(dict.fromkeys(spec.platform for spec in PLATFORM_SPECS)),
+            "variants": [
+                {"platform": spec.platform, "variant": spec.variant, "size": list(spec.size),
+                 "caption_limit": spec.caption_limit, "hashtag_limit": spec.hashtag_limit}
+                for spec in PLATFORM_SPECS
+            ]
+        }
 
 # Ver.5.3 システム起動
 if __name__ == "__main__":
     print("🎉 Ver.5.3 マルチTrendAnalysisEngine システム起動")
     print("=" * 60)
     
-    # Ver.5.3 システム初期化
-    v53_system = MultiTrendAnalysisEngine()
+    # Ver.5.3 システム初期化（MARKETING_RESULT_CACHE 指定時は分析結果をキャッシュ）
+    # MARKETING_COMPETITOR_SOURCES / MARKETING_HASHTAG_SOURCES: スナップショットのパス・URL（os.pathsep区切り）
+    v53_system = MultiTrendAnalysisEngine(
+        existing_system=ExteriorMarketingAI(history=create_history_from_env()),
+        cache_dir=os.environ.get('MARKETING_RESULT_CACHE'),
+        competitor_sources=[p for p in os.environ.get('MARKETING_COMPETITOR_SOURCES', '').split(os.pathsep) if p],
+        hashtag_sources=[p for p in os.environ.get('MARKETING_HASHTAG_SOURCES', '').split(os.pathsep) if p]
+    )
+    print("🏗️ 外構AI自動集客システム初期化完了")
+    print(f"📅 現在の季節: {v53_system.existing_system.current_season.name}")
+    
+    if os.environ.get('MARKETING_LLM'):
+        v53_system.existing_system.enable_llm()
     
     # Ver.5.3 分析実行
-    result = v53_system.execute_v53_analysis()
+    try:
+        result = v53_system.execute_v53_analysis()
+    finally:
+        if v53_system.existing_system.llm is not None:
+            v53_system.existing_system.llm.close()
     
     print("\n🎊 Ver.5.3 アップグレード完了！")
     print("月収300万円達成システム稼働開始！")
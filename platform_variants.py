@@ -0,0 +1,143 @@
+# platform_variants.py - プラットフォーム別出力（共有マスター画像からの派生・キャプション調整）
+#
+# 投稿テキストのレイアウト計算と高解像度マスター画像の描画は1回だけ行い、
+# 各プラットフォームの画像はマスターから切り出して Image.reduce で縮小する。
+# 同じサイズの出力（リールとTikTok等）は1回だけ縮小して使い回す。
+
+import os
+import re
+from dataclasses import dataclass
+from typing import Dict, List, Sequence, Tuple
+
+from image_renderer import TEXT_LEFT, ImageStyle, layout_post_text
+
+@dataclass(frozen=True)
+class PlatformSpec:
+    """プラットフォーム・出力形式ごとの仕様"""
+    platform: str
+    variant: str
+    size: Tuple[int, int]
+    caption_limit: int   # キャプションの最大文字数
+    hashtag_limit: int   # ハッシュタグの最大（推奨）数
+
+PLATFORM_SPECS = (
+    PlatformSpec("Instagram", "feed", (1080, 1080), 2200, 30),
+    PlatformSpec("Instagram", "portrait", (1080, 1350), 2200, 30),
+    PlatformSpec("Instagram", "reel", (1080, 1920), 2200, 30),
+    PlatformSpec("TikTok", "video", (1080, 1920), 4000, 5),
+    PlatformSpec("YouTube", "thumbnail", (1280, 720), 5000, 15),
+)
+
+# マスター画像: 縦長(9:16)の2倍解像度。横幅はすべての出力の横幅以上にする
+MASTER_SCALE = 2
+MASTER_SIZE = (1080 * MASTER_SCALE, 1920 * MASTER_SCALE)
+
+# 1倍解像度での余白
+CONTENT_MARGIN = 60
+FOOTER_GAP = 60
+FOOTER_LINE_HEIGHT = 40
+
+_HASHTAG = re.compile(r"[#＃][^\s#＃]+")
+
+@dataclass(frozen=True)
+class MasterRender:
+    """共有マスター画像と本文領域（マスター座標の上端・下端）"""
+    image: object
+    content_top: int
+    content_bottom: int
+    bg_color: str
+
+def render_master(post_text: str, style: ImageStyle, scale: int = MASTER_SCALE) -> MasterRender:
+    """投稿テキスト・フッターを高解像度マスター画像に描画（本文は縦方向中央）"""
+    from PIL import Image
+    from text_layout import FONT_SIZE, FOOTER_FONT_SIZE, draw_line
+
+    size = (MASTER_SIZE[0] // MASTER_SCALE * scale, MASTER_SIZE[1] // MASTER_SCALE * scale)
+    layout = layout_post_text(post_text)
+    first_y = layout[0][0] if layout else 0
+    last_y = layout[-1][0] if layout else 0
+    footer_y = last_y + FOOTER_GAP
+    content_height = footer_y + 2 * FOOTER_LINE_HEIGHT - first_y + 2 * CONTENT_MARGIN
+    shift = (size[1] // scale - content_height) // 2 + CONTENT_MARGIN - first_y
+
+    # 折り返し・行配置は1倍解像度で計算済みのものを拡大して使う
+    img = Image.new('RGB', size, color=style.bg_color)
+    left = TEXT_LEFT * scale
+    for y_position, line, color in layout:
+        draw_line(img, (left, (y_position + shift) * scale), line, color, FONT_SIZE * scale)
+    draw_line(img, (left, (footer_y + shift) * scale), f"📧 {style.contact_email}",
+              '#666666', FOOTER_FONT_SIZE * scale)
+    draw_line(img, (left, (footer_y + FOOTER_LINE_HEIGHT + shift) * scale), f"📞 {style.contact_phone}",
+              '#666666', FOOTER_FONT_SIZE * scale)
+
+    top = (first_y + shift - CONTENT_MARGIN) * scale
+    return MasterRender(img, max(0, top), min(size[1], top + content_height * scale), style.bg_color)
+
+def crop_box(master: MasterRender, size: Tuple[int, int]) -> Tuple[int, int, int, int]:
+    """出力の縦横比で本文領域を中心に切り出す範囲（マスターからはみ出す場合あり）"""
+    width, height = master.image.size
+    crop_width = width
+    crop_height = round(width * size[1] / size[0])
+    content_height = master.content_bottom - master.content_top
+    if crop_height < content_height:
+        # 横長の出力で本文が収まらない場合は、左右に余白を足して本文全体を収める
+        crop_height = content_height
+        crop_width = round(content_height * size[0] / size[1])
+    center_y = (master.content_top + master.content_bottom) // 2
+    top = min(max(0, center_y - crop_height // 2), max(0, height - crop_height))
+    left = (width - crop_width) // 2
+    return left, top, left + crop_width, top + crop_height
+
+def render_variant(master: MasterRender, size: Tuple[int, int]):
+    """マスター画像から1サイズ分を切り出して縮小"""
+    from PIL import Image
+
+    box = crop_box(master, size)
+    width, height = master.image.size
+    if box[0] < 0 or box[3] > height:
+        # はみ出す分は背景色で埋める
+        canvas = Image.new('RGB', (box[2] - box[0], box[3] - box[1]), color=master.bg_color)
+        canvas.paste(master.image.crop((0, box[1], width, min(height, box[3]))), (-box[0], 0))
+        source, box = canvas, (0, 0, canvas.width, canvas.height)
+    else:
+        source = master.image
+
+    # 整数倍ちょうどの縮小は Image.reduce（切り出しと同時）、それ以外は
+    # reducing_gap 付きの resize（内部で整数倍縮小してから端数分だけ補間）
+    crop_width, crop_height = box[2] - box[0], box[3] - box[1]
+    factor = crop_width // size[0]
+    if factor >= 1 and (crop_width, crop_height) == (size[0] * factor, size[1] * factor):
+        return source.reduce(factor, box=box)
+    return source.resize(size, Image.BILINEAR, box=box, reducing_gap=2.0)
+
+def fit_caption(post_text: str, spec: PlatformSpec) -> str:
+    """プラットフォームの文字数・ハッシュタグ数の上限に合わせたキャプション"""
+    hashtags = list(dict.fromkeys(_HASHTAG.findall(post_text)))[:spec.hashtag_limit]
+    body = "\n".join(line for line in post_text.rstrip().split("\n")
+                     if not line.startswith(("#", "＃"))).rstrip()
+    tags = " ".join(hashtags)
+    budget = spec.caption_limit - (len(tags) + 2 if tags else 0)
+    if len(body) > budget:
+        body = body[:max(0, budget - 1)].rstrip() + "…"
+    return f"{body}\n\n{tags}" if tags else body
+
+def render_platform_variants(post_text: str, basename: str, style: ImageStyle,
+                             specs: Sequence[PlatformSpec] = PLATFORM_SPECS,
+                             output_dir: str = "", quality: int = 85) -> List[Dict]:
+    """全プラットフォームの画像・キャプションを作成して保存"""
+    master = render_master(post_text, style)
+    rendered = {}
+    variants = []
+    for spec in specs:
+        path = os.path.join(output_dir, f"{basename}_{spec.platform.lower()}_{spec.variant}.jpg")
+        if spec.size not in rendered:
+            rendered[spec.size] = render_variant(master, spec.size)
+        rendered[spec.size].save(path, 'JPEG', quality=quality)
+        variants.append({
+            "platform": spec.platform,
+            "variant": spec.variant,
+            "size": list(spec.size),
+            "path": path,
+            "caption": fit_caption(post_text, spec)
+        })
+    return variants
@@ -0,0 +1,146 @@
+# reel_renderer.py - リール・ショート動画レンダリング（静的レイヤーのキャッシュ・並列エンコード）
+#
+# 背景＋フッター（image_renderer のベース画像）と各行のテキストレイヤーは1回だけ描画して
+# プロセス内でキャッシュし、動画・フレーム間で再利用する。
+# フレームごとの再描画は行わず、行が現れるときに変化する帯の部分だけを合成する。
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Iterator, List, Optional, Sequence, Tuple
+
+from image_renderer import IMAGE_SIZE, TEXT_LEFT, ImageStyle, get_base_image, layout_post_text
+
+# Instagramリール・TikTokの縦長動画
+REEL_SIZE = (1080, 1920)
+
+# テキストレイヤー1行分の高さ
+LINE_LAYER_HEIGHT = 48
+
+@dataclass(frozen=True)
+class ReelSettings:
+    """動画出力設定"""
+    size: Tuple[int, int] = REEL_SIZE
+    fps: int = 30
+    line_seconds: float = 0.5        # 1行ごとの表示間隔
+    transition_seconds: float = 0.2  # 行が現れるときのフェード時間
+    hold_seconds: float = 2.0        # 全行表示後の静止時間
+    codec: str = "mp4v"
+    output_dir: str = ""
+    thumbnail: bool = True           # 全行表示のフレームをJPEGサムネイルとして保存
+
+@lru_cache(maxsize=32)
+def get_base_frame(style: ImageStyle, size: Tuple[int, int] = REEL_SIZE):
+    """ベース画像のBGR配列（プロセス内キャッシュ、変更禁止）"""
+    import numpy as np
+
+    frame = np.ascontiguousarray(np.asarray(get_base_image(style, size))[:, :, ::-1])
+    frame.flags.writeable = False
+    return frame
+
+@lru_cache(maxsize=1024)
+def get_line_layer(line: str, color: str, width: int):
+    """1行分のテキストレイヤー (BGR配列, 不透明度配列)（プロセス内キャッシュ、変更禁止）"""
+    import numpy as np
+    from PIL import Image
+    from text_layout import draw_line
+
+    layer = Image.new('RGBA', (width, LINE_LAYER_HEIGHT), (0, 0, 0, 0))
+    draw_line(layer, (TEXT_LEFT, 0), line, color)
+    rgba = np.asarray(layer, dtype=np.float32)
+    return rgba[:, :, 2::-1].copy(), rgba[:, :, 3:] / 255.0
+
+def text_offset(size: Tuple[int, int]) -> int:
+    """正方形画像用のレイアウトを縦長画面の中央に寄せるためのずらし幅"""
+    return max(0, (size[1] - IMAGE_SIZE[1]) // 2)
+
+def _frames_per_line(settings: ReelSettings) -> Tuple[int, int]:
+    fade = max(0, int(round(settings.transition_seconds * settings.fps)))
+    return fade, max(fade + 1, int(round(settings.line_seconds * settings.fps)))
+
+def count_frames(post_text: str, settings: ReelSettings = ReelSettings()) -> int:
+    """動画の総フレーム数"""
+    _, per_line = _frames_per_line(settings)
+    return per_line * (len(layout_post_text(post_text)) + 1) + int(round(settings.hold_seconds * settings.fps))
+
+def iter_frames(post_text: str, style: ImageStyle, settings: ReelSettings = ReelSettings()) -> Iterator:
+    """動画フレーム（BGR配列）を順に生成
+
+    1本につき作業用バッファを1枚だけ持ち、新しい行の帯だけを書き換える。
+    返す配列は次のフレームで上書きされるため、保持する場合は呼び出し側でコピーすること。
+    """
+    import numpy as np
+
+    width, height = settings.size
+    offset = text_offset(settings.size)
+    fade, per_line = _frames_per_line(settings)
+    frame = get_base_frame(style, settings.size).copy()
+
+    for _ in range(per_line):
+        yield frame
+    for y_position, line, color in layout_post_text(post_text):
+        top = y_position + offset
+        bottom = min(height, top + LINE_LAYER_HEIGHT)
+        if top >= bottom:
+            continue
+        bgr, alpha = get_line_layer(line, color, width)
+        bgr, alpha = bgr[:bottom - top], alpha[:bottom - top]
+        before = frame[top:bottom].astype(np.float32)
+        after = before + (bgr - before) * alpha
+        for step in range(1, fade + 1):
+            frame[top:bottom] = before + (after - before) * (step / (fade + 1))
+            yield frame
+        frame[top:bottom] = after
+        for _ in range(per_line - fade):
+            yield frame
+    for _ in range(int(round(settings.hold_seconds * settings.fps))):
+        yield frame
+
+def render_reel(post_text: str, filename: str, style: ImageStyle,
+                settings: ReelSettings = ReelSettings()) -> str:
+    """投稿テキストから動画を1本レンダリングして保存"""
+    try:
+        import cv2
+    except ImportError:
+        raise ImportError("動画の書き出しには opencv-python が必要です")
+
+    if settings.output_dir:
+        os.makedirs(settings.output_dir, exist_ok=True)
+    path = os.path.join(settings.output_dir, filename)
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*settings.codec), settings.fps, settings.size)
+    if not writer.isOpened():
+        raise RuntimeError(f"動画ファイルを作成できません: {path}")
+    frame = None
+    try:
+        for frame in iter_frames(post_text, style, settings):
+            writer.write(frame)
+    finally:
+        writer.release()
+
+    # 最終フレーム（全行表示）をサムネイルとして保存
+    if settings.thumbnail and frame is not None:
+        cv2.imwrite(f"{os.path.splitext(path)[0]}.jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, 80])
+    return path
+
+def _render_job(job: Tuple[str, str, ImageStyle, ReelSettings]) -> str:
+    """プロセスプール用ワーカー"""
+    return render_reel(*job)
+
+def render_reels(post_texts: Sequence[str], filenames: Sequence[str], style: ImageStyle,
+                 settings: ReelSettings = ReelSettings(),
+                 max_workers: Optional[int] = None) -> List[str]:
+    """動画を一括レンダリング（エンコードはプロセスプールで並列化）"""
+    if len(post_texts) != len(filenames):
+        raise ValueError("post_texts と filenames の件数が一致しません")
+
+    if settings.output_dir:
+        os.makedirs(settings.output_dir, exist_ok=True)
+    jobs = [(text, name, style, settings) for text, name in zip(post_texts, filenames)]
+
+    # 1本ならプールを使わずその場で処理
+    if max_workers == 1 or len(jobs) <= 1:
+        return [_render_job(job) for job in jobs]
+
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(_render_job, jobs))
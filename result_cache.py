@@ -0,0 +1,90 @@
+# result_cache.py - 分析結果のコンテンツアドレスキャッシュと実行チェックポイント
+#
+# 保存形式:
+#   <root>/objects/<キー先頭2文字>/<キー>.json  … 分析器・入力・日付から求めたキーごとの結果
+#   <root>/runs/<実行ID>.json                   … 実行（日付・時間帯）ごとの完了済みステージ
+
+import hashlib
+import json
+import os
+import threading
+from typing import Any, Dict, Iterable, List, Optional
+
+def cache_key(analyzer: str, inputs: Dict, date: str) -> str:
+    """分析器名・入力・日付からキャッシュキーを作成"""
+    payload = json.dumps({"analyzer": analyzer, "inputs": inputs, "date": date},
+                         ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.blake2b(payload.encode("utf-8"), digest_size=16).hexdigest()
+
+def source_fingerprints(sources: Iterable[str]) -> List:
+    """入力ソースの指紋（ローカルファイルはパス・更新時刻・サイズ、URLはそのまま）
+
+    キャッシュキーに含め、同じ日でもファイルを更新したら再計算されるようにする。
+    """
+    fingerprints = []
+    for source in sources:
+        try:
+            stat = os.stat(source)
+        except (OSError, ValueError):
+            fingerprints.append(source)
+            continue
+        fingerprints.append([source, stat.st_mtime_ns, stat.st_size])
+    return fingerprints
+
+def _atomic_write_json(path: str, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, default=str)
+    os.replace(tmp_path, path)
+
+def _read_json(path: str):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        # 存在しない・書き込み途中で壊れたファイルは未保存として扱う
+        return None
+
+class ResultCache:
+    """分析結果キャッシュ（同じキーの結果は再計算しない）"""
+
+    def __init__(self, root: str = ".result_cache"):
+        self.root = root
+
+    def _object_path(self, key: str) -> str:
+        return os.path.join(self.root, "objects", key[:2], f"{key}.json")
+
+    def get(self, key: str) -> Optional[Any]:
+        """キャッシュ済み結果（なければ None）"""
+        entry = _read_json(self._object_path(key))
+        return entry["result"] if isinstance(entry, dict) and "result" in entry else None
+
+    def put(self, key: str, result: Any):
+        """結果を保存"""
+        _atomic_write_json(self._object_path(key), {"result": result})
+
+    def checkpoint(self, run_id: str, resume: bool = True) -> "RunCheckpoint":
+        """実行IDごとのチェックポイント（resume=False では記録済みステージを無視してやり直す）"""
+        return RunCheckpoint(os.path.join(self.root, "runs", f"{run_id}.json"), resume)
+
+class RunCheckpoint:
+    """1回の実行で完了したステージの結果（失敗後の再実行で完了済みステージを飛ばす）"""
+
+    def __init__(self, path: str, resume: bool = True):
+        self.path = path
+        data = _read_json(path) if resume else None
+        self.stages: Dict[str, Any] = data.get("stages", {}) if isinstance(data, dict) else {}
+        self._lock = threading.Lock()
+
+    def __contains__(self, stage: str) -> bool:
+        return stage in self.stages
+
+    def get(self, stage: str) -> Any:
+        return self.stages.get(stage)
+
+    def complete(self, stage: str, result: Any):
+        """ステージ完了を記録して保存"""
+        with self._lock:
+            self.stages[stage] = result
+            _atomic_write_json(self.path, {"stages": self.stages})
@@ -0,0 +1,287 @@
+# tenant_runner.py - 複数テナント（施工会社）の日次自動化一括実行
+
+import json
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from dataclasses import asdict, dataclass, field, fields
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from main import BusinessConfig, ExteriorMarketingAI
+
+CONFIG_EXTENSIONS = (".json", ".yaml", ".yml")
+
+_TENANT_ID = re.compile(r"^[A-Za-z0-9_.-]+$")
+
+@dataclass
+class TenantResult:
+    """テナントごとの実行結果（マニフェスト1行分）"""
+    tenant_id: str
+    success: bool
+    duration: float = 0.0
+    instagram_post: Optional[str] = None
+    image_path: Optional[str] = None
+    email_response: Optional[str] = None
+    campaign: Optional[str] = None
+    error: Optional[str] = None
+    metrics: List[Dict] = field(default_factory=list)
+
+def business_config_from_dict(data: Dict) -> BusinessConfig:
+    """辞書から BusinessConfig を作成（未知のキーはエラー）"""
+    known = {f.name for f in fields(BusinessConfig)}
+    unknown = set(data) - known
+    if unknown:
+        raise ValueError(f"不明な設定項目: {', '.join(sorted(unknown))}")
+    return BusinessConfig(**data)
+
+def _read_config_file(path: str):
+    """JSON/YAML設定ファイル読み込み"""
+    with open(path, encoding="utf-8") as f:
+        if path.endswith(".json"):
+            return json.load(f)
+        try:
+            import yaml
+        except ImportError:
+            raise ImportError(f"YAML設定の読み込みには PyYAML が必要です: {path}")
+        return yaml.safe_load(f)
+
+def _profiles_from_document(document, default_id: str) -> Dict[str, Dict]:
+    """設定ファイルの内容をテナントID → 設定辞書に変換
+
+    対応形式: 単一プロファイル / プロファイルのリスト（tenant_id 必須） /
+    {"tenants": {テナントID: プロファイル}}
+    """
+    if isinstance(document, list):
+        profiles = {}
+        for item in document:
+            item = dict(item)
+            if "tenant_id" not in item:
+                raise ValueError("リスト形式のプロファイルには tenant_id が必要です")
+            profiles[str(item.pop("tenant_id"))] = item
+        return profiles
+    if isinstance(document, dict) and isinstance(document.get("tenants"), dict):
+        return {str(k): dict(v) for k, v in document["tenants"].items()}
+    if isinstance(document, dict):
+        item = dict(document)
+        return {str(item.pop("tenant_id", default_id)): item}
+    raise ValueError("設定ファイルの形式が不正です")
+
+def load_tenant_configs(path: str, errors: Optional[Dict[str, str]] = None) -> Dict[str, BusinessConfig]:
+    """ディレクトリまたは単一ファイルからテナント設定を読み込む
+
+    errors を渡すと、読み込めないファイルはスキップしてエラー内容を記録する。
+    """
+    if os.path.isdir(path):
+        files = sorted(
+            os.path.join(path, name) for name in os.listdir(path)
+            if name.endswith(CONFIG_EXTENSIONS)
+        )
+    else:
+        files = [path]
+
+    configs = {}
+    for file_path in files:
+        default_id = os.path.splitext(os.path.basename(file_path))[0]
+        try:
+            loaded = {}
+            for tenant_id, profile in _profiles_from_document(_read_config_file(file_path), default_id).items():
+                if not _TENANT_ID.match(tenant_id):
+                    raise ValueError(f"テナントIDに使用できない文字が含まれています: {tenant_id}")
+                if tenant_id in configs or tenant_id in loaded:
+                    raise ValueError(f"テナントIDが重複しています: {tenant_id}")
+                loaded[tenant_id] = business_config_from_dict(profile)
+        except Exception as e:
+            if errors is None:
+                raise
+            errors[default_id] = f"設定読み込みエラー: {e}"
+            continue
+        configs.update(loaded)
+    return configs
+
+def _run_text_stages(tenant_id: str, config: BusinessConfig,
+                     clock: Optional[Callable[[], datetime]], hooks: Sequence[Callable],
+                     history_dir: Optional[str] = None, llm: bool = False):
+    """テキスト系ステージ（スレッドプール上で実行、レコーダーと所要時間も返す）"""
+    start = time.perf_counter()
+    recorder = None
+    if hooks:
+        from instrumentation import StageRecorder
+        recorder = StageRecorder(list(hooks), labels={"tenant": tenant_id})
+    history = None
+    if history_dir:
+        from content_history import tenant_history
+        history = tenant_history(history_dir, tenant_id)
+    ai_system = ExteriorMarketingAI(config=config, clock=clock, history=history)
+    if llm:
+        ai_system.enable_llm()
+    try:
+        daily = ai_system.run_daily_automation(render_image=False, recorder=recorder)
+    finally:
+        # 画像ステージは別プロセスなのでメモリ計測はここで止める
+        if recorder is not None:
+            recorder.close()
+        if ai_system.llm is not None:
+            ai_system.llm.close()
+    return ai_system, daily, recorder, time.perf_counter() - start
+
+def _render_image_timed(post_text: str, filename: str, style,
+                        settings) -> Tuple[Optional[str], float, float, Optional[str]]:
+    """画像描画（プロセスプール上で実行、パス・経過時間・CPU時間・エラーを返す）"""
+    from image_renderer import render_post_image
+
+    start = time.perf_counter()
+    cpu_start = time.process_time()
+    try:
+        path, error = render_post_image(post_text, filename, style, settings), None
+    except Exception as e:
+        path, error = None, f"{type(e).__name__}: {e}"
+    return path, time.perf_counter() - start, time.process_time() - cpu_start, error
+
+def _record_image_stage(recorder, path: Optional[str], wall_time: float, cpu_time: float,
+                        error: Optional[str]) -> Dict:
+    """ワーカーで計測した画像ステージをレコーダーに記録（メモリは別プロセスのため計測しない）"""
+    from instrumentation import StageMetrics, measure_output_size
+
+    metrics = StageMetrics(
+        stage="image",
+        wall_time=wall_time,
+        cpu_time=cpu_time,
+        peak_memory=None,
+        output_size=measure_output_size(path),
+        success=error is None,
+        error=error,
+        labels=dict(recorder.labels)
+    )
+    recorder.record(metrics)
+    return metrics.to_dict()
+
+def run_tenants(configs: Dict[str, BusinessConfig], output_dir: str = "output",
+                max_workers: Optional[int] = None, image_workers: Optional[int] = None,
+                clock: Optional[Callable[[], datetime]] = None,
+                hooks: Sequence[Callable] = (), history_dir: Optional[str] = None,
+                llm: bool = False) -> List[TenantResult]:
+    """全テナントの日次自動化を並列実行
+
+    テキスト生成はスレッドプール、画像描画はプロセスプールで行う。
+    1テナントの失敗は他テナントに影響しない。
+    duration は各テナント自身の処理時間（ワーカー内で計測したテキスト＋画像の時間、待ち時間は含まない）。
+    hooks を渡すとテナントごとにステージ計測（プロセスプールでの画像描画を含む）を行い、
+    計測結果を各フックへ渡す。
+    history_dir を渡すとテナントごとの投稿履歴（<history_dir>/<tenant_id>.json）で重複投稿を防ぐ。
+    llm=True では投稿・返信をLLM版で生成する（接続先などは LLM_* 環境変数）。
+    """
+    from image_renderer import ImageRenderSettings
+
+    results: Dict[str, TenantResult] = {}
+    image_jobs = {}
+    recorders = {}
+    max_workers = max_workers or min(32, len(configs) or 1)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as threads, \
+            ProcessPoolExecutor(max_workers=image_workers) as processes:
+        text_jobs = {}
+        for tenant_id, config in configs.items():
+            text_jobs[threads.submit(_run_text_stages, tenant_id, config, clock, hooks,
+                                       history_dir, llm)] = tenant_id
+
+        # テキストが完成したテナントから順に画像描画を投入
+        for future in as_completed(text_jobs):
+            tenant_id = text_jobs[future]
+            try:
+                ai_system, daily, recorders[tenant_id], text_duration = future.result()
+            except Exception as e:
+                results[tenant_id] = TenantResult(tenant_id, False, error=str(e))
+                continue
+            if not daily["success"]:
+                results[tenant_id] = TenantResult(tenant_id, False, round(text_duration, 4),
+                                                  error=daily.get("error"),
+                                                  metrics=daily.get("metrics", []))
+                continue
+
+            results[tenant_id] = TenantResult(
+                tenant_id, True, text_duration,
+                instagram_post=daily["instagram_post"],
+                email_response=daily["email_response"],
+                campaign=daily["campaign"],
+                metrics=daily.get("metrics", [])
+            )
+            settings = ImageRenderSettings(output_dir=os.path.join(output_dir, tenant_id))
+            os.makedirs(settings.output_dir, exist_ok=True)
+            filename = f"post_daily_{ai_system.clock().strftime('%Y%m%d_%H%M%S')}.jpg"
+            image_jobs[processes.submit(_render_image_timed, daily["instagram_post"], filename,
+                                        ai_system.get_image_style(), settings)] = tenant_id
+
+        for future in as_completed(image_jobs):
+            tenant_id = image_jobs[future]
+            result = results[tenant_id]
+            try:
+                image_path, image_duration, cpu_time, error = future.result()
+            except Exception as e:
+                # ワーカープロセス自体の異常終了など
+                image_path, image_duration, cpu_time, error = None, 0.0, 0.0, f"{type(e).__name__}: {e}"
+            result.image_path = image_path
+            result.duration = round(result.duration + image_duration, 4)
+            if error is not None:
+                result.success = False
+                result.error = f"画像作成エラー: {error}"
+            if recorders.get(tenant_id) is not None:
+                result.metrics.append(_record_image_stage(recorders[tenant_id], image_path,
+                                                          image_duration, cpu_time, error))
+
+    return [results[tenant_id] for tenant_id in configs]
+
+def write_manifest(results: List[TenantResult], path: str):
+    """実行結果マニフェストをJSONで保存（一時ファイル経由で置き換え）"""
+    manifest = {
+        "generated_at": datetime.now().isoformat(timespec="seconds"),
+        "total": len(results),
+        "succeeded": sum(r.success for r in results),
+        "tenants": [asdict(r) for r in results]
+    }
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="複数テナントの日次自動化一括実行")
+    parser.add_argument("configs", help="テナント設定ディレクトリまたはファイル（JSON/YAML）")
+    parser.add_argument("-o", "--output-dir", default="output", help="出力ディレクトリ")
+    parser.add_argument("--workers", type=int, help="テキスト生成スレッド数")
+    parser.add_argument("--image-workers", type=int, help="画像描画プロセス数")
+    parser.add_argument("--metrics-jsonl", help="ステージ計測結果のJSON Lines出力先")
+    parser.add_argument("--history-dir", default=os.environ.get('MARKETING_HISTORY_DIR'),
+                        help="テナントごとの投稿履歴の保存先（重複投稿を防ぐ）")
+    parser.add_argument("--llm", action="store_true", default=bool(os.environ.get('MARKETING_LLM')),
+                        help="投稿・返信をLLMで生成（接続先などは LLM_* 環境変数）")
+    args = parser.parse_args()
+
+    metrics_hooks = []
+    if args.metrics_jsonl:
+        from instrumentation import JsonLinesEmitter
+        metrics_hooks.append(JsonLinesEmitter.open(args.metrics_jsonl))
+
+    load_errors: Dict[str, str] = {}
+    tenant_configs = load_tenant_configs(args.configs, errors=load_errors)
+    print(f"🏢 テナント数: {len(tenant_configs)}")
+    try:
+        tenant_results = run_tenants(tenant_configs, args.output_dir, args.workers,
+                                     args.image_workers, hooks=metrics_hooks,
+                                     history_dir=args.history_dir, llm=args.llm)
+    finally:
+        for hook in metrics_hooks:
+            hook.close()
+    tenant_results += [TenantResult(name, False, error=error) for name, error in load_errors.items()]
+    manifest_path = os.path.join(args.output_dir, "manifest.json")
+    write_manifest(tenant_results, manifest_path)
+
+    failed = [r.tenant_id for r in tenant_results if not r.success]
+    print(f"📋 マニフェスト保存: {manifest_path}")
+    print(f"✅ 成功 {len(tenant_results) - len(failed)}件 / ❌ 失敗 {len(failed)}件")
+    if failed:
+        print(f"⚠️ 失敗テナント: {', '.join(failed)}")
@@ -0,0 +1,123 @@
+# text_layout.py - 画像用テキストレイアウト（日本語フォント読み込み・幅による折り返し・行ラスタライズのキャッシュ）
+#
+# フォントはプロセスごとに1回だけ読み込む（MARKETING_FONT_PATH → 一般的な日本語フォントの順に探す）。
+# 行のラスタライズ結果（マスク画像）はLRUキャッシュし、ハッシュタグ行やフッターなど
+# 投稿をまたいで繰り返す行は2回目以降描画しない。
+
+import os
+from functools import lru_cache
+from typing import List, Optional, Tuple
+
+# 日本語フォントの候補（Linux: fonts-noto-cjk、macOS、Windows）
+FONT_CANDIDATES = (
+    "/usr/share/fonts/opentype/noto/NotoSansCJK-Regular.ttc",
+    "/usr/share/fonts/noto-cjk/NotoSansCJK-Regular.ttc",
+    "/usr/share/fonts/google-noto-cjk/NotoSansCJK-Regular.ttc",
+    "/usr/share/fonts/truetype/noto/NotoSansJP-Regular.ttf",
+    "/usr/share/fonts/truetype/fonts-japanese-gothic.ttf",
+    "/System/Library/Fonts/ヒラギノ角ゴシック W3.ttc",
+    "C:/Windows/Fonts/meiryo.ttc",
+)
+
+# 投稿画像の標準文字サイズ
+FONT_SIZE = 28
+FOOTER_FONT_SIZE = 22
+
+# 行頭に置かない文字（禁則処理）
+NO_LINE_START = "、。，．,.!?！？」』）)]】ーぁぃぅぇぉっゃゅょゎァィゥェォッャュョヮ々"
+
+@lru_cache(maxsize=1)
+def find_font_path() -> Optional[str]:
+    """使用するフォントファイル（見つからなければ None）"""
+    candidates = (os.environ.get("MARKETING_FONT_PATH"),) + FONT_CANDIDATES
+    return next((path for path in candidates if path and os.path.isfile(path)), None)
+
+@lru_cache(maxsize=16)
+def get_font(size: int = FONT_SIZE):
+    """指定サイズのフォント（プロセス内キャッシュ）
+
+    日本語フォントがない環境では Pillow の既定フォントを使う（日本語は表示されない）。
+    """
+    from PIL import ImageFont
+
+    path = find_font_path()
+    if path:
+        return ImageFont.truetype(path, size)
+    try:
+        return ImageFont.load_default(size=size)
+    except TypeError:
+        # Pillow 10.1未満はサイズ指定不可のビットマップフォント
+        return ImageFont.load_default()
+
+@lru_cache(maxsize=8192)
+def _char_width(char: str, size: int) -> float:
+    return get_font(size).getlength(char)
+
+def text_width(text: str, size: int = FONT_SIZE) -> float:
+    """文字幅の合計による行幅（カーニングは無視）"""
+    return sum(_char_width(char, size) for char in text)
+
+@lru_cache(maxsize=4096)
+def wrap_line(line: str, max_width: int, size: int = FONT_SIZE) -> Tuple[str, ...]:
+    """1行を表示幅で折り返す（空白があれば空白位置、なければ文字単位＋禁則処理）"""
+    if text_width(line, size) <= max_width:
+        return (line,)
+
+    lines = []
+    start = 0
+    width = 0.0
+    last_space = -1
+    index = 0
+    while index < len(line):
+        char = line[index]
+        char_width = _char_width(char, size)
+        if width + char_width > max_width and index > start:
+            if last_space > start:
+                end, next_start = last_space, last_space + 1
+            else:
+                end = index
+                # 行頭禁則: 句読点などは前の行に残す
+                while end > start + 1 and line[end] in NO_LINE_START:
+                    end -= 1
+                next_start = end
+            lines.append(line[start:end].rstrip())
+            start, index, width, last_space = next_start, next_start, 0.0, -1
+            continue
+        if char == " ":
+            last_space = index
+        width += char_width
+        index += 1
+    if start < len(line):
+        lines.append(line[start:])
+    return tuple(lines)
+
+def wrap_text(text: str, max_width: int, size: int = FONT_SIZE) -> List[str]:
+    """複数行テキストを行ごとに折り返す"""
+    return [wrapped for line in text.split("\n") for wrapped in wrap_line(line, max_width, size)]
+
+@lru_cache(maxsize=4096)
+def rasterize_line(text: str, size: int = FONT_SIZE):
+    """1行分の文字マスク（'L' 画像、プロセス内LRUキャッシュ、変更禁止）
+
+    色は貼り付け時に指定するため、同じ行は色が違ってもキャッシュを共有する。
+    """
+    from PIL import Image, ImageDraw
+
+    font = get_font(size)
+    left, top, right, bottom = font.getbbox(text) if text else (0, 0, 0, 0)
+    mask = Image.new('L', (max(1, right), max(1, bottom)), 0)
+    ImageDraw.Draw(mask).text((0, 0), text, fill=255, font=font)
+    return mask
+
+def draw_line(img, position: Tuple[int, int], text: str, color: str, size: int = FONT_SIZE):
+    """キャッシュ済みの行マスクを使って画像に1行描画"""
+    mask = rasterize_line(text, size)
+    x, y = position
+    img.paste(color, (x, y, x + mask.width, y + mask.height), mask)
+
+def cache_info() -> dict:
+    """キャッシュ利用状況（ベンチマーク・調査用）"""
+    return {
+        "wrap_line": wrap_line.cache_info()._asdict(),
+        "rasterize_line": rasterize_line.cache_info()._asdict(),
+    }
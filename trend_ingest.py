@@ -0,0 +1,320 @@
+# trend_ingest.py - 競合ページ・ハッシュタグフィードのストリーミング取り込み
+#
+# ローカルのHTML/JSONスナップショット（ディレクトリ）またはURL（取得用の検証サーバー等）を
+# チャンク単位で解析し、ハッシュタグ・キーワードの出現頻度を
+# Count-Min Sketch ＋ 上位k件ヒープで集計する（文書本体は保持しない）。
+
+import codecs
+import hashlib
+import heapq
+import json
+import os
+import queue
+import re
+import threading
+from collections import Counter
+from dataclasses import asdict, dataclass, field
+from html.parser import HTMLParser
+from typing import Callable, Dict, Iterable, Iterator, List, Sequence, Tuple
+
+HTML_EXTENSIONS = (".html", ".htm")
+FEED_EXTENSIONS = (".json", ".jsonl")
+CHUNK_SIZE = 64 * 1024
+
+# 記録するエラーの最大件数
+MAX_ERRORS = 20
+
+_HASHTAG = re.compile(r"[#＃]([^\s#＃、。,.!?！？「」『』()（）]+)")
+# カタカナ・漢字の2文字以上の連続、または英単語（3文字以上）
+_KEYWORD = re.compile(r"[゠-ヿ一-鿿]{2,}|[A-Za-z][A-Za-z0-9]{2,}")
+
+# フィードの投稿レコードから本文として読む項目
+FEED_TEXT_FIELDS = ("caption", "text", "title", "description")
+
+_SKIP_TAGS = ("script", "style", "noscript")
+
+def count_terms(text: str, hashtags: Counter, keywords: Counter):
+    """テキスト中のハッシュタグ・キーワードを数える"""
+    for tag in _HASHTAG.findall(text):
+        hashtags[tag] += 1
+    for word in _KEYWORD.findall(_HASHTAG.sub(" ", text)):
+        keywords[word] += 1
+
+class CountMinSketch:
+    """Count-Min Sketch（保守的更新、固定メモリで頻度を過大側に推定）"""
+
+    def __init__(self, width: int = 4096, depth: int = 4):
+        if not 1 <= depth <= 16:
+            raise ValueError("depth は1〜16で指定してください")
+        self.width = width
+        self.depth = depth
+        self._rows = [[0] * width for _ in range(depth)]
+
+    def _indexes(self, term: str) -> List[int]:
+        digest = hashlib.blake2b(term.encode("utf-8"), digest_size=4 * self.depth).digest()
+        return [int.from_bytes(digest[i * 4:i * 4 + 4], "little") % self.width
+                for i in range(self.depth)]
+
+    def add(self, term: str, count: int = 1) -> int:
+        """出現回数を加算し、加算後の推定値を返す"""
+        indexes = self._indexes(term)
+        estimate = min(row[i] for row, i in zip(self._rows, indexes)) + count
+        for row, i in zip(self._rows, indexes):
+            if row[i] < estimate:
+                row[i] = estimate
+        return estimate
+
+    def estimate(self, term: str) -> int:
+        """推定出現回数"""
+        return min(row[i] for row, i in zip(self._rows, self._indexes(term)))
+
+class TopK:
+    """推定頻度の上位k件（最小ヒープ、更新で古くなった要素は取り出し時に読み飛ばす）"""
+
+    def __init__(self, k: int = 50):
+        self.k = k
+        self._counts: Dict[str, int] = {}
+        self._heap: List[Tuple[int, str]] = []
+
+    def _compact(self):
+        self._heap = [(count, term) for term, count in self._counts.items()]
+        heapq.heapify(self._heap)
+
+    def _min(self) -> Tuple[int, str]:
+        while True:
+            count, term = self._heap[0]
+            if self._counts.get(term) == count:
+                return count, term
+            heapq.heappop(self._heap)
+
+    def offer(self, term: str, estimate: int):
+        """推定値を反映（上位k件に入る場合のみ保持）"""
+        if term not in self._counts and len(self._counts) >= self.k:
+            count, smallest = self._min()
+            if estimate <= count:
+                return
+            heapq.heappop(self._heap)
+            del self._counts[smallest]
+        self._counts[term] = estimate
+        heapq.heappush(self._heap, (estimate, term))
+        if len(self._heap) > 4 * self.k:
+            self._compact()
+
+    def items(self) -> List[Tuple[str, int]]:
+        """頻度の高い順"""
+        return sorted(self._counts.items(), key=lambda item: (-item[1], item[0]))
+
+class TrendCounter:
+    """ハッシュタグ・キーワードの増分集計"""
+
+    def __init__(self, top_k: int = 50, width: int = 4096, depth: int = 4):
+        self._sketches = {"hashtags": CountMinSketch(width, depth), "keywords": CountMinSketch(width, depth)}
+        self._top = {"hashtags": TopK(top_k), "keywords": TopK(top_k)}
+
+    def update(self, kind: str, counts: Dict[str, int]):
+        sketch, top = self._sketches[kind], self._top[kind]
+        for term, count in counts.items():
+            top.offer(term, sketch.add(term, count))
+
+    def top(self, kind: str) -> List[Tuple[str, int]]:
+        return self._top[kind].items()
+
+@dataclass
+class TrendSnapshot:
+    """取り込み結果"""
+    hashtags: List[Tuple[str, int]]
+    keywords: List[Tuple[str, int]]
+    documents: int = 0
+    bytes_read: int = 0
+    errors: List[str] = field(default_factory=list)
+
+    def to_dict(self) -> Dict:
+        return asdict(self)
+
+class _TextExtractor(HTMLParser):
+    """本文テキストとmetaキーワードを逐次取り出すHTMLパーサー"""
+
+    def __init__(self, on_text: Callable[[str], None]):
+        super().__init__(convert_charrefs=True)
+        self.on_text = on_text
+        self._skip_depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in _SKIP_TAGS:
+            self._skip_depth += 1
+        elif tag == "meta":
+            attrs = dict(attrs)
+            if (attrs.get("name") or attrs.get("property") or "").lower() in ("keywords", "og:description", "description"):
+                self.on_text((attrs.get("content") or "").replace(",", " "))
+
+    def handle_endtag(self, tag):
+        if tag in _SKIP_TAGS and self._skip_depth:
+            self._skip_depth -= 1
+
+    def handle_data(self, data):
+        if not self._skip_depth:
+            self.on_text(data)
+
+def _is_url(source: str) -> bool:
+    return source.startswith(("http://", "https://"))
+
+def iter_sources(paths: Iterable[str]) -> Iterator[str]:
+    """ディレクトリを再帰的にたどり、対象ファイル・URLを列挙"""
+    for path in paths:
+        if _is_url(path):
+            yield path
+        elif os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                dirs.sort()
+                for name in sorted(files):
+                    if name.endswith(HTML_EXTENSIONS + FEED_EXTENSIONS):
+                        yield os.path.join(root, name)
+        else:
+            yield path
+
+def _iter_chunks(source: str, timeout: float = 10.0) -> Iterator[bytes]:
+    """ファイル・URLをチャンク単位で読む"""
+    if _is_url(source):
+        from urllib.request import urlopen
+        stream = urlopen(source, timeout=timeout)
+    else:
+        stream = open(source, "rb")
+    with stream:
+        while True:
+            chunk = stream.read(CHUNK_SIZE)
+            if not chunk:
+                return
+            yield chunk
+
+def _iter_text_chunks(source: str, sizes: List[int]) -> Iterator[str]:
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    for chunk in _iter_chunks(source):
+        sizes.append(len(chunk))
+        yield decoder.decode(chunk)
+    yield decoder.decode(b"", final=True)
+
+def _feed_records(document) -> List:
+    """JSONフィードから投稿レコードのリストを取り出す"""
+    if isinstance(document, dict):
+        for key in ("posts", "items", "data"):
+            if isinstance(document.get(key), list):
+                return document[key]
+        return [document]
+    return document if isinstance(document, list) else []
+
+def _count_record(record, hashtags: Counter, keywords: Counter):
+    if isinstance(record, str):
+        count_terms(record, hashtags, keywords)
+        return
+    if not isinstance(record, dict):
+        return
+    for name in FEED_TEXT_FIELDS:
+        if isinstance(record.get(name), str):
+            count_terms(record[name], hashtags, keywords)
+    for tag in record.get("hashtags") or ():
+        hashtags[str(tag).lstrip("#＃")] += 1
+
+def parse_source(source: str) -> Tuple[Counter, Counter, int]:
+    """1件分を解析して (ハッシュタグ数, キーワード数, 読み込みバイト数) を返す
+
+    HTMLとJSON Linesはチャンク・行単位で逐次解析する。
+    JSON（.json）は1ファイル1文書として読み込む。
+    """
+    hashtags: Counter = Counter()
+    keywords: Counter = Counter()
+    sizes: List[int] = []
+    path = source.split("?", 1)[0].lower()
+
+    if path.endswith(".jsonl"):
+        pending = ""
+        for text in _iter_text_chunks(source, sizes):
+            lines = (pending + text).split("\n")
+            pending = lines.pop()
+            for line in lines:
+                if line.strip():
+                    _count_record(json.loads(line), hashtags, keywords)
+        if pending.strip():
+            _count_record(json.loads(pending), hashtags, keywords)
+    elif path.endswith(".json"):
+        document = json.loads("".join(_iter_text_chunks(source, sizes)))
+        for record in _feed_records(document):
+            _count_record(record, hashtags, keywords)
+    else:
+        parser = _TextExtractor(lambda text: count_terms(text, hashtags, keywords))
+        for text in _iter_text_chunks(source, sizes):
+            parser.feed(text)
+        parser.close()
+    return hashtags, keywords, sum(sizes)
+
+_DONE = object()
+
+def ingest(paths: Sequence[str], workers: int = 4, queue_size: int = 64, top_k: int = 50,
+           sketch_width: int = 4096, sketch_depth: int = 4) -> TrendSnapshot:
+    """スナップショットを並列に取り込み、頻度の高いハッシュタグ・キーワードを返す
+
+    ソース投入キュー・解析結果キューとも上限付きで、メモリ使用量はワーカー数と
+    キューの長さ、スケッチの大きさで決まる（取り込む文書数には依存しない）。
+    """
+    sources: queue.Queue = queue.Queue(maxsize=queue_size)
+    parsed: queue.Queue = queue.Queue(maxsize=queue_size)
+    counter = TrendCounter(top_k, sketch_width, sketch_depth)
+    snapshot = TrendSnapshot(hashtags=[], keywords=[])
+
+    def work():
+        while True:
+            source = sources.get()
+            if source is _DONE:
+                parsed.put(_DONE)
+                return
+            try:
+                parsed.put(parse_source(source))
+            except Exception as e:
+                parsed.put(f"{source}: {type(e).__name__}: {e}")
+
+    def aggregate():
+        remaining = workers
+        while remaining:
+            item = parsed.get()
+            if item is _DONE:
+                remaining -= 1
+            elif isinstance(item, str):
+                if len(snapshot.errors) < MAX_ERRORS:
+                    snapshot.errors.append(item)
+            else:
+                hashtags, keywords, size = item
+                counter.update("hashtags", hashtags)
+                counter.update("keywords", keywords)
+                snapshot.documents += 1
+                snapshot.bytes_read += size
+
+    threads = [threading.Thread(target=work, daemon=True) for _ in range(workers)]
+    aggregator = threading.Thread(target=aggregate, daemon=True)
+    for thread in threads + [aggregator]:
+        thread.start()
+    try:
+        for source in iter_sources(paths):
+            sources.put(source)
+    finally:
+        for _ in threads:
+            sources.put(_DONE)
+    aggregator.join()
+
+    snapshot.hashtags = counter.top("hashtags")
+    snapshot.keywords = counter.top("keywords")
+    return snapshot
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="競合ページ・ハッシュタグフィードのトレンド集計")
+    parser.add_argument("sources", nargs="+", help="スナップショットのディレクトリ・ファイル・URL")
+    parser.add_argument("--workers", type=int, default=4, help="解析スレッド数")
+    parser.add_argument("--top", type=int, default=20, help="表示件数")
+    args = parser.parse_args()
+
+    result = ingest(args.sources, workers=args.workers, top_k=args.top)
+    print(f"📥 取り込み: {result.documents}件 / {result.bytes_read:,}バイト / エラー {len(result.errors)}件")
+    print("🏷️ ハッシュタグ: " + " ".join(f"#{tag}({count})" for tag, count in result.hashtags))
+    print("🔑 キーワード: " + " ".join(f"{word}({count})" for word, count in result.keywords))
+    for error in result.errors:
+        print(f"⚠️ {error}")
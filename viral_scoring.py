@@ -0,0 +1,104 @@
+# viral_scoring.py - 投稿候補のバイラルスコア一括計算（NumPyでベクトル化）
+#
+# 候補の重複を除いてから特徴量行列を作り、1回の行列演算で全候補を採点する。
+# テンプレート由来の候補は重複が多いため、特徴量抽出は異なる文面の数だけで済む。
+
+import math
+import re
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+_HASHTAG = re.compile(r"[#＃]([^\s#＃]+)")
+_EMOJI = re.compile("[\U0001F300-\U0001FAFF☀-➿⭐✨]")
+
+@dataclass(frozen=True)
+class ScoreWeights:
+    """スコアの重み・基準値"""
+    hashtag: float = 1.0        # 過去の反応実績があるハッシュタグ（重みの合計）
+    trend: float = 1.5          # トレンドハッシュタグ1件あたり
+    season: float = 0.8         # 季節キーワード1件あたり
+    emoji: float = 0.3          # 絵文字1個あたり（emoji_cap 個まで）
+    emoji_cap: int = 5
+    length: float = 1.0         # 理想の長さに近いほど高い（最大 length）
+    ideal_length: int = 120
+    length_spread: int = 60
+
+def engagement_weights(hashtag_counts: Iterable[Tuple[str, float]]) -> Dict[str, float]:
+    """ハッシュタグの出現・反応数から重みを作成（対数スケールで最大1.0に正規化）"""
+    counts = {tag.lstrip("#＃"): float(count) for tag, count in hashtag_counts if count > 0}
+    if not counts:
+        return {}
+    top = math.log1p(max(counts.values()))
+    return {tag: math.log1p(count) / top for tag, count in counts.items()}
+
+class ViralScorer:
+    """投稿候補のバイラルスコア計算"""
+
+    def __init__(self, season_keywords: Sequence[str] = (), trend_hashtags: Sequence[str] = (),
+                 hashtag_weights: Optional[Dict[str, float]] = None,
+                 weights: ScoreWeights = ScoreWeights()):
+        self.season_keywords = tuple(season_keywords)
+        self.trend_hashtags = frozenset(tag.lstrip("#＃") for tag in trend_hashtags)
+        self.hashtag_weights = dict(hashtag_weights or {})
+        self.weights = weights
+        # ハッシュタグ語彙（列番号）と列ごとの重み
+        self._vocabulary: Dict[str, int] = {}
+        self._column_weights: List[float] = []
+
+    def _column(self, tag: str) -> int:
+        column = self._vocabulary.get(tag)
+        if column is None:
+            column = self._vocabulary[tag] = len(self._column_weights)
+            self._column_weights.append(
+                self.weights.hashtag * self.hashtag_weights.get(tag, 0.0)
+                + (self.weights.trend if tag in self.trend_hashtags else 0.0)
+            )
+        return column
+
+    def featurize(self, texts: Sequence[str]) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """(ハッシュタグ行列, 絵文字数, 文字数, 季節キーワード数) を作成"""
+        tag_rows, tag_cols = [], []
+        emojis = np.empty(len(texts), dtype=np.float64)
+        lengths = np.empty(len(texts), dtype=np.float64)
+        season_hits = np.empty(len(texts), dtype=np.float64)
+        for row, text in enumerate(texts):
+            for tag in set(_HASHTAG.findall(text)):
+                tag_rows.append(row)
+                tag_cols.append(self._column(tag))
+            emojis[row] = len(_EMOJI.findall(text))
+            lengths[row] = len(text)
+            season_hits[row] = sum(keyword in text for keyword in self.season_keywords)
+
+        tags = np.zeros((len(texts), len(self._column_weights)), dtype=np.float32)
+        tags[tag_rows, tag_cols] = 1.0
+        return tags, emojis, lengths, season_hits
+
+    def score(self, texts: Sequence[str]) -> np.ndarray:
+        """全候補のスコア（重複する文面は1回だけ特徴量化する）"""
+        unique: Dict[str, int] = {}
+        inverse = np.fromiter((unique.setdefault(text, len(unique)) for text in texts),
+                              dtype=np.intp, count=len(texts))
+        return self._score_unique(list(unique))[inverse]
+
+    def _score_unique(self, texts: List[str]) -> np.ndarray:
+        w = self.weights
+        tags, emojis, lengths, season_hits = self.featurize(texts)
+        column_weights = np.asarray(self._column_weights, dtype=np.float32)
+        length_score = np.exp(-(((lengths - w.ideal_length) / w.length_spread) ** 2))
+        return (tags @ column_weights
+                + w.emoji * np.minimum(emojis, w.emoji_cap)
+                + w.season * season_hits
+                + w.length * length_score)
+
+    def top_k(self, texts: Sequence[str], k: int = 5) -> List[Tuple[str, float]]:
+        """スコア上位k件の（文面, スコア）を高い順に返す（同じ文面は1件として扱う）"""
+        unique = list(dict.fromkeys(texts))
+        if not unique or k <= 0:
+            return []
+        scores = self._score_unique(unique)
+        k = min(k, len(unique))
+        best = np.argpartition(-scores, k - 1)[:k]
+        best = best[np.argsort(-scores[best], kind="stable")]
+        return [(unique[i], float(scores[i])) for i in best]